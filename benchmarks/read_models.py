@@ -0,0 +1,122 @@
+"""Compare loading transactions as ORM Transactions and as TransactionRows.
+
+Fills a temporary database with the given number of transactions and
+reports the time to construct the objects and the memory held per row
+for each path.
+
+Usage:
+    python -m benchmarks.read_models --transactions 1000000
+"""
+import argparse
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from os import path
+from typing import Callable
+
+from sqlalchemy import insert, select
+
+from budget_book_backend import create_app
+from budget_book_backend.models.account import Account
+from budget_book_backend.models.account_type import AccountType
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.read_models import TransactionRow
+from budget_book_backend.models.transaction import Transaction
+
+INSERT_BATCH_SIZE: int = 50_000
+
+
+def fill_database(transaction_count: int) -> None:
+    """Add two accounts and the given number of transactions between
+    them to the current database."""
+    with DbSetup.Session() as session:
+        session.add(AccountType(id=1, name="Checking Account", group_name="Assets"))
+        session.add(Account(id=1, name="Checking", account_type_id=1, debit_inc=True))
+        session.add(Account(id=2, name="Savings", account_type_id=1, debit_inc=True))
+        session.commit()
+
+    start: datetime = datetime(2000, 1, 1)
+
+    with DbSetup.engine.begin() as connection:
+        for offset in range(0, transaction_count, INSERT_BATCH_SIZE):
+            connection.execute(
+                insert(Transaction),
+                [
+                    dict(
+                        name=f"Transaction {i}",
+                        description="Benchmark transaction",
+                        amount=round(i % 1000 + 0.99, 2),
+                        debit_account_id=1 + i % 2,
+                        credit_account_id=2 - i % 2 if i % 10 else None,
+                        transaction_date=start + timedelta(minutes=i),
+                    )
+                    for i in range(
+                        offset, min(offset + INSERT_BATCH_SIZE, transaction_count)
+                    )
+                ],
+            )
+
+
+def measure(load: Callable[[], list]) -> dict:
+    """Return the seconds taken by the load and the bytes per row it
+    holds once it returns."""
+    gc.collect()
+    tracemalloc.start()
+
+    started: float = time.perf_counter()
+    rows: list = load()
+    seconds: float = time.perf_counter() - started
+
+    held_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return dict(
+        rows=len(rows),
+        seconds=round(seconds, 3),
+        bytes_per_row=round(held_bytes / max(len(rows), 1)),
+    )
+
+
+def load_orm() -> list:
+    """Load every transaction as an ORM Transaction."""
+    with DbSetup.Session() as session:
+        transactions: list[Transaction] = list(session.scalars(select(Transaction)))
+        # Keep the instances once the session is closed.
+        session.expunge_all()
+
+    return transactions
+
+
+def load_rows() -> list:
+    """Load every transaction as a TransactionRow."""
+    with DbSetup.Session() as session:
+        return TransactionRow.load(session, TransactionRow.query())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        create_app(
+            test_config=dict(
+                DATABASE=f"sqlite:///{path.join(directory, 'benchmark.db')}"
+            )
+        )
+        fill_database(args.transactions)
+
+        print(
+            json.dumps(
+                dict(orm=measure(load_orm), read_model=measure(load_rows)), indent=2
+            )
+        )
+
+        DbSetup.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import json
+from typing import Mapping, Optional
 
 from flask import Blueprint, request
+from sqlalchemy.orm import Session
 
 from budget_book_backend.account_types.account_type_services import (
     get_account_types,
@@ -32,9 +34,28 @@ def account_types():
     Example url:
         ?group=liabilities
     """
-    group: str = request.args.get("group", "all")
+    return account_types_response(request.args)
 
-    account_types: list[dict] = get_account_types(group)
+
+def account_types_response(
+    args: Mapping, session: Optional[Session] = None
+) -> tuple[str, int]:
+    """Build the response for GET /api/accounttypes from the request
+    arguments. Shared by the Flask route and the ASGI app so that both
+    return the same response.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+        session (Session) : Optional. The session to read from.
+
+    Returns
+    -------
+        (tuple[str, int]) : The JSON response and its status code.
+    """
+    group: str = args.get("group", "all")
+
+    account_types: list[dict] = get_account_types(group, session)
 
     return (
         json.dumps(
@@ -1,12 +1,18 @@
+from typing import Optional
+
 import pandas as pd
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 
 from budget_book_backend.models.account_type import AccountType
 from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.write_queue import serialized_write
 from budget_book_backend.utils import dict_to_json
 
 
-def get_account_types(group: str = "all") -> list[dict]:
+def get_account_types(
+    group: str = "all", session: Optional[Session] = None
+) -> list[dict]:
     """Return all the account types, with their names and groups,
     with the requested group type. If no group type is given, it
     returns all of them.
@@ -16,6 +22,8 @@ def get_account_types(group: str = "all") -> list[dict]:
         group (str) : (Optional) The group of account_types or
             categories to get. This can be "income", "assets",
             "liabilities", "expenses", etc.
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
 
     Returns
     -------
@@ -27,13 +35,15 @@ def get_account_types(group: str = "all") -> list[dict]:
     if group != "all":
         sql_statement += f" WHERE \"group_name\" = '{group}'"
 
-    df: pd.DataFrame = pd.read_sql_query(
-        text(sql_statement), DbSetup.engine.connect()
-    )
+    with DbSetup.use_session(session, read_only=True) as session:
+        df: pd.DataFrame = pd.read_sql_query(
+            text(sql_statement), session.connection()
+        )
 
     return dict_to_json(df.to_dict(), df.index)
 
 
+@serialized_write
 def create_account_type(name: str, group: str = "Misc.") -> dict:
     """Add a new account type to the database.
 
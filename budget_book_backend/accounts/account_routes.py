@@ -1,16 +1,24 @@
 import json
+from typing import Mapping, Optional
 
-from flask import Blueprint, request
+from flask import Blueprint, Response, request, stream_with_context
 from datetime import datetime
+from sqlalchemy.orm import Session
 
 from budget_book_backend.accounts.account_services import (
     account_balances,
+    account_balance_history,
+    check_balance_options,
+    get_account_summaries_by_type,
     get_accounts_by_type,
     add_new_account_to_db,
     update_account_info,
     delete_account,
     account_net_changes_by_group,
+    close_period,
+    export_accounts,
 )
+from budget_book_backend.jobs.job_routes import submit_job
 from budget_book_backend.utils.utils import (
     endpoint_error_wrapper,
     validate_and_get_json,
@@ -37,25 +45,78 @@ def get_accounts():
             balances, use this as the start date. Optional.
         balance_end_date (date str) : When computing account
             balances, use this as the end date. Optional.
+        sort (str) : "balance" to sort the accounts by their balance.
+            Optional.
+        order (str) : "asc" or "desc". Defaults to "asc".
+        min_balance (float) : Only return accounts with at least this
+            balance. Optional.
+        max_balance (float) : Only return accounts with at most this
+            balance. Optional.
+        limit (int) : The maximum number of accounts to return. Optional.
+
+    Without either date, the all-time balances are read from the
+    account summaries instead of being computed.
 
     Example url:
         ?balance_start_date=2022-10-02&account_type=bank
+        ?account_type=Expenses&balance_start_date=2023-03-01&sort=balance&order=desc&limit=10
     """
-    account_type: str = request.args.get("account_type", "all")
+    return accounts_response(request.args)
 
-    types: tuple[str, ...] = ()
 
-    if account_type == "bank":
-        types = ("Checking Account", "Savings Account", "Credit Card")
-    else:
-        types = tuple(account_type.split(","))
-        if len(types) == 1:
-            types = (types[0],)
+def accounts_response(
+    args: Mapping, session: Optional[Session] = None
+) -> tuple[str, int]:
+    """Build the response for GET /api/accounts from the request
+    arguments. Shared by the Flask route and the ASGI app so that both
+    return the same response.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+        session (Session) : Optional. The session to read from.
+
+    Returns
+    -------
+        (tuple[str, int]) : The JSON response and its status code.
+    """
+    types: tuple[str, ...] = account_types(args)
+
+    try:
+        balance_options: dict = dict(
+            sort=args.get("sort"),
+            order=args.get("order", "asc"),
+            min_balance=(
+                float(args["min_balance"]) if "min_balance" in args else None
+            ),
+            max_balance=(
+                float(args["max_balance"]) if "max_balance" in args else None
+            ),
+            limit=int(args["limit"]) if "limit" in args else None,
+        )
+
+        check_balance_options(balance_options["sort"], balance_options["order"])
+    except ValueError as e:
+        return json.dumps(dict(message="ERROR", error=str(e))), 400
+
+    if "balance_start_date" not in args and "balance_end_date" not in args:
+        # All-time balances are kept in the account summaries table.
+        return (
+            json.dumps(
+                dict(
+                    message="SUCCESS",
+                    accounts=get_account_summaries_by_type(
+                        types, session, **balance_options
+                    ),
+                )
+            ),
+            200,
+        )
 
-    balance_start_date: datetime | str = request.args.get(
+    balance_start_date: datetime | str = args.get(
         "balance_start_date", datetime(1, 1, 1)
     )
-    balance_end_date: datetime | str = request.args.get(
+    balance_end_date: datetime | str = args.get(
         "balance_end_date", datetime.now()
     )
 
@@ -66,7 +127,7 @@ def get_accounts():
         balance_end_date = datetime.strptime(balance_end_date, "%Y-%m-%d")
 
     accounts: list[dict] = get_accounts_by_type(
-        types, balance_start_date, balance_end_date
+        types, balance_start_date, balance_end_date, session, **balance_options
     )
 
     return (
@@ -80,6 +141,71 @@ def get_accounts():
     )
 
 
+def account_types(args: Mapping) -> tuple[str, ...]:
+    """Return the account types named by the account_type request
+    argument, with "bank" standing for the bank account types.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+
+    Returns
+    -------
+        (tuple[str, ...]) : The names of the account types, or ("all",).
+    """
+    account_type: str = args.get("account_type", "all")
+
+    if account_type == "bank":
+        return ("Checking Account", "Savings Account", "Credit Card")
+
+    return tuple(account_type.split(","))
+
+
+@endpoint_error_wrapper
+@accounts_routes.route(f"{BASE_ACCOUNTS_URL}/export", methods=["GET"])
+def get_account_export():
+    """Stream the accounts with their types and balances as a CSV file.
+
+    The accounts are read from the database and sent in chunks, with the
+    same columns as GET /api/accounts.
+
+    Request Arguments
+    -----------------
+        account_type (str) : The type of accounts to export, as for
+            GET /api/accounts. Defaults to "all".
+        balance_start_date (date str) : The start date of the balances.
+            Optional.
+        balance_end_date (date str) : The end date of the balances.
+            Defaults to today.
+
+    Example url:
+        ?account_type=bank&balance_start_date=2023-01-01
+    """
+    try:
+        balance_start_date: datetime = (
+            datetime.strptime(request.args["balance_start_date"], "%Y-%m-%d")
+            if "balance_start_date" in request.args
+            else datetime(1, 1, 1)
+        )
+        balance_end_date: datetime = (
+            datetime.strptime(request.args["balance_end_date"], "%Y-%m-%d")
+            if "balance_end_date" in request.args
+            else datetime.now()
+        )
+    except ValueError as e:
+        return json.dumps(dict(message="ERROR", error=str(e))), 400
+
+    return Response(
+        stream_with_context(
+            export_accounts(
+                account_types(request.args), balance_start_date, balance_end_date
+            )
+        ),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=accounts.csv"},
+    )
+
+
 @endpoint_error_wrapper
 @accounts_routes.route(f"{BASE_ACCOUNTS_URL}", methods=["POST"])
 def add_new_account():
@@ -134,6 +260,74 @@ def get_account_balances():
     return json.dumps(dict(message="SUCCESS", balances=response_dict)), 200
 
 
+@endpoint_error_wrapper
+@accounts_routes.route(f"{BASE_ACCOUNTS_URL}/balance-history", methods=["GET"])
+def get_account_balance_history():
+    """Return the balance of each of the given accounts at every
+    interval between two dates, for use in balance and net worth charts.
+
+    Request Arguments
+    -----------------
+        account_ids (str) : Comma separated IDs of the accounts.
+        start (date str) : The date of the first point in the series.
+        end (date str) : Optional. The date of the last point in the
+            series. Defaults to today.
+        interval (str) : Optional. One of "day", "week", or "month".
+            Defaults to "month".
+
+    Example url:
+        ?account_ids=1,2&start=2023-01-01&end=2023-12-31&interval=week
+    """
+    return balance_history_response(request.args)
+
+
+def balance_history_response(
+    args: Mapping, session: Optional[Session] = None
+) -> tuple[str, int]:
+    """Build the response for GET /api/accounts/balance-history from
+    the request arguments. Shared by the Flask route and the ASGI app so that both
+    return the same response.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+        session (Session) : Optional. The session to read from.
+
+    Returns
+    -------
+        (tuple[str, int]) : The JSON response and its status code.
+    """
+    url_account_ids: str | None = args.get("account_ids")
+    start: str | None = args.get("start")
+
+    if not url_account_ids or not start:
+        return (
+            json.dumps(
+                dict(
+                    message="ERROR",
+                    error="URL is missing account_ids or start values.",
+                )
+            ),
+            400,
+        )
+
+    account_ids: list[int] = [
+        int(account_id) for account_id in url_account_ids.split(",") if account_id
+    ]
+
+    end: str = args.get("end", datetime.today().strftime("%Y-%m-%d"))
+
+    response: dict = account_balance_history(
+        account_ids,
+        datetime.strptime(start, "%Y-%m-%d"),
+        datetime.strptime(end, "%Y-%m-%d"),
+        args.get("interval", "month"),
+        session,
+    )
+
+    return json.dumps(response), 200 if response["message"] == "SUCCESS" else 400
+
+
 @endpoint_error_wrapper
 @accounts_routes.route(f"{BASE_ACCOUNTS_URL}", methods=["PUT"])
 def put_account_update():
@@ -189,9 +383,14 @@ def account_group_net_report():
         dates (list[str]) : The dates to fetch the account balances from.
         account_groups (list[str]) : The different account groups from
             which to grab the accounts and their balances.
+        background (bool) : Optional. Run the report as a background
+            job and return its job ID instead of the report.
     """
     request_json: dict = validate_and_get_json()
 
+    if request_json.get("background"):
+        return submit_job("account_net_changes_by_group", request_json)
+
     report_response: dict = account_net_changes_by_group(
         account_groups=request_json.get("accountGroups", []),
         date_ranges=request_json.get(
@@ -200,3 +399,33 @@ def account_group_net_report():
     )
 
     return json.dumps(report_response), 200
+
+
+@endpoint_error_wrapper
+@accounts_routes.route(f"{BASE_ACCOUNTS_URL}/close-period", methods=["POST"])
+def post_close_period():
+    """Close the accounting period ending on the given date, recording
+    each account's balance and locking the transactions on or before it.
+
+    JSON Parameters
+    ---------------
+        close_date (date str) : The last date of the period to close.
+    """
+    request_json: dict = validate_and_get_json()
+
+    close_date: str | None = request_json.get("close_date")
+
+    if close_date is None:
+        return (
+            json.dumps(
+                dict(
+                    message="ERROR",
+                    error="No field for 'close_date' found within the request body.",
+                ),
+            ),
+            400,
+        )
+
+    response: dict = close_period(datetime.strptime(close_date, "%Y-%m-%d"))
+
+    return json.dumps(response), 200 if response["message"] == "SUCCESS" else 400
@@ -1,23 +1,66 @@
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
 import pandas as pd
-from sqlalchemy import select, text
+from sqlalchemy import SQLColumnExpression, Select, case, func, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
 
 from budget_book_backend.models.account import Account
+from budget_book_backend.models.account_summary import AccountSummary
 from budget_book_backend.models.account_type import AccountType
+from budget_book_backend.models.archive import TransactionArchive, attached_archives
 from budget_book_backend.models.db_setup import DbSetup
-from budget_book_backend.utils import dict_to_json
+from budget_book_backend.models.period_close import BalanceSnapshot, PeriodClose
+from budget_book_backend.models.read_models import AccountRow
+from budget_book_backend.models.report_cache import ReportCache
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.models.versioning import VersionConflict, check_version
+from budget_book_backend.models.write_queue import serialized_write
+from budget_book_backend.utils import csv_chunks
+
+BALANCE_HISTORY_INTERVALS: dict[str, pd.DateOffset] = {
+    "day": pd.DateOffset(days=1),
+    "week": pd.DateOffset(weeks=1),
+    "month": pd.DateOffset(months=1),
+}
+
+# The number of accounts fetched from the cursor at a time by the export.
+EXPORT_CHUNK_SIZE: int = 500
+
+ACCOUNT_EXPORT_COLUMNS: list[str] = [
+    "id",
+    "name",
+    "account_type",
+    "account_group",
+    "debit_inc",
+    "balance",
+    "uncategorized_transactions",
+    "last_updated",
+    "start_date",
+    "end_date",
+]
 
 
 def get_accounts_by_type(
     types: tuple[str, ...],
     balance_start_date: datetime,
     balance_end_date: datetime,
+    session: Optional[Session] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    min_balance: Optional[float] = None,
+    max_balance: Optional[float] = None,
+    limit: Optional[int] = None,
 ) -> list[dict]:
     """Select and return all of the accounts within the types list with
     balances calculated between the start date and end date.
 
+    The accounts are read with their types in a single query as
+    AccountRows. Sorting, filtering, and limiting by balance are done in
+    that query with Account.balance_expression, and the details of the
+    selected accounts are then read for all of them at once.
+
     Parameters
     ----------
         types (list[str]) : The type of accounts to fetch. For example,
@@ -26,6 +69,16 @@ def get_accounts_by_type(
             calculating the balance of the returned accounts.
         balance_end_date (datetime) : The latest date to use when
             calculating the balance of the returned accounts.
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
+        sort (str) : Optional. "balance" to sort the accounts by their
+            balance. If not given, they are in ID order.
+        order (str) : Optional. "asc" or "desc". Defaults to "asc".
+        min_balance (float) : Optional. Only return accounts with at
+            least this balance.
+        max_balance (float) : Optional. Only return accounts with at
+            most this balance.
+        limit (int) : Optional. The maximum number of accounts to return.
 
     Returns
     -------
@@ -35,62 +88,345 @@ def get_accounts_by_type(
             simple to convert to a dict that is JSON serializable.
 
     """
-    with DbSetup.Session() as session:
-        if types[0] != "all":
-            account_types: tuple[AccountType, ...] = tuple(
-                session.scalars(
-                    select(AccountType).where(AccountType.name.in_(types))
-                ).all()
+    check_balance_options(sort, order)
+
+    # The account types are loaded by the same query as the accounts.
+    query = AccountRow.query()
+
+    if types[0] != "all":
+        query = query.where(AccountType.name.in_(types))
+
+    with DbSetup.use_session(session, read_only=True) as session:
+        archives: list[TransactionArchive] = []
+
+        if any(option is not None for option in (sort, min_balance, max_balance)):
+            archives = TransactionArchive.reached_by(
+                session,
+                start_date=(
+                    None
+                    if balance_start_date == datetime(1, 1, 1)
+                    else balance_start_date
+                ),
+                end_date=balance_end_date,
             )
-        else:
-            account_types = tuple(session.scalars(select(AccountType)).all())
 
-        ids: tuple | str = tuple(
-            map(lambda account_type: account_type.id, account_types)
+        with attached_archives(session.connection(), archives) as archive_years:
+            rows: list[AccountRow] = AccountRow.load(
+                session,
+                filter_by_balance(
+                    query,
+                    Account.balance_expression(
+                        balance_start_date, balance_end_date, archive_years
+                    ),
+                    sort,
+                    order,
+                    min_balance,
+                    max_balance,
+                    limit,
+                ),
+            )
+
+        balances: dict[int, float] = AccountRow.balances(
+            session, rows, balance_start_date, balance_end_date
+        )
+        uncategorized_counts: dict[int, int] = AccountRow.uncategorized_counts(
+            session, rows, balance_start_date, balance_end_date
+        )
+        last_updated_dates: dict[int, datetime] = AccountRow.last_updated_dates(
+            session, rows
         )
 
-        account_objs: list[Account] = list(
-            session.scalars(select(Account).where(Account.account_type_id.in_(ids)))
+    return [
+        dict(
+            name=row.name,
+            account_type_id=row.account_type_id,
+            debit_inc=int(row.debit_inc),
+            balance=balances[row.id],
+            start_date=datetime.strftime(balance_start_date, "%Y-%m-%d"),
+            end_date=datetime.strftime(balance_end_date, "%Y-%m-%d"),
+            last_updated=datetime.strftime(last_updated_dates[row.id], "%Y-%m-%d"),
+            uncategorized_transactions=uncategorized_counts[row.id],
+            account_type=row.account_type,
+            account_group=row.account_group,
+            id=row.id,
+            version=row.version,
         )
+        for row in rows
+    ]
+
+
+def export_accounts(
+    types: tuple[str, ...],
+    balance_start_date: datetime,
+    balance_end_date: datetime,
+) -> Iterator[str]:
+    """Return the CSV text of the accounts within the types list with
+    their types' names and their balances between the start date and
+    end date, the same details as get_accounts_by_type.
+
+    The accounts are streamed from the database EXPORT_CHUNK_SIZE at a
+    time, and the details of each chunk are read and written out as the
+    returned iterator is consumed. Its session stays open until the
+    iterator is exhausted or closed.
 
-        # Special case where a singular value in a tuple
-        # isn't formatted right for SQL queries.
-        if len(ids) == 1:
-            ids = f"({ids[0]})"
+    Parameters
+    ----------
+        types (list[str]) : The type of accounts to export, or "all".
+        balance_start_date (datetime) : The earliest date to use when
+            calculating the balances.
+        balance_end_date (datetime) : The latest date to use when
+            calculating the balances.
 
-        accounts_df: pd.DataFrame = pd.read_sql_query(
-            text(f"SELECT * FROM accounts WHERE account_type_id IN {ids}"),
-            DbSetup.engine.connect(),
-            index_col="id",
+    Returns
+    -------
+        (Iterator[str]) : The CSV text, header first.
+    """
+    query = AccountRow.query().order_by(Account.id)
+
+    if types[0] != "all":
+        query = query.where(AccountType.name.in_(types))
+
+    start_date: str = datetime.strftime(balance_start_date, "%Y-%m-%d")
+    end_date: str = datetime.strftime(balance_end_date, "%Y-%m-%d")
+
+    def account_lines(session: Session, rows: list[AccountRow]) -> list[tuple]:
+        """Return the CSV rows of a chunk of accounts."""
+        balances: dict[int, float] = AccountRow.balances(
+            session, rows, balance_start_date, balance_end_date
+        )
+        uncategorized_counts: dict[int, int] = AccountRow.uncategorized_counts(
+            session, rows, balance_start_date, balance_end_date
+        )
+        last_updated_dates: dict[int, datetime] = AccountRow.last_updated_dates(
+            session, rows
         )
 
-        accounts_df["balance"] = 0.0
-        accounts_df["start_date"] = datetime.strftime(balance_start_date, "%Y-%m-%d")
-        accounts_df["end_date"] = datetime.strftime(balance_end_date, "%Y-%m-%d")
-        accounts_df["last_updated"] = datetime.strftime(datetime.today(), "%Y-%m-%d")
-        accounts_df["uncategorized_transactions"] = 0
-        accounts_df["account_type"] = ""
-        accounts_df["account_group"] = ""
-        accounts_df["id"] = accounts_df.index
-
-        for account in account_objs:
-            accounts_df.loc[account.id, "balance"] = account.balance(
-                balance_start_date, balance_end_date
+        return [
+            (
+                row.id,
+                row.name,
+                row.account_type,
+                row.account_group,
+                int(row.debit_inc),
+                balances[row.id],
+                uncategorized_counts[row.id],
+                datetime.strftime(last_updated_dates[row.id], "%Y-%m-%d"),
+                start_date,
+                end_date,
             )
-            accounts_df.loc[account.id, "uncategorized_transactions"] = len(
-                account.uncategorized_transactions(balance_start_date, balance_end_date)
+            for row in rows
+        ]
+
+    def csv_text() -> Iterator[str]:
+        with DbSetup.ReadSession() as session:
+            result = session.execute(
+                query, execution_options=dict(yield_per=EXPORT_CHUNK_SIZE)
             )
-            accounts_df.loc[account.id, "last_updated"] = datetime.strftime(
-                account.last_updated(), "%Y-%m-%d"
+
+            yield from csv_chunks(
+                ACCOUNT_EXPORT_COLUMNS,
+                (
+                    account_lines(session, [AccountRow._make(row) for row in partition])
+                    for partition in result.partitions()
+                ),
             )
-            accounts_df.loc[account.id, "account_type"] = account.account_type.name
-            accounts_df.loc[
-                account.id, "account_group"
-            ] = account.account_type.group_name
 
-    return dict_to_json(accounts_df.to_dict(), accounts_df.index)
+    return csv_text()
+
+
+def get_account_summaries_by_type(
+    types: tuple[str, ...],
+    session: Optional[Session] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    min_balance: Optional[float] = None,
+    max_balance: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> list[dict]:
+    """Select and return all of the accounts within the types list with
+    their balances up to today, read from the account summaries table
+    with a single join instead of walking each account's transactions.
+    Only the transactions dated after today are read, to take them out
+    of the summaries.
+
+    Accounts without a summary (e.g. in a database created before the
+    summaries table existed) have theirs computed before returning.
 
+    Parameters
+    ----------
+        types (list[str]) : The type of accounts to fetch. For example,
+            "bank", "category", or "all".
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
+        sort, order, min_balance, max_balance, limit : Optional. The
+            balance options of get_accounts_by_type, applied to the
+            summarized balances.
+
+    Returns
+    -------
+        (list[dict]) : The list of the accounts in the same format as
+            get_accounts_by_type.
+    """
+    with DbSetup.use_session(session, read_only=True) as read_session:
+        missing: list[int] = list(
+            read_session.scalars(
+                select(Account.id)
+                .outerjoin(AccountSummary, AccountSummary.account_id == Account.id)
+                .where(AccountSummary.account_id.is_(None))
+            )
+        )
+
+    if missing:
+        refresh_account_summaries(missing)
+
+    # The summaries include future-dated transactions, which the balances
+    # up to today leave out, like get_accounts_by_type's default end date.
+    future = AccountSummary.changes_after(datetime.now())
+    future_amount = func.coalesce(future.c.amount, 0.0)
+    balance = func.round(
+        AccountSummary.balance
+        - case((Account.debit_inc, -future_amount), else_=future_amount),
+        2,
+    )
+
+    query = (
+        select(
+            Account.id,
+            Account.name,
+            Account.account_type_id,
+            Account.debit_inc,
+            AccountType.name,
+            AccountType.group_name,
+            balance,
+            AccountSummary.uncategorized_count
+            - func.coalesce(future.c.uncategorized_count, 0),
+            AccountSummary.last_transaction_date,
+            Account.version,
+        )
+        .join(AccountType, Account.account_type_id == AccountType.id)
+        .join(AccountSummary, AccountSummary.account_id == Account.id)
+        .outerjoin(future, future.c.account_id == Account.id)
+    )
+
+    if types[0] != "all":
+        query = query.where(AccountType.name.in_(types))
+
+    query = filter_by_balance(
+        query, balance, sort, order, min_balance, max_balance, limit
+    )
 
+    with DbSetup.use_session(session, read_only=True) as read_session:
+        rows = read_session.execute(query).all()
+
+    today: str = datetime.strftime(datetime.today(), "%Y-%m-%d")
+
+    return [
+        dict(
+            name=name,
+            account_type_id=account_type_id,
+            debit_inc=int(debit_inc),
+            balance=balance,
+            start_date=datetime.strftime(datetime(1, 1, 1), "%Y-%m-%d"),
+            end_date=today,
+            last_updated=(
+                datetime.strftime(last_date, "%Y-%m-%d") if last_date else today
+            ),
+            uncategorized_transactions=uncategorized_count,
+            account_type=account_type,
+            account_group=account_group,
+            id=account_id,
+            version=version,
+        )
+        for (
+            account_id,
+            name,
+            account_type_id,
+            debit_inc,
+            account_type,
+            account_group,
+            balance,
+            uncategorized_count,
+            last_date,
+            version,
+        ) in rows
+    ]
+
+
+@serialized_write
+def refresh_account_summaries(account_ids: list[int]) -> None:
+    """Recompute and commit the stored summaries of the accounts.
+
+    Parameters
+    ----------
+        account_ids (list[int]) : The accounts whose summaries to refresh.
+    """
+    with DbSetup.Session() as session:
+        AccountSummary.refresh(session, account_ids)
+        session.commit()
+
+
+def check_balance_options(sort: Optional[str], order: str) -> None:
+    """Raise a ValueError if accounts cannot be sorted as given.
+
+    Parameters
+    ----------
+        sort (str) : None or "balance".
+        order (str) : "asc" or "desc".
+    """
+    if sort not in (None, "balance"):
+        raise ValueError(f"Cannot sort accounts by {sort}.")
+
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Order must be asc or desc, not {order}.")
+
+
+def filter_by_balance(
+    query: Select,
+    balance: SQLColumnExpression[float],
+    sort: Optional[str] = None,
+    order: str = "asc",
+    min_balance: Optional[float] = None,
+    max_balance: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> Select:
+    """Add the balance options of GET /api/accounts to an accounts query.
+
+    Parameters
+    ----------
+        query (Select) : The accounts query.
+        balance (SQLColumnExpression[float]) : The balance of each account in
+            the query.
+        sort (str) : Optional. "balance" to sort by the balance. Ties and
+            unsorted queries are in ID order.
+        order (str) : Optional. "asc" or "desc". Defaults to "asc".
+        min_balance (float) : Optional. The lowest balance to include.
+        max_balance (float) : Optional. The highest balance to include.
+        limit (int) : Optional. The maximum number of accounts.
+
+    Returns
+    -------
+        (Select) : The query with the filters, ordering, and limit.
+    """
+    check_balance_options(sort, order)
+
+    if min_balance is not None:
+        query = query.where(balance >= min_balance)
+
+    if max_balance is not None:
+        query = query.where(balance <= max_balance)
+
+    if sort == "balance":
+        query = query.order_by(balance.desc() if order == "desc" else balance.asc())
+
+    query = query.order_by(Account.id)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+@serialized_write
 def add_new_account_to_db(
     name: str, account_type_id: int, account_type_label: str, debit_inc: bool
 ) -> dict:
@@ -157,6 +493,9 @@ def add_new_account_to_db(
             )
 
             session.add(new_acct)
+            session.flush()
+
+            AccountSummary.refresh(session, [new_acct.id])
 
             session.commit()
 
@@ -189,20 +528,22 @@ def account_balances(account_ids: list[int]) -> dict[int, float]:
         id_to_balance (dict of ints to floats) : A map of account id to account
             balance.
     """
-    id_to_balance: dict = dict()
-
-    with DbSetup.Session() as session:
-        for id in account_ids:
-            account: Account | None = session.get(Account, id)
-
-            if account is None:
-                continue
+    with DbSetup.ReadSession() as session:
+        rows: list[AccountRow] = AccountRow.load(
+            session, AccountRow.query().where(Account.id.in_(account_ids))
+        )
+        balances: dict[int, float] = AccountRow.balances(session, rows)
 
-            id_to_balance[account.id] = account.balance()
+    id_to_balance: dict[int, float] = {
+        account_id: balances[account_id]
+        for account_id in account_ids
+        if account_id in balances
+    }
 
     return id_to_balance
 
 
+@serialized_write
 def update_account_info(edit_account: dict) -> dict:
     """Update a given account's info in the databse.
 
@@ -215,7 +556,9 @@ def update_account_info(edit_account: dict) -> dict:
     Returns
     -------
         (dict) : Response dictionary indicating whether or not
-            the updatd was successful in the database.
+            the updatd was successful in the database. If the account was
+            changed by another request since the version given with it,
+            it is left as is and the dictionary has its current version.
     """
     new_name: str = edit_account["name"]
     new_account_type_id: int = edit_account["account_type_id"]
@@ -230,15 +573,35 @@ def update_account_info(edit_account: dict) -> dict:
         if account is None:
             raise Exception(f'Account with ID {edit_account["id"]} cannot be found.')
 
-        account.name = new_name
-        account.account_type_id = new_account_type_id
-        account.debit_inc = new_debit_inc
+        description: str = f'Account with ID {edit_account["id"]}'
 
-        session.commit()
+        try:
+            check_version(description, account.version, edit_account.get("version"))
 
-    return dict(message="SUCCESS")
+            account.name = new_name
+            account.account_type_id = new_account_type_id
+            account.debit_inc = new_debit_inc
+
+            AccountSummary.refresh(session, [account.id])
+
+            session.commit()
+
+        except StaleDataError:
+            # Changed by another request since it was read above.
+            session.rollback()
+            current: Account | None = session.get(Account, edit_account["id"])
+            conflict = VersionConflict(description, current.version if current else 0)
 
+        except VersionConflict as version_conflict:
+            conflict = version_conflict
 
+        else:
+            return dict(message="SUCCESS")
+
+    return dict(message="ERROR", error=str(conflict), version=conflict.version)
+
+
+@serialized_write
 def delete_account(delete_account_id: int) -> dict:
     """Remove a given account from the database.
 
@@ -256,8 +619,64 @@ def delete_account(delete_account_id: int) -> dict:
         if account is None:
             raise Exception(f"Account with ID {delete_account_id} cannot be found.")
 
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
+        if closed_through is not None and session.scalar(
+            select(
+                or_(
+                    account.debit_transactions.select()
+                    .where(Transaction.transaction_date <= closed_through)
+                    .exists(),
+                    account.credit_transactions.select()
+                    .where(Transaction.transaction_date <= closed_through)
+                    .exists(),
+                )
+            )
+        ):
+            return dict(
+                message="ERROR",
+                error="The account has transactions in a closed period.",
+            )
+
+        # Deleting the account uncategorizes its transactions, which
+        # changes the summaries of the accounts on their other side.
+        counterpart_ids: set[int | None] = set(
+            session.scalars(
+                account.debit_transactions.select().with_only_columns(
+                    Transaction.credit_account_id
+                )
+            )
+        ) | set(
+            session.scalars(
+                account.credit_transactions.select().with_only_columns(
+                    Transaction.debit_account_id
+                )
+            )
+        )
+        counterpart_ids.discard(account.id)
+
+        # The transactions are not loaded, so uncategorize them in bulk,
+        # moving them to a new version like an ORM update would.
+        session.execute(
+            update(Transaction)
+            .where(Transaction.debit_account_id == account.id)
+            .values(debit_account_id=None, version=Transaction.version + 1)
+        )
+        session.execute(
+            update(Transaction)
+            .where(Transaction.credit_account_id == account.id)
+            .values(credit_account_id=None, version=Transaction.version + 1)
+        )
+
+        summary: AccountSummary | None = session.get(AccountSummary, account.id)
+
+        if summary is not None:
+            session.delete(summary)
+
         session.delete(account)
 
+        AccountSummary.refresh(session, counterpart_ids)
+
         session.commit()
 
     return dict(message="SUCCESS")
@@ -295,54 +714,289 @@ def account_net_changes_by_group(
     if len(date_ranges) == 1:
         date_ranges.insert(0, "0001-01-1")
 
+    periods: list[tuple[datetime, datetime]] = [
+        (
+            datetime.strptime(date_ranges[i], "%Y-%m-%d"),
+            datetime.strptime(date_ranges[i + 1], "%Y-%m-%d"),
+        )
+        for i in range(0, len(date_ranges), 2)
+    ]
+
+    report_cache: Optional[ReportCache] = DbSetup.extension().report_cache
+
+    if report_cache is None:
+        group_balances, _ = group_net_changes(
+            account_groups, periods, DbSetup.ReadSession
+        )
+    else:
+        # Cached reports are read from the primary, so that none is
+        # older than the writes that last invalidated it.
+        group_balances = report_cache.get_or_compute(
+            account_groups,
+            periods,
+            lambda: group_net_changes(account_groups, periods, DbSetup.Session),
+        )
+
     account_balances: dict = {
         "dates": date_ranges,
         "message": "SUCCESS",
     }
 
     for group in account_groups:
-        account_balances[group] = {}
+        account_balances[group] = group_balances[group]
 
-    with DbSetup.Session() as session:
-        account_types: Optional[list[AccountType]] = (
-            session.query(AccountType)
-            .filter(AccountType.group_name.in_(account_groups))
-            .all()
+    return account_balances
+
+
+def group_net_changes(
+    account_groups: list[str],
+    periods: list[tuple[datetime, datetime]],
+    session_factory: sessionmaker[Session],
+) -> tuple[dict[str, dict], set[int]]:
+    """Compute the net change in the balance of each account of the
+    account groups within each period.
+
+    Parameters
+    ----------
+        account_groups (list[str]) : The names of the account groups.
+        periods (list[tuple[datetime, datetime]]) : The start and end
+            date of each period.
+        session_factory (sessionmaker) : The sessions to read with.
+
+    Returns
+    -------
+        (tuple[dict[str, dict], set[int]]) : The balances of each account
+            group by account type and account name, and the IDs of the
+            accounts they include.
+    """
+    group_balances: dict[str, dict] = {group: {} for group in account_groups}
+
+    with session_factory() as session:
+        # The account types are loaded by the same query as the accounts.
+        rows: list[AccountRow] = AccountRow.load(
+            session,
+            AccountRow.query()
+            .where(AccountType.group_name.in_(account_groups))
+            .order_by(Account.id),
         )
 
-        if account_types is None:
+        range_balances: list[dict[int, float]] = [
+            AccountRow.balances(session, rows, start_date, end_date)
+            for start_date, end_date in periods
+        ]
+
+    for row in rows:
+        group_balances[row.account_group].setdefault(row.account_type, dict())
+
+        group_balances[row.account_group][row.account_type][row.name] = [
+            balances[row.id] * ((-1) ** (row.debit_inc))
+            for balances in range_balances
+        ]
+
+    return group_balances, {row.id for row in rows}
+
+
+@serialized_write
+def close_period(close_date: datetime) -> dict:
+    """Close the accounting period ending on the given date by recording
+    the balance of every account as of that date. Transactions on or
+    before a closed date can no longer be added, changed, or removed.
+
+    Parameters
+    ----------
+        close_date (datetime) : The last date of the period to close. It
+            must be after the latest closed period.
+
+    Returns
+    -------
+        (dict) : Response dictionary with the close date and the number
+            of accounts snapshotted, or an error message if the period
+            cannot be closed.
+    """
+    with DbSetup.Session() as session:
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
+        if closed_through is not None and close_date <= closed_through:
             return dict(
                 message="ERROR",
-                error=f"There was a problem getting the account types associated with {', '.join(account_groups)}",
+                error="Periods are already closed through "
+                f"{closed_through.strftime('%Y-%m-%d')}.",
             )
 
-        account_type_ids: list[int] = [acct_type.id for acct_type in account_types]
-
-        accounts: Optional[list[Account]] = (
-            session.query(Account)
-            .filter(Account.account_type_id.in_(account_type_ids))
-            .all()
+        uncategorized_count: int = (
+            session.scalar(
+                select(func.count(Transaction.id)).where(
+                    Transaction.transaction_date <= close_date,
+                    or_(
+                        Transaction.debit_account_id.is_(None),
+                        Transaction.credit_account_id.is_(None),
+                    ),
+                )
+            )
+            or 0
         )
 
-        if accounts is None:
+        if uncategorized_count:
             return dict(
                 message="ERROR",
-                error=f"There was a problem getting the accounts associated with {', '.join(account_types)}",
+                error=f"There are {uncategorized_count} uncategorized "
+                "transactions on or before "
+                f"{close_date.strftime('%Y-%m-%d')}.",
+            )
+
+        account_ids: list[int] = list(session.scalars(select(Account.id)))
+
+        # Starts from the previous close, so each close only reads the
+        # transactions since then.
+        balances: dict[int, float] = BalanceSnapshot.raw_balances(
+            session, account_ids, end_date=close_date
+        )
+
+        period_close: PeriodClose = PeriodClose(close_date=close_date)
+        session.add(period_close)
+        session.flush()
+
+        session.add_all(
+            BalanceSnapshot(
+                period_close_id=period_close.id,
+                account_id=account_id,
+                balance=round(balance, 2),
             )
+            for account_id, balance in balances.items()
+        )
+
+        session.commit()
+
+    return dict(
+        message="SUCCESS",
+        close_date=close_date.strftime("%Y-%m-%d"),
+        accounts=len(balances),
+    )
+
+
+def account_balance_history(
+    account_ids: list[int],
+    start_date: datetime,
+    end_date: datetime,
+    interval: str = "month",
+    session: Optional[Session] = None,
+) -> dict:
+    """Return the balance of each of the given accounts at every
+    interval between the start date and the end date.
+
+    The transactions for the accounts are read in a single query and
+    each series is computed from a cumulative sum, so the cost does not
+    depend on the number of points requested.
+
+    Parameters
+    ----------
+        account_ids (list[int]) : The IDs of the accounts to compute the
+            balance history of.
+        start_date (datetime) : The date of the first point in the
+            series.
+        end_date (datetime) : The date of the last point in the series.
+            It is always included, even if it does not fall on an
+            interval.
+        interval (str) : Optional. One of "day", "week", or "month".
+            Defaults to "month".
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
+
+    Returns
+    -------
+        (dict) : A dictionary of the following form:
+            {
+                "message": "SUCCESS",
+                "dates": ["2023-01-01", "2023-02-01", ...],
+                "balances": {account_id: [balance1, balance2, ...]}
+            }
+            where each balance is the same as calling
+            Account.balance(end_date=date) for each of the dates.
+    """
+    if interval not in BALANCE_HISTORY_INTERVALS:
+        return dict(
+            message="ERROR",
+            error=f"Interval must be one of {', '.join(BALANCE_HISTORY_INTERVALS)}.",
+        )
+
+    if start_date > end_date:
+        return dict(
+            message="ERROR",
+            error="The start date must be on or before the end date.",
+        )
+
+    offset: pd.DateOffset = BALANCE_HISTORY_INTERVALS[interval]
 
-        for account in accounts:
-            account_group: str = account.account_type.group_name
-            account_type: str = account.account_type.name
+    points: list[pd.Timestamp] = []
+    point: pd.Timestamp = pd.Timestamp(start_date)
+    while point <= pd.Timestamp(end_date):
+        points.append(point)
+        point = pd.Timestamp(start_date) + offset * len(points)
 
-            account_balances[account_group].setdefault(account_type, dict())
+    if points[-1] != pd.Timestamp(end_date):
+        points.append(pd.Timestamp(end_date))
 
-            account_balances[account_group][account_type][account.name] = [
-                account.balance(
-                    datetime.strptime(date_ranges[i], "%Y-%m-%d"),
-                    datetime.strptime(date_ranges[i + 1], "%Y-%m-%d"),
+    point_index: pd.DatetimeIndex = pd.DatetimeIndex(points)
+
+    with DbSetup.use_session(session, read_only=True) as session:
+        debit_inc_by_id: dict[int, bool] = dict(
+            session.execute(
+                select(Account.id, Account.debit_inc).where(
+                    Account.id.in_(account_ids)
                 )
-                * ((-1) ** (account.debit_inc))
-                for i in range(0, len(date_ranges), 2)
-            ]
+            )
+            .tuples()
+            .all()
+        )
 
-    return account_balances
+        # The balances as of the first point start from the nearest
+        # period close, so only the transactions after it are read.
+        starting_totals: dict[int, float] = BalanceSnapshot.raw_balances(
+            session, account_ids, end_date=start_date
+        )
+
+        archives: list[TransactionArchive] = TransactionArchive.reached_by(
+            session, end_date=end_date, after=start_date
+        )
+
+        with attached_archives(session.connection(), archives) as archive_years:
+            legs_query = Transaction.account_legs(
+                account_ids,
+                end_date=end_date,
+                after=start_date,
+                archive_years=archive_years,
+            )
+            legs_df: pd.DataFrame = pd.read_sql_query(
+                legs_query.order_by(legs_query.selected_columns.transaction_date),
+                session.connection(),
+                parse_dates=["transaction_date"],
+            )
+
+    balances: dict[int, list[float]] = {}
+
+    for account_id, debit_inc in debit_inc_by_id.items():
+        account_legs: pd.DataFrame = legs_df[legs_df["account_id"] == account_id]
+
+        # The balance at each point is the running total at the last
+        # transaction on or before that point, or the opening balance if
+        # there is none.
+        opening: float = starting_totals.get(account_id, 0.0)
+        running_totals: pd.Series = (
+            account_legs["amount"].astype(float).cumsum() + opening
+        )
+        positions = account_legs["transaction_date"].searchsorted(
+            point_index, side="right"
+        )
+
+        sign: int = -1 if debit_inc else 1
+        totals: list[float] = [
+            opening if position == 0 else float(running_totals.iloc[position - 1])
+            for position in positions
+        ]
+        balances[account_id] = [round(sign * total, 2) for total in totals]
+
+    return dict(
+        message="SUCCESS",
+        dates=[point.strftime("%Y-%m-%d") for point in points],
+        balances=balances,
+    )
@@ -0,0 +1,202 @@
+"""ASGI entry point that serves the read endpoints asynchronously.
+
+GET requests to the read endpoints run on SQLAlchemy's asyncio extension
+(aiosqlite), so a single process can serve many concurrent clients
+without a thread per request. Every other request is passed through to
+the Flask app. Requires the "async" extra.
+
+When the app is sharded by user (TENANT_DATABASE), every request is
+passed through, since the async engine only reads the main database.
+"""
+import json
+from typing import Any, Callable, Mapping, Optional
+from urllib.parse import parse_qsl
+
+from flask import Flask
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import MultiDict
+
+from budget_book_backend.accounts.account_routes import (
+    BASE_ACCOUNTS_URL,
+    accounts_response,
+    balance_history_response,
+)
+from budget_book_backend.account_types.account_type_routes import (
+    BASE_ACCOUNT_TYPE_URL,
+    account_types_response,
+)
+from budget_book_backend.backend import create_app
+from budget_book_backend.compression import Compression
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.transactions.transaction_routes import (
+    BASE_TRANSACTION_URL,
+    transactions_response,
+)
+
+ASYNC_READ_ROUTES: dict[
+    str, Callable[[Mapping, Optional[Session]], tuple[str, int]]
+] = {
+    BASE_ACCOUNTS_URL: accounts_response,
+    f"{BASE_ACCOUNTS_URL}/balance-history": balance_history_response,
+    BASE_ACCOUNT_TYPE_URL: account_types_response,
+    BASE_TRANSACTION_URL: transactions_response,
+}
+
+
+class AsyncBackend:
+    """ASGI app that answers the read endpoints with an async database
+    session and hands every other request to the Flask app.
+
+    The read endpoints call the same response functions as the Flask
+    routes, run inside AsyncSession.run_sync, so both paths return the
+    same results. Apps sharded by user hand every request to Flask,
+    which picks the user's database and rejects requests without one.
+    """
+
+    def __init__(self, app: Flask) -> None:
+        try:
+            from asgiref.wsgi import WsgiToAsgi
+        except ImportError as e:
+            raise ImportError(
+                "The async mode requires the 'async' extra. "
+                "Install it with `poetry install --extras async`."
+            ) from e
+
+        self.app: Flask = app
+        self.wsgi_app = WsgiToAsgi(app)
+        self.tenant_sharded: bool = bool(app.config.get("TENANT_DATABASE"))
+
+        # Keep this app's async engine rather than looking it up per
+        # request, since requests are not run inside an app context.
+        with app.app_context():
+            DbSetup.set_async_engine()
+            self.async_engine: AsyncEngine = DbSetup.async_engine
+            self.AsyncSession: async_sessionmaker = DbSetup.AsyncSession
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        response_func = ASYNC_READ_ROUTES.get(scope.get("path", ""))
+
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or response_func is None
+            or self.tenant_sharded
+        ):
+            await self.wsgi_app(scope, receive, send)
+            return
+
+        args: MultiDict = MultiDict(parse_qsl(scope["query_string"].decode()))
+
+        try:
+            async with self.AsyncSession() as session:
+                body, status = await session.run_sync(
+                    lambda sync_session: response_func(args, sync_session)
+                )
+        except Exception as e:
+            body, status = json.dumps(dict(message=str(e))), 500
+
+        accept_encoding: Optional[str] = next(
+            (
+                value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name.lower() == b"accept-encoding"
+            ),
+            None,
+        )
+
+        await self.send_response(send, body, status, accept_encoding)
+
+    async def send_response(
+        self,
+        send: Callable,
+        body: str,
+        status: int,
+        accept_encoding: Optional[str] = None,
+    ) -> None:
+        """Send a complete response with the same headers that Flask
+        uses for the string bodies returned by the routes, compressed
+        the same way as the Flask app's responses.
+
+        Parameters
+        ----------
+            send (Callable) : The ASGI send function.
+            body (str) : The response body.
+            status (int) : The HTTP status code.
+            accept_encoding (str) : Optional. The Accept-Encoding request
+                header.
+        """
+        encoded_body: bytes = body.encode()
+        headers: list[tuple[bytes, bytes]] = [
+            (b"content-type", b"text/html; charset=utf-8"),
+        ]
+
+        if 200 <= status < 300:
+            headers.append((b"vary", b"Accept-Encoding"))
+            encoding: Optional[str] = Compression.choose_encoding(accept_encoding)
+
+            if (
+                encoding is not None
+                and len(encoded_body) >= self.app.config["COMPRESSION_MIN_SIZE"]
+            ):
+                encoded_body = Compression.compress(
+                    self.app.config, encoded_body, encoding
+                )
+                headers.append((b"content-encoding", encoding.encode()))
+
+        headers.append((b"content-length", str(len(encoded_body)).encode()))
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": encoded_body})
+
+    async def lifespan(self, receive: Callable, send: Callable) -> None:
+        """Handle the ASGI lifespan protocol, disposing of the async
+        engine's connection pool on shutdown.
+
+        Parameters
+        ----------
+            receive (Callable) : The ASGI receive function.
+            send (Callable) : The ASGI send function.
+        """
+        while True:
+            message: dict[str, Any] = await receive()
+
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                await self.async_engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(test_config: Optional[Mapping] = None) -> AsyncBackend:
+    """ASGI app function factory definition"""
+    return AsyncBackend(create_app(test_config))
+
+
+def main() -> None:
+    """Create and serve the ASGI app with uvicorn."""
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise ImportError(
+            "The async mode requires the 'async' extra. "
+            "Install it with `poetry install --extras async`."
+        ) from e
+
+    uvicorn.run(create_asgi_app())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,25 @@
+import json
 from os import path
 from typing import Mapping, Optional
+import click
 from flask import Flask
 
 from budget_book_backend.accounts.account_routes import accounts_routes
 from budget_book_backend.account_types.account_type_routes import (
     account_type_routes,
 )
+from budget_book_backend.transactions import GroupCommit
 from budget_book_backend.transactions.transaction_routes import (
     transaction_routes,
 )
+from budget_book_backend.compression import Compression
+from budget_book_backend.jobs import JobRunner, job_routes
+from budget_book_backend.metrics import metrics_routes
 
-from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.db_setup import DbExtension, DbSetup
+from budget_book_backend.models.ledger_index import LedgerIndex
+from budget_book_backend.models.report_cache import ReportCache
+from budget_book_backend.models.write_queue import WriteQueue
 
 
 def create_app(test_config: Optional[Mapping] = None) -> Flask:
@@ -21,18 +30,73 @@ def create_app(test_config: Optional[Mapping] = None) -> Flask:
         SECRET_KEY="dev",
         DATABASE="sqlite:///"
         + path.join(path.dirname(__file__), "models/databases/database.db"),
+        SERVER_BIND="127.0.0.1:8000",
+        # Chosen by the server unless set; see server_options.
+        SERVER_WORKERS=None,
+        SERVER_THREADS=4,
+        SERVER_KEEPALIVE=5,
+        SERVER_TIMEOUT=30,
+        SERVER_GRACEFUL_TIMEOUT=30,
+        LEDGER_INDEX=False,
+        GROUP_COMMIT=False,
+        WRITE_QUEUE=False,
+        REPORT_CACHE=False,
     )
 
+    # Any config value can be overridden with an environment variable,
+    # e.g. BUDGET_BOOKS_SERVER_WORKERS=4
+    app.config.from_prefixed_env("BUDGET_BOOKS")
+
     if test_config:
         app.config.from_mapping(test_config)
 
+    DbSetup.default_extension = DbExtension(app)
+    JobRunner(app)
+    Compression(app)
+
     with app.app_context():
-        DbSetup.set_engine()
         DbSetup.add_tables()
 
+    if app.config["LEDGER_INDEX"]:
+        LedgerIndex(DbSetup.default_extension)
+
+    if app.config["GROUP_COMMIT"]:
+        GroupCommit(app)
+
+    if app.config["WRITE_QUEUE"]:
+        WriteQueue(app)
+
+    if app.config["REPORT_CACHE"]:
+        ReportCache(app)
+
+    @app.cli.command("refresh-replica")
+    def refresh_replica_command() -> None:
+        """Copy the primary database onto the DATABASE_REPLICA."""
+        DbSetup.refresh_replica()
+
+    @app.cli.command("ledger-index-report")
+    def ledger_index_report_command() -> None:
+        """Print how much memory the ledger index holds and which
+        accounts, if any, disagree with the database."""
+        ledger_index: Optional[LedgerIndex] = DbSetup.extension().ledger_index
+
+        if ledger_index is None:
+            raise click.ClickException("LEDGER_INDEX is not enabled.")
+
+        click.echo(
+            json.dumps(
+                dict(
+                    **ledger_index.memory_report(),
+                    mismatched_accounts=ledger_index.check_consistency(),
+                )
+            )
+        )
+
     app.register_blueprint(accounts_routes)
     app.register_blueprint(account_type_routes)
     app.register_blueprint(transaction_routes)
+    app.register_blueprint(job_routes)
+    app.register_blueprint(metrics_routes)
 
     return app
 
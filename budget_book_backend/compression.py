@@ -0,0 +1,227 @@
+"""Compression of the responses negotiated through Accept-Encoding.
+
+Responses are compressed with brotli when the client accepts it and the
+optional brotli package is installed, and with gzip otherwise. Buffered
+responses are only compressed from COMPRESSION_MIN_SIZE bytes, while
+streamed responses, whose size is not known up front, are compressed
+chunk by chunk as they are sent.
+"""
+import gzip
+import zlib
+from typing import Any, Iterable, Iterator, Optional, Protocol
+
+from flask import Flask, Response, current_app, request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# The mimetypes worth compressing. The JSON routes return text/html.
+COMPRESSIBLE_MIMETYPES: tuple[str, ...] = ("text/", "application/json")
+
+
+class StreamCompressor(Protocol):
+    """Compressor of a stream of chunks."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Return the compressed data of the chunk, flushed so that the
+        client can decompress everything sent so far."""
+        ...
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+        ...
+
+
+class GzipCompressor:
+    """Compress a stream of chunks into one gzip member."""
+
+    def __init__(self, level: int) -> None:
+        # A wbits of 31 writes the gzip header and trailer.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    """Compress a stream of chunks into one brotli stream."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class Compression:
+    """Flask extension that compresses the app's responses.
+
+    The level of each encoding is read from COMPRESSION_LEVEL (gzip, 1 to
+    9) and COMPRESSION_BROTLI_LEVEL (brotli, 0 to 11), so CPU time can be
+    traded against bandwidth. Buffered responses smaller than
+    COMPRESSION_MIN_SIZE bytes are sent as they are.
+    """
+
+    name: str = "budget_book_compression"
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Compress the responses of the app and register the extension
+        on the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app whose responses to compress.
+        """
+        app.config.setdefault("COMPRESSION_LEVEL", 6)
+        app.config.setdefault("COMPRESSION_BROTLI_LEVEL", 4)
+        app.config.setdefault("COMPRESSION_MIN_SIZE", 1024)
+
+        app.after_request(self.compress_response)
+        app.extensions[self.name] = self
+
+    @staticmethod
+    def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+        """Return the encoding to compress with, brotli before gzip, or
+        None if the client accepts neither.
+
+        Parameters
+        ----------
+            accept_encoding (str) : The Accept-Encoding request header.
+        """
+        accepted = parse_accept_header(accept_encoding)
+
+        if brotli is not None and accepted.quality("br") > 0:
+            return "br"
+
+        if accepted.quality("gzip") > 0:
+            return "gzip"
+
+        return None
+
+    @staticmethod
+    def compressor(config: Any, encoding: str) -> StreamCompressor:
+        """Return a new stream compressor of the encoding at the level
+        set in the config.
+
+        Parameters
+        ----------
+            config (Config) : The app's config.
+            encoding (str) : "br" or "gzip".
+        """
+        if encoding == "br":
+            return BrotliCompressor(config["COMPRESSION_BROTLI_LEVEL"])
+
+        return GzipCompressor(config["COMPRESSION_LEVEL"])
+
+    @staticmethod
+    def compress(config: Any, data: bytes, encoding: str) -> bytes:
+        """Return the data compressed with the encoding.
+
+        Parameters
+        ----------
+            config (Config) : The app's config.
+            data (bytes) : The data to compress.
+            encoding (str) : "br" or "gzip".
+        """
+        if encoding == "br":
+            return brotli.compress(
+                data, quality=config["COMPRESSION_BROTLI_LEVEL"]
+            )
+
+        return gzip.compress(data, compresslevel=config["COMPRESSION_LEVEL"])
+
+    @classmethod
+    def compress_chunks(
+        cls, config: Any, chunks: Iterable[bytes], encoding: str
+    ) -> Iterator[bytes]:
+        """Yield the compressed data of each chunk as it is read, then the
+        end of the compressed stream.
+
+        Parameters
+        ----------
+            config (Config) : The app's config.
+            chunks (Iterable[bytes]) : The chunks to compress.
+            encoding (str) : "br" or "gzip".
+        """
+        compressor: StreamCompressor = cls.compressor(config, encoding)
+
+        for chunk in chunks:
+            compressed: bytes = compressor.compress(chunk)
+
+            if compressed:
+                yield compressed
+
+        yield compressor.finish()
+
+    @staticmethod
+    def is_compressible(response: Response) -> bool:
+        """Return whether the response should be considered for
+        compression, whatever the client accepts."""
+        return (
+            200 <= response.status_code < 300
+            and response.status_code != 204
+            and not response.direct_passthrough
+            and "Content-Encoding" not in response.headers
+            and (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES)
+        )
+
+    def compress_response(self, response: Response) -> Response:
+        """Compress the response with the encoding the request accepts.
+
+        Parameters
+        ----------
+            response (Response) : The response of the request.
+
+        Returns
+        -------
+            (Response) : The same response, compressed if it could be.
+        """
+        if not self.is_compressible(response):
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        encoding: Optional[str] = self.choose_encoding(
+            request.headers.get("Accept-Encoding")
+        )
+
+        if encoding is None:
+            return response
+
+        config = current_app.config
+
+        if response.is_streamed:
+            chunks: Iterator[bytes] = response.iter_encoded()
+            original = response.response
+
+            if hasattr(original, "close"):
+                response.call_on_close(original.close)
+
+            response.response = self.compress_chunks(config, chunks, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data: bytes = response.get_data()
+
+            if len(data) < config["COMPRESSION_MIN_SIZE"]:
+                return response
+
+            response.set_data(self.compress(config, data, encoding))
+
+        response.headers["Content-Encoding"] = encoding
+
+        return response
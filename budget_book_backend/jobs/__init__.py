@@ -0,0 +1,4 @@
+"""Subpackage for running heavy reports and imports in the background
+and for the routes to submit and poll those jobs."""
+from .job_routes import job_routes
+from .job_services import JobRunner
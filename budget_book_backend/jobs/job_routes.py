@@ -0,0 +1,80 @@
+import json
+
+from flask import Blueprint, current_app
+
+from budget_book_backend.jobs.job_services import JOB_TYPES, JobRunner, get_job
+from budget_book_backend.utils import (
+    endpoint_error_wrapper,
+    validate_and_get_json,
+)
+
+job_routes: Blueprint = Blueprint("jobs", __name__)
+
+BASE_JOB_URL: str = "/api/jobs"
+
+
+def submit_job(job_type: str, params: dict) -> tuple[str, int]:
+    """Submit a job to the current app's job runner and build the
+    response. Used by the jobs route and by the routes that can run
+    their work in the background.
+
+    Parameters
+    ----------
+        job_type (str) : The type of job to run.
+        params (dict) : The JSON parameters of the job.
+
+    Returns
+    -------
+        (tuple[str, int]) : The JSON response with the job ID, and a 202
+            status, or an error and a 400 or 503 status.
+    """
+    if job_type not in JOB_TYPES:
+        return (
+            json.dumps(
+                dict(
+                    message="ERROR",
+                    error=f"Job type must be one of {', '.join(JOB_TYPES)}.",
+                )
+            ),
+            400,
+        )
+
+    runner: JobRunner = current_app.extensions[JobRunner.name]
+
+    response: dict = runner.submit(job_type, params)
+
+    return json.dumps(response), 202 if response["message"] == "SUCCESS" else 503
+
+
+@endpoint_error_wrapper
+@job_routes.route(f"{BASE_JOB_URL}", methods=["POST"])
+def post_job():
+    """Submit a job to run in the background.
+
+    JSON Parameters
+    ---------------
+        job_type (str) : One of "account_net_changes_by_group",
+            "transaction_import", or "match_scan".
+        params (dict) : The parameters of the job.
+
+    Example request.json:
+    {
+        "job_type": "match_scan",
+        "params": {"transaction_ids": [1, 2, 3]}
+    }
+    """
+    request_json: dict = validate_and_get_json()
+
+    return submit_job(
+        request_json.get("job_type", ""), request_json.get("params", {})
+    )
+
+
+@endpoint_error_wrapper
+@job_routes.route(f"{BASE_JOB_URL}/<int:job_id>", methods=["GET"])
+def get_job_status(job_id: int):
+    """Return the status, progress, and result (once finished) of a
+    job."""
+    response: dict = get_job(job_id)
+
+    return json.dumps(response), 200 if response["message"] == "SUCCESS" else 404
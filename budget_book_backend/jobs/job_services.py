@@ -0,0 +1,331 @@
+import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Optional
+
+from flask import Flask
+
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.job import Job
+from budget_book_backend.models.write_queue import serialized_write
+
+# How many transactions an import job commits at a time.
+IMPORT_CHUNK_SIZE: int = 500
+
+
+def run_account_net_changes_by_group(
+    params: dict, report_progress: Callable[[float], None]
+) -> dict:
+    """Run account_net_changes_by_group as a job.
+
+    Parameters
+    ----------
+        params (dict) : The same JSON as POST
+            /api/accounts/balances-by-group, with accountGroups and
+            dateRanges.
+        report_progress (Callable) : Unused; the report is computed in
+            one step.
+
+    Returns
+    -------
+        (dict) : The report.
+    """
+    # Imported here since the account routes import the job routes.
+    from budget_book_backend.accounts.account_services import (
+        account_net_changes_by_group,
+    )
+
+    return account_net_changes_by_group(
+        account_groups=params.get("accountGroups", []),
+        date_ranges=params.get(
+            "dateRanges", [datetime.today().strftime("%Y-%m-%d")]
+        ),
+    )
+
+
+def run_transaction_import(
+    params: dict, report_progress: Callable[[float], None]
+) -> dict:
+    """Add new transactions as a job, committing and reporting progress
+    every IMPORT_CHUNK_SIZE transactions.
+
+    Parameters
+    ----------
+        params (dict) : The same JSON as POST /api/transactions.
+        report_progress (Callable) : Called with the fraction of the
+            transactions that have been added.
+
+    Returns
+    -------
+        (dict) : The overall message and the message of each chunk,
+            with the index of the chunk's first transaction.
+    """
+    # Imported here since the transaction routes import the job routes.
+    from budget_book_backend.transactions.transaction_services import (
+        add_new_transactions,
+    )
+
+    transactions: list[dict] = params.get("transactions", [])
+    chunks: list[dict] = []
+    # Shared by the chunks so that identical lines in different chunks
+    # are not mistaken for duplicates.
+    occurrences: Counter[str] = Counter()
+
+    for first_index in range(0, len(transactions), IMPORT_CHUNK_SIZE):
+        chunk_response: dict = add_new_transactions(
+            transactions[first_index : first_index + IMPORT_CHUNK_SIZE],
+            dry_run=bool(params.get("dry_run", False)),
+            occurrences=occurrences,
+        )
+        chunks.append(dict(first_index=first_index, **chunk_response))
+
+        report_progress(
+            min(first_index + IMPORT_CHUNK_SIZE, len(transactions))
+            / len(transactions)
+        )
+
+    message: str = "SUCCESS"
+
+    if any(chunk["message"] != "SUCCESS" for chunk in chunks):
+        message = "There were some errors processing the transactions."
+
+    return dict(message=message, chunks=chunks)
+
+
+def run_match_scan(params: dict, report_progress: Callable[[float], None]) -> dict:
+    """Find the potential matches of each of the given transactions as
+    a job.
+
+    Parameters
+    ----------
+        params (dict) : The transaction_ids to scan, and optionally the
+            uncategorized_only and day_threshold arguments of
+            find_matches.
+        report_progress (Callable) : Called with the fraction of the
+            transactions that have been scanned.
+
+    Returns
+    -------
+        (dict) : A map of each transaction ID to the IDs of its matches.
+    """
+    # Imported here since the transaction routes import the job routes.
+    from budget_book_backend.transactions.transaction_services import (
+        find_matches,
+    )
+
+    transaction_ids: list[int] = params.get("transaction_ids", [])
+    matches: dict[int, list[int]] = {}
+
+    for i, transaction_id in enumerate(transaction_ids):
+        matches[transaction_id] = list(
+            find_matches(
+                transaction_id,
+                uncategorized_only=params.get("uncategorized_only", True),
+                day_threshold=params.get("day_threshold", 2),
+            )["transaction_ids"]
+        )
+
+        report_progress((i + 1) / len(transaction_ids))
+
+    return dict(message="SUCCESS", matches=matches)
+
+
+JOB_TYPES: dict[str, Callable[[dict, Callable[[float], None]], dict]] = {
+    "account_net_changes_by_group": run_account_net_changes_by_group,
+    "transaction_import": run_transaction_import,
+    "match_scan": run_match_scan,
+}
+
+
+class JobRunner:
+    """Flask extension that runs jobs on a bounded pool of background
+    threads and records their status in the jobs table.
+
+    At most JOB_WORKERS jobs run at once, and at most JOB_MAX_PENDING
+    may be queued or running before new submissions are refused.
+    """
+
+    name: str = "budget_book_jobs"
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.app: Flask
+        self.executor: ThreadPoolExecutor
+        self._slots: threading.BoundedSemaphore
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Create the worker pool from the app's config and register the
+        extension on the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app whose database the jobs use.
+        """
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get("JOB_WORKERS", 2),
+            thread_name_prefix="budget-books-job",
+        )
+        self._slots = threading.BoundedSemaphore(
+            app.config.get("JOB_MAX_PENDING", 100)
+        )
+
+        app.extensions[self.name] = self
+
+    def submit(self, job_type: str, params: dict) -> dict:
+        """Record a new job and queue it to run in the background.
+
+        Parameters
+        ----------
+            job_type (str) : One of the names in JOB_TYPES.
+            params (dict) : The JSON parameters of the job.
+
+        Returns
+        -------
+            (dict) : A message and the ID of the new job, or an error
+                if the job type is unknown or too many jobs are pending.
+        """
+        if job_type not in JOB_TYPES:
+            return dict(
+                message="ERROR",
+                error=f"Job type must be one of {', '.join(JOB_TYPES)}.",
+            )
+
+        if not self._slots.acquire(blocking=False):
+            return dict(
+                message="ERROR",
+                error="Too many jobs are pending. Please try again later.",
+            )
+
+        try:
+            job_id: int = create_job(job_type, params)
+
+            self.executor.submit(
+                self.run, job_id, job_type, params, DbSetup.current_tenant()
+            )
+
+        except Exception:
+            self._slots.release()
+            raise
+
+        return dict(message="SUCCESS", job_id=job_id)
+
+    def run(
+        self, job_id: int, job_type: str, params: dict, tenant_id: Optional[str]
+    ) -> None:
+        """Run a job on a worker thread, recording its progress and
+        result in the jobs table.
+
+        Parameters
+        ----------
+            job_id (int) : The ID of the job.
+            job_type (str) : One of the names in JOB_TYPES.
+            params (dict) : The JSON parameters of the job.
+            tenant_id (str | None) : The user whose database the job was
+                submitted to, if the app is sharded by user.
+        """
+        try:
+            with self.app.app_context(), (
+                DbSetup.use_tenant(tenant_id) if tenant_id else nullcontext()
+            ):
+                update_job(job_id, status="running", started_at=datetime.now())
+
+                try:
+                    result: dict = JOB_TYPES[job_type](
+                        params,
+                        lambda progress: update_job(job_id, progress=progress),
+                    )
+                except Exception as e:
+                    update_job(
+                        job_id,
+                        status="failed",
+                        error=str(e),
+                        finished_at=datetime.now(),
+                    )
+                    return
+
+                update_job(
+                    job_id,
+                    status="succeeded",
+                    progress=1.0,
+                    result=json.dumps(result),
+                    finished_at=datetime.now(),
+                )
+
+        finally:
+            self._slots.release()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and, by default, wait for the running and
+        queued ones to finish."""
+        self.executor.shutdown(wait=wait)
+
+
+@serialized_write
+def create_job(job_type: str, params: dict) -> int:
+    """Record a new queued job.
+
+    Parameters
+    ----------
+        job_type (str) : One of the names in JOB_TYPES.
+        params (dict) : The JSON parameters of the job.
+
+    Returns
+    -------
+        (int) : The ID of the new job.
+    """
+    with DbSetup.Session() as session:
+        job: Job = Job(job_type=job_type, params=json.dumps(params))
+        session.add(job)
+        session.commit()
+
+        return job.id
+
+
+@serialized_write
+def update_job(job_id: int, **fields) -> None:
+    """Set the given fields of a job and commit them.
+
+    Parameters
+    ----------
+        job_id (int) : The ID of the job.
+        **fields : The column values to set.
+    """
+    with DbSetup.Session() as session:
+        job: Job | None = session.get(Job, job_id)
+
+        if job is None:
+            raise Exception(f"Job with ID {job_id} cannot be found.")
+
+        for field, value in fields.items():
+            setattr(job, field, value)
+
+        session.commit()
+
+
+def get_job(job_id: int) -> dict:
+    """Return the status, progress, and result of a job.
+
+    Parameters
+    ----------
+        job_id (int) : The ID of the job.
+
+    Returns
+    -------
+        (dict) : A message and the job's details, or an error if no job
+            has the given ID.
+    """
+    with DbSetup.Session() as session:
+        job: Job | None = session.get(Job, job_id)
+
+        if job is None:
+            return dict(
+                message="ERROR", error=f"Job with ID {job_id} cannot be found."
+            )
+
+        return dict(message="SUCCESS", job=job.to_dict())
@@ -0,0 +1,3 @@
+"""Subpackage for the route that reports the metrics of the app's
+queues and caches."""
+from .metrics_routes import metrics_routes
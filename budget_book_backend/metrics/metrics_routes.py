@@ -0,0 +1,33 @@
+import json
+
+from flask import Blueprint, current_app
+
+from budget_book_backend.utils import endpoint_error_wrapper
+
+from .metrics_services import collect_metrics
+
+metrics_routes: Blueprint = Blueprint("metrics", __name__)
+
+BASE_METRICS_URL: str = "/api/metrics"
+
+
+@endpoint_error_wrapper
+@metrics_routes.route(f"{BASE_METRICS_URL}", methods=["GET"])
+def get_metrics():
+    """Return the stats of the enabled queues and caches, such as the
+    depth of the write queue, keyed by the name of their extension.
+
+    Example response:
+    {
+        "message": "SUCCESS",
+        "metrics": {
+            "budget_book_write_queue": {"depth": 0, "max_depth": 3, ...}
+        }
+    }
+    """
+    return (
+        json.dumps(
+            dict(message="SUCCESS", metrics=collect_metrics(current_app.extensions))
+        ),
+        200,
+    )
@@ -0,0 +1,20 @@
+from typing import Any, Mapping
+
+
+def collect_metrics(extensions: Mapping[str, Any]) -> dict[str, dict]:
+    """Return the stats of each of the app's extensions that keeps any,
+    such as the write queue and the group commit, when enabled.
+
+    Parameters
+    ----------
+        extensions (Mapping) : The app's extensions, by name.
+
+    Returns
+    -------
+        (dict[str, dict]) : The stats of each extension, by its name.
+    """
+    return {
+        name: extension.stats()
+        for name, extension in extensions.items()
+        if callable(getattr(extension, "stats", None))
+    }
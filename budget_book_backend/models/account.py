@@ -1,13 +1,33 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, Optional
 
 if TYPE_CHECKING:
-    from .transaction import Transaction
     from .account_type import AccountType
-
-from sqlalchemy import Boolean, String, ForeignKey
+    from .ledger_index import LedgerIndex
+
+from sqlalchemy import (
+    Boolean,
+    ColumnElement,
+    String,
+    ForeignKey,
+    Integer,
+    Select,
+    case,
+    func,
+    select,
+    union_all,
+)
 from datetime import datetime
-from sqlalchemy.orm import relationship, mapped_column, Mapped
+from sqlalchemy.orm import (
+    relationship,
+    mapped_column,
+    Mapped,
+    WriteOnlyMapped,
+    object_session,
+)
+from .archive import ArchivedBalance
 from .db_setup import DbSetup
+from .period_close import BalanceSnapshot
+from .transaction import Transaction
 
 
 class Account(DbSetup.Base):
@@ -30,9 +50,29 @@ class Account(DbSetup.Base):
         backref="accts",
     )
     debit_inc: Mapped[bool] = mapped_column(Boolean)
-
-    # Also has properties debit_transactions and credit_transactions for
-    # the transactions that change the account balance.
+    # Incremented by every update, which only applies if the row still
+    # has the version it was read with. See check_version.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # The transactions that change the account balance. They are never
+    # loaded as a whole; select from them to run filtered queries. When
+    # an account is deleted, delete_account uncategorizes them itself.
+    debit_transactions: WriteOnlyMapped["Transaction"] = relationship(
+        "Transaction",
+        foreign_keys="Transaction.debit_account_id",
+        back_populates="debit_account",
+        lazy="write_only",
+        passive_deletes=True,
+    )
+    credit_transactions: WriteOnlyMapped["Transaction"] = relationship(
+        "Transaction",
+        foreign_keys="Transaction.credit_account_id",
+        back_populates="credit_account",
+        lazy="write_only",
+        passive_deletes=True,
+    )
 
     def balance(
         self,
@@ -43,6 +83,11 @@ class Account(DbSetup.Base):
         given dates by calculating:
         (-1*debit_inc)*(sum(credit_transactions) - sum(debit_transactions)).
 
+        When starting from the earliest date, the balance starts from
+        the snapshot of the nearest closed period so that only the
+        transactions after it are summed. If the ledger index is enabled,
+        it is used instead.
+
         Parameters
         -----------
             start_date (datetime) : Optional. The starting date when the
@@ -59,45 +104,66 @@ class Account(DbSetup.Base):
             account_balance (float) : The net change of the account
                 balance within the given timeframe.
         """
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
 
-        def transaction_filter(transaction) -> float:
-            """Returns the amount of the transaction if within the given
-            dates, otherwise returns 0.
-
-            Parameters
-            ----------
-                transaction (Transaction) : The transaction to check
-                    whether it's within the given dates.
-
-            Returns
-            -------
-                (float) : The amount of the transaction. If not within
-                    the given dates, returns 0.
-            """
-
-            if (
-                transaction.credit_account_id is None
-                or transaction.debit_account_id is None
-            ):
-                return 0.0
-
-            t_date = transaction.transaction_date
-            if t_date >= start_date and t_date <= end_date:
-                return transaction.amount
-
-            return 0.0
-
-        final_balance: float = round(
-            sum(map(transaction_filter, self.credit_transactions))
-            - sum(map(transaction_filter, self.debit_transactions)),
-            2,
-        )
+        if ledger_index is not None:
+            raw_balance: float = ledger_index.balance(self.id, start_date, end_date)
+        else:
+            with DbSetup.use_session(object_session(self)) as session:
+                raw_balance = BalanceSnapshot.raw_balances(
+                    session,
+                    [self.id],
+                    end_date,
+                    None if start_date == datetime(1, 1, 1) else start_date,
+                )[self.id]
+
+        final_balance: float = round(raw_balance, 2)
 
         if self.debit_inc:
             return -final_balance
 
         return final_balance
 
+    @classmethod
+    def balance_expression(
+        cls,
+        start_date: datetime = datetime(1, 1, 1),
+        end_date: datetime = datetime.now(),
+        archive_years: Iterable[int] = (),
+    ) -> ColumnElement[float]:
+        """Return the net change balance of each account between the two
+        given dates as a correlated SQL expression, the same value as
+        Account.balance before rounding, so that accounts can be filtered
+        and sorted by their balance in the database.
+
+        Parameters
+        -----------
+            start_date (datetime) : Optional. The starting date when the
+                account balance will be considered 0.
+            end_date (datetime) : Optional. The date to calculate the
+                account balance change up to.
+            archive_years (Iterable[int]) : Optional. The years of the
+                archives within the dates, which must be attached to the
+                connection the expression is executed on.
+
+        Returns
+        -------
+            (ColumnElement[float]) : The balance expression, unrounded.
+        """
+        legs = Transaction.account_legs(
+            start_date=None if start_date == datetime(1, 1, 1) else start_date,
+            end_date=end_date,
+            archive_years=archive_years,
+        ).subquery()
+
+        raw_balance = (
+            select(func.coalesce(func.sum(legs.c.amount), 0.0))
+            .where(legs.c.account_id == cls.id)
+            .scalar_subquery()
+        )
+
+        return case((cls.debit_inc, -raw_balance), else_=raw_balance)
+
     def uncategorized_transactions(
         self,
         start_date: datetime = datetime(1, 1, 1),
@@ -120,40 +186,45 @@ class Account(DbSetup.Base):
             uncategorized_transactions (list of Transactions): The list
                 of transaction objects that are uncategorized.
         """
+        with DbSetup.use_session(object_session(self)) as session:
+            return [
+                transaction
+                for query in self._uncategorized_queries(start_date, end_date)
+                for transaction in session.scalars(query)
+            ]
+
+    def uncategorized_count(
+        self,
+        start_date: datetime = datetime(1, 1, 1),
+        end_date: datetime = datetime.now(),
+    ) -> int:
+        """Return the number of uncategorized transactions within the
+        given timeframe, from the ledger index if it is enabled.
 
-        def transaction_filter(transaction: "Transaction") -> bool:
-            """Returns True if the transaction is within the given
-            dates and is uncategorized, otherwise returns False.
-
-            Parameters
-            ----------
-                transaction (Transaction) : The transaction to check
-                    whether it's within the given dates.
-
-            Returns
-            -------
-                (bool) : Whether the transaction is within the given
-                    dates or not.
-            """
-            # Required type conversion for mypy type checking
-            t_date: datetime = datetime.fromisoformat(
-                str(transaction.transaction_date)
-            )
-            if t_date >= start_date and t_date <= end_date:
-                # Since it's associated with this account, only one or
-                # the other will be None if uncategorized.
-                return (
-                    transaction.credit_account_id is None
-                    or transaction.debit_account_id is None
-                )
-
-            return False
-
-        uncategorized_transactions: list["Transaction"] = list(
-            filter(transaction_filter, self.credit_transactions)
-        ) + list(filter(transaction_filter, self.debit_transactions))
-
-        return uncategorized_transactions
+        Parameters
+        ----------
+            start_date (datetime) : Optional. The starting date when the
+                transactions will start to be considered.
+                If not given, defaults to the earliest datetime Python
+                allows.
+            end_date (datetime) : Optional. The date to count the
+                transactions up to. If not given, it defaults to now.
+
+        Returns
+        -------
+            (int) : The number of uncategorized transactions.
+        """
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
+
+        if ledger_index is not None:
+            return ledger_index.uncategorized_count(self.id, start_date, end_date)
+
+        uncategorized = union_all(
+            *self._uncategorized_queries(start_date, end_date)
+        ).subquery()
+
+        with DbSetup.use_session(object_session(self)) as session:
+            return session.scalar(select(func.count()).select_from(uncategorized)) or 0
 
     def last_updated(self) -> datetime:
         """Returns the date that the account was last updated (based on
@@ -166,26 +237,56 @@ class Account(DbSetup.Base):
                 changes the account's balance. If no transactions are
                 associated with the account, returns today's date.
         """
-        if (
-            len(self.credit_transactions) == 0
-            and len(self.debit_transactions) == 0
-        ):
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
+
+        if ledger_index is not None:
+            return ledger_index.last_updated(self.id) or datetime.now()
+
+        latest_date = func.max(Transaction.transaction_date)
+
+        with DbSetup.use_session(object_session(self)) as session:
+            latest_dates: list = [
+                session.scalar(
+                    self.credit_transactions.select().with_only_columns(latest_date)
+                ),
+                session.scalar(
+                    self.debit_transactions.select().with_only_columns(latest_date)
+                ),
+                # Archived years keep the latest date of each account.
+                session.scalar(
+                    select(func.max(ArchivedBalance.last_transaction_date)).where(
+                        ArchivedBalance.account_id == self.id
+                    )
+                ),
+            ]
+
+        transaction_dates: list[datetime] = [
+            date for date in latest_dates if date is not None
+        ]
+
+        if not transaction_dates:
             return datetime.now()
 
-        credit_transactions_latest: datetime = datetime(1, 1, 1)
-        debit_transactions_latest: datetime = datetime(1, 1, 1)
-
-        if self.credit_transactions:
-            credit_transactions_latest = max(
-                [t.transaction_date for t in self.credit_transactions]
-            )
+        return max(transaction_dates)
 
-        if self.debit_transactions:
-            debit_transactions_latest = max(
-                [t.transaction_date for t in self.debit_transactions]
-            )
+    def _uncategorized_queries(
+        self, start_date: datetime, end_date: datetime
+    ) -> tuple[Select, Select]:
+        """Return the queries of the account's uncategorized credit and
+        debit transactions within the given timeframe."""
+        in_timeframe = (
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date <= end_date,
+        )
 
-        return max(credit_transactions_latest, debit_transactions_latest)
+        return (
+            self.credit_transactions.select().where(
+                Transaction.debit_account_id.is_(None), *in_timeframe
+            ),
+            self.debit_transactions.select().where(
+                Transaction.credit_account_id.is_(None), *in_timeframe
+            ),
+        )
 
     def __repr__(self):
         return (
@@ -0,0 +1,189 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    Subquery,
+    case,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from .account import Account
+from .archive import ArchivedBalance
+from .db_setup import DbSetup
+from .posting import Posting
+from .transaction import Transaction
+
+
+class AccountSummary(DbSetup.Base):
+    """ORM for the denormalized all-time summary of each account.
+
+    Each summary holds the account's balance, number of uncategorized
+    transactions, date of its latest transaction, and number of
+    transactions, so that the accounts list can be read without walking
+    every account's transaction history. The transaction and account
+    write services keep the summaries in sync by calling refresh.
+    """
+
+    __tablename__ = "account_summaries"
+
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("accounts.id"), primary_key=True
+    )
+    balance: Mapped[float] = mapped_column(Float, default=0.0)
+    uncategorized_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_transaction_date: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+    transaction_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    @classmethod
+    def refresh(
+        cls, session: Session, account_ids: Optional[Iterable[int | None]] = None
+    ) -> None:
+        """Recompute the summaries of the given accounts with a single
+        aggregate query and stage them in the session. The caller is
+        responsible for committing.
+
+        Parameters
+        ----------
+            session (Session) : The session to write the summaries in.
+            account_ids (Iterable[int | None]) : Optional. The accounts
+                whose transactions changed. None values are ignored. If
+                not given, every account's summary is rebuilt.
+        """
+        ids: Optional[set[int]] = None
+
+        if account_ids is not None:
+            ids = {account_id for account_id in account_ids if account_id}
+
+            if not ids:
+                return
+
+        # Flush the pending transaction changes so that the triggers write
+        # their postings before they are read.
+        session.flush()
+
+        legs_query = select(
+            Posting.account_id.label("account_id"),
+            Posting.amount.label("amount"),
+            Posting.categorized.is_(False).label("uncategorized"),
+            Posting.transaction_date.label("transaction_date"),
+        )
+        accounts_query = select(Account.id, Account.debit_inc)
+
+        if ids is not None:
+            legs_query = legs_query.where(Posting.account_id.in_(ids))
+            accounts_query = accounts_query.where(Account.id.in_(ids))
+
+        legs = legs_query.subquery("legs")
+
+        totals_query = select(
+            legs.c.account_id,
+            func.coalesce(
+                func.sum(case((legs.c.uncategorized, 0.0), else_=legs.c.amount)),
+                0.0,
+            ),
+            func.sum(case((legs.c.uncategorized, 1), else_=0)),
+            func.max(legs.c.transaction_date),
+            func.count(),
+        ).group_by(legs.c.account_id)
+
+        totals: dict[int, tuple] = {
+            row[0]: tuple(row[1:]) for row in session.execute(totals_query)
+        }
+
+        # Archived years are all categorized, so they only add to the
+        # balance, the transaction count, and the latest date.
+        archived_query = select(
+            ArchivedBalance.account_id,
+            func.sum(ArchivedBalance.balance),
+            func.max(ArchivedBalance.last_transaction_date),
+            func.sum(ArchivedBalance.transaction_count),
+        ).group_by(ArchivedBalance.account_id)
+
+        if ids is not None:
+            archived_query = archived_query.where(ArchivedBalance.account_id.in_(ids))
+
+        for account_id, balance, last_date, count in session.execute(archived_query):
+            hot_balance, uncategorized_count, hot_last_date, hot_count = totals.get(
+                account_id, (0.0, 0, None, 0)
+            )
+            totals[account_id] = (
+                hot_balance + balance,
+                uncategorized_count,
+                max(str(date) for date in (hot_last_date, last_date) if date),
+                hot_count + count,
+            )
+
+        if ids is None:
+            session.execute(delete(AccountSummary))
+        else:
+            session.execute(
+                delete(AccountSummary).where(AccountSummary.account_id.in_(ids))
+            )
+
+        for account_id, debit_inc in session.execute(accounts_query):
+            balance, uncategorized_count, last_date, count = totals.get(
+                account_id, (0.0, 0, None, 0)
+            )
+
+            session.add(
+                AccountSummary(
+                    account_id=account_id,
+                    balance=round(-balance if debit_inc else balance, 2),
+                    uncategorized_count=uncategorized_count,
+                    last_transaction_date=(
+                        datetime.fromisoformat(str(last_date)) if last_date else None
+                    ),
+                    transaction_count=count,
+                )
+            )
+
+    @classmethod
+    def changes_after(cls, date: datetime) -> Subquery:
+        """Return a subquery of what each account's transactions dated
+        after the given date add to its summary, so that future-dated
+        transactions can be taken out of it.
+
+        The transactions are found with the transactions' date index,
+        so the subquery only reads the transactions after the date.
+
+        Parameters
+        ----------
+            date (datetime) : The last date to keep in the summaries.
+
+        Returns
+        -------
+            (Subquery) : A subquery with the columns account_id, amount
+                (the credits minus the debits of the categorized
+                transactions, before they are negated for debit increase
+                accounts), and uncategorized_count.
+        """
+        return (
+            select(
+                Posting.account_id.label("account_id"),
+                func.sum(case((Posting.categorized, Posting.amount), else_=0.0)).label(
+                    "amount"
+                ),
+                func.sum(case((Posting.categorized, 0), else_=1)).label(
+                    "uncategorized_count"
+                ),
+            )
+            .join(Transaction, Transaction.id == Posting.transaction_id)
+            .where(Transaction.transaction_date > date)
+            .group_by(Posting.account_id)
+            .subquery("changes_after")
+        )
+
+    def __repr__(self):
+        return (
+            f"<AccountSummary account_id={self.account_id} "
+            f"balance={self.balance}>"
+        )
@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from datetime import datetime
+from os import path
+from typing import Iterator, Optional
+
+from sqlalchemy import Connection, DateTime, ForeignKey, Float, Integer, String, select
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from .db_setup import DbSetup
+
+
+class TransactionArchive(DbSetup.Base):
+    """ORM for the yearly archives of old transactions.
+
+    Archiving a year moves its transactions out of the transactions
+    table into their own SQLite file, which is only attached to a
+    connection when a query's date range reaches the year. The balance
+    each account had from the year is left behind in ArchivedBalances.
+    """
+
+    __tablename__ = "transaction_archives"
+
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    path: Mapped[str] = mapped_column(String)
+    first_transaction_date: Mapped[datetime] = mapped_column(DateTime)
+    last_transaction_date: Mapped[datetime] = mapped_column(DateTime)
+    transaction_count: Mapped[int] = mapped_column(Integer, default=0)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+    @classmethod
+    def archive_path(cls, database_path: str, year: int) -> str:
+        """Return the path of the archive file of the given year, which
+        sits next to the database it was archived from.
+
+        Parameters
+        ----------
+            database_path (str) : The path of the database file.
+            year (int) : The year of the archive.
+        """
+        stem: str = path.splitext(path.basename(database_path))[0]
+
+        return path.join(
+            path.dirname(path.abspath(database_path)), f"{stem}_archive_{year}.db"
+        )
+
+    @classmethod
+    def reached_by(
+        cls,
+        session: Session,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+    ) -> list["TransactionArchive"]:
+        """Return the archives holding transactions within the given
+        date range, using the same bounds as Transaction.account_legs.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            start_date (datetime) : Optional. The first date of the range.
+            end_date (datetime) : Optional. The last date of the range.
+            after (datetime) : Optional. The range only includes dates
+                strictly after this date.
+
+        Returns
+        -------
+            (list[TransactionArchive]) : The archives, ordered by year.
+        """
+        query = select(cls).order_by(cls.year)
+
+        if start_date is not None:
+            query = query.where(cls.last_transaction_date >= start_date)
+
+        if after is not None:
+            query = query.where(cls.last_transaction_date > after)
+
+        if end_date is not None:
+            query = query.where(cls.first_transaction_date <= end_date)
+
+        return list(session.scalars(query))
+
+    def __repr__(self):
+        return f"<TransactionArchive year={self.year} path={self.path}>"
+
+
+class ArchivedBalance(DbSetup.Base):
+    """ORM for the summary an archived year leaves behind for each
+    account: its credits minus debits, number of transactions, and the
+    date of its latest transaction within the year.
+    """
+
+    __tablename__ = "archived_balances"
+
+    year: Mapped[int] = mapped_column(
+        ForeignKey("transaction_archives.year"), primary_key=True
+    )
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("accounts.id"), primary_key=True
+    )
+    balance: Mapped[float] = mapped_column(Float, default=0.0)
+    transaction_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_transaction_date: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+
+    def __repr__(self):
+        return (
+            f"<ArchivedBalance year={self.year} account_id={self.account_id} "
+            f"balance={self.balance}>"
+        )
+
+
+@contextmanager
+def attached_archives(
+    connection: Connection, archives: list[TransactionArchive]
+) -> Iterator[list[int]]:
+    """Attach the given archives to the connection as archive_<year>
+    for the duration of the block and detach them afterwards.
+
+    SQLite cannot attach or detach databases within a transaction, so
+    this must be used before anything is written on the connection.
+
+    Parameters
+    ----------
+        connection (Connection) : The connection to attach them to.
+        archives (list[TransactionArchive]) : The archives to attach.
+
+    Yields
+    ------
+        (list[int]) : The years of the attached archives, to pass to
+            Transaction.account_legs.
+    """
+    attached: list[int] = []
+
+    try:
+        for archive in archives:
+            connection.exec_driver_sql(
+                f"ATTACH DATABASE ? AS archive_{archive.year}", (archive.path,)
+            )
+            attached.append(archive.year)
+
+        yield attached
+
+    finally:
+        for year in attached:
+            connection.exec_driver_sql(f"DETACH DATABASE archive_{year}")
@@ -1,9 +1,6 @@
 from budget_book_backend.models.account import Account
 from budget_book_backend.models.account_type import AccountType
-from budget_book_backend.models.db_setup import DbSetup
-
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from budget_book_backend.models.db_setup import DbExtension, DbSetup
 
 from collections import namedtuple
 
@@ -95,10 +92,9 @@ DEFAULT_ACCOUNTS: list[Acc] = [
 
 def setup_default_db() -> None:
     """Create a Database and add the models (tables) to it."""
-    DbSetup.engine = create_engine(
-        "sqlite:///budget_book_backend/models/databases/database.db"
+    DbSetup.default_extension = DbExtension(
+        database_url="sqlite:///budget_book_backend/models/databases/database.db"
     )
-    DbSetup.Session = sessionmaker(bind=DbSetup.engine)
     DbSetup.add_tables()
 
     with DbSetup.Session() as session:
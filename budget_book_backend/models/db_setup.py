@@ -1,37 +1,665 @@
-from sqlalchemy import create_engine
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional, cast
+from weakref import WeakSet
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session as sqlaSession
+from sqlalchemy.schema import CreateColumn
 
 from os import path
-from flask import current_app
+from flask import Flask, current_app, g, has_app_context, has_request_context
+from flask import request
+from flask import session as flask_session
+
+DEFAULT_DATABASE_URL: str = "sqlite:///" + path.join(
+    path.dirname(__file__), "databases/database.db"
+)
+
+# The user whose ledger the current context reads and writes, when the
+# app is sharded into one database per user.
+_current_tenant: ContextVar[Optional[str]] = ContextVar(
+    "current_tenant", default=None
+)
+
+TENANT_ID_PATTERN: re.Pattern = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# When the current context last committed a write, so that its reads
+# can be kept on the primary until the replica has caught up.
+_last_write: ContextVar[float] = ContextVar("last_write", default=0.0)
+
+
+def _record_write(session: sqlaSession) -> None:
+    """Remember when a primary session committed, both for the current
+    context and, within a request, for the client's Flask session so
+    that its following requests also read their own writes. Only
+    registered when a DATABASE_REPLICA is configured.
+    """
+    record_write_time(time.time())
+
+
+def record_write_time(written_at: float) -> None:
+    """Remember that the current context and client wrote to the primary
+    at the given time, e.g. when another thread committed their write.
+
+    Parameters
+    ----------
+        written_at (float) : When the write was committed, in seconds
+            since the epoch.
+    """
+    _last_write.set(written_at)
+
+    if has_request_context():
+        flask_session["last_write"] = written_at
+
+
+def _reset_last_write() -> None:
+    """Forget the writes of the previous request handled by the same
+    server thread, so that only the client's own Flask session keeps a
+    new request on the primary. Registered as a before_request hook.
+    """
+    _last_write.set(0.0)
+
+
+def last_write_time() -> float:
+    """Return when the current context or client last wrote to the
+    primary database, or 0 if it has not."""
+    written_at: float = _last_write.get()
+
+    if has_request_context():
+        written_at = max(written_at, flask_session.get("last_write", 0.0))
+
+    return written_at
+
+
+def begin_for_savepoints(session: sqlaSession) -> None:
+    """Begin the session's SQLite transaction now, so that the
+    savepoints of session.begin_nested() are nested inside it.
+
+    pysqlite only begins a transaction before the first write, so a
+    savepoint taken before it starts a transaction of its own, which is
+    committed as soon as the savepoint is released.
+
+    Parameters
+    ----------
+        session (sqlaSession) : The session about to take savepoints.
+    """
+    connection = session.connection()
+
+    if connection.dialect.name != "sqlite":
+        return
+
+    if not connection.connection.driver_connection.in_transaction:  # type: ignore
+        connection.exec_driver_sql("BEGIN")
+
+
+class DbExtension:
+    """Flask extension that owns the database engines and session
+    factories of a single app.
+
+    Each app gets its own connection pools, so several apps can run in
+    one process without sharing an engine. Pools are reset in the child
+    process after a fork, so preforking servers never share pooled
+    SQLite connections between processes.
+    """
+
+    name: str = "budget_book_db"
+
+    # Every live extension, so that their pools can be reset after a fork.
+    instances: "WeakSet[DbExtension]" = WeakSet()
+
+    def __init__(
+        self, app: Optional[Flask] = None, database_url: Optional[str] = None
+    ) -> None:
+        """Create the extension, and its engine if given an app or a
+        database URL.
+
+        Parameters
+        ----------
+            app (Flask) : Optional. The app that owns the engine.
+            database_url (str) : Optional. The URL of the database to
+                use without an app, e.g. in scripts.
+        """
+        self.database_url: str = database_url or DEFAULT_DATABASE_URL
+        self.engine: Engine
+        self.Session: sessionmaker[sqlaSession]
+        self.async_engine: Optional[AsyncEngine] = None
+        self.AsyncSession: Optional[async_sessionmaker[AsyncSession]] = None
+        self.replica_url: Optional[str] = None
+        self.replica_engine: Optional[Engine] = None
+        self.ReplicaSession: Optional[sessionmaker[sqlaSession]] = None
+        self.replica_check_seconds: float = 1.0
+        self._replica_synced_at: Optional[float] = None
+        self._replica_checked_at: float = 0.0
+        self.tenant_url: Optional[str] = None
+        self.max_tenant_engines: int = 32
+        self.tenant_shards: OrderedDict[str, DbExtension] = OrderedDict()
+        self._tenant_lock: threading.Lock = threading.Lock()
+        # The LedgerIndex of the database, if LEDGER_INDEX is enabled.
+        self.ledger_index: Optional[Any] = None
+        # The ReportCache of the database, if REPORT_CACHE is enabled.
+        self.report_cache: Optional[Any] = None
+
+        if app is not None:
+            self.init_app(app)
+        elif database_url is not None:
+            self.create_engine()
+            DbExtension.instances.add(self)
+
+    def init_app(self, app: Flask) -> None:
+        """Create the engines from the app's DATABASE and
+        DATABASE_REPLICA config and register the extension on the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app that owns the engine.
+        """
+        self.database_url = app.config.get("DATABASE", DEFAULT_DATABASE_URL)
+        self.replica_url = app.config.get("DATABASE_REPLICA")
+        self.replica_check_seconds = app.config.get(
+            "DATABASE_REPLICA_CHECK_SECONDS", 1.0
+        )
+        self.tenant_url = app.config.get("TENANT_DATABASE")
+        self.max_tenant_engines = app.config.get("TENANT_MAX_ENGINES", 32)
+        self.create_engine()
+
+        if app.extensions.get(self.name) is not self:
+            app.before_request(_reset_last_write)
+
+            if self.tenant_url:
+                app.before_request(self.set_request_tenant)
+                app.teardown_request(self.reset_request_tenant)
+
+        app.extensions[self.name] = self
+        DbExtension.instances.add(self)
+
+    def create_engine(self) -> None:
+        """(Re)create the engines and rebind the session factories,
+        disposing of the previous engines' pools if there were any.
+        """
+        if hasattr(self, "engine"):
+            self.dispose()
+
+        for shard in self.tenant_shards.values():
+            shard.dispose()
 
+        self.tenant_shards.clear()
 
-class DbSetup:
+        self.engine = create_engine(self.database_url, echo=True)
+        self.Session = sessionmaker(bind=self.engine)
+
+        if self.ledger_index is not None:
+            self.ledger_index.listen(self.Session)
+            self.ledger_index.build()
+
+        if self.report_cache is not None:
+            self.report_cache.listen(self.Session)
+            self.report_cache.clear()
+
+        self.replica_engine = None
+        self.ReplicaSession = None
+        self._replica_synced_at = None
+        self._replica_checked_at = 0.0
+
+        if self.replica_url:
+            self.replica_engine = create_engine(self.replica_url, echo=True)
+            self.ReplicaSession = sessionmaker(bind=self.replica_engine)
+            # Only reads that may go to the replica need to know when
+            # their client last wrote.
+            event.listen(self.Session, "after_commit", _record_write)
+
+    def for_tenant(self, tenant_id: str) -> "DbExtension":
+        """Return the extension of the given user's own database,
+        opening it and creating its tables on first use.
+
+        At most TENANT_MAX_ENGINES shards are kept open; the least
+        recently used one is disposed of when another is opened.
+
+        Parameters
+        ----------
+            tenant_id (str) : The ID of the user whose ledger to use.
+
+        Returns
+        -------
+            (DbExtension) : The extension owning the user's engine.
+        """
+        if self.tenant_url is None:
+            return self
+
+        with self._tenant_lock:
+            shard: Optional[DbExtension] = self.tenant_shards.get(tenant_id)
+
+            if shard is not None:
+                self.tenant_shards.move_to_end(tenant_id)
+                return shard
+
+            shard_url: str = self.tenant_url.format(user_id=tenant_id)
+            shard_path: Optional[str] = make_url(shard_url).database
+
+            if shard_path:
+                os.makedirs(path.dirname(path.abspath(shard_path)), exist_ok=True)
+
+            shard = DbExtension(database_url=shard_url)
+            shard.create_tables()
+
+            self.tenant_shards[tenant_id] = shard
+
+            if len(self.tenant_shards) > self.max_tenant_engines:
+                _, evicted = self.tenant_shards.popitem(last=False)
+                evicted.dispose()
+
+            return shard
+
+    def set_request_tenant(self) -> Optional[tuple[str, int]]:
+        """Route the current request to the database of the user given
+        by the X-User-Id header, or the user_id URL argument or JSON
+        field. Registered as a before_request hook when TENANT_DATABASE
+        is configured.
+
+        Returns
+        -------
+            (tuple[str, int] | None) : An error response if the request
+                did not include a valid user ID.
+        """
+        user_id = request.headers.get("X-User-Id") or request.args.get("user_id")
+
+        if user_id is None:
+            request_json = request.get_json(silent=True)
+            if isinstance(request_json, dict):
+                user_id = request_json.get("user_id")
+
+        if user_id is None or not TENANT_ID_PATTERN.match(str(user_id)):
+            return (
+                json.dumps(
+                    dict(message="ERROR", error="A valid user_id is required.")
+                ),
+                400,
+            )
+
+        g.tenant_token = _current_tenant.set(str(user_id))
+
+        return None
+
+    def reset_request_tenant(self, exception: Optional[BaseException]) -> None:
+        """Clear the current request's user once it is finished."""
+        tenant_token = g.pop("tenant_token", None)
+
+        if tenant_token is not None:
+            _current_tenant.reset(tenant_token)
+
+    def read_sessionmaker(self) -> sessionmaker[sqlaSession]:
+        """Return the session factory that read only services should
+        use: the replica's, unless the current context or client has
+        written to the primary since the replica was last refreshed.
+
+        Returns
+        -------
+            (sessionmaker) : The replica or primary session factory.
+        """
+        if self.ReplicaSession is None:
+            return self.Session
+
+        synced_at: Optional[float] = self.replica_synced_at()
+
+        if synced_at is None or last_write_time() > synced_at:
+            return self.Session
+
+        return self.ReplicaSession
+
+    def replica_synced_at(self) -> Optional[float]:
+        """Return when the replica was last refreshed, re-reading it from
+        the replica at most every DATABASE_REPLICA_CHECK_SECONDS so that
+        refreshes made by other processes are seen.
+
+        Returns
+        -------
+            (float | None) : The time of the last refresh, or None if the
+                replica has never been refreshed.
+        """
+        if self.replica_engine is None:
+            return None
+
+        now: float = time.monotonic()
+
+        if now - self._replica_checked_at >= self.replica_check_seconds:
+            with self.replica_engine.connect() as connection:
+                try:
+                    self._replica_synced_at = connection.exec_driver_sql(
+                        "SELECT synced_at FROM replica_sync"
+                    ).scalar()
+                except Exception:
+                    self._replica_synced_at = None
+
+            self._replica_checked_at = now
+
+        return self._replica_synced_at
+
+    def refresh_replica(self) -> None:
+        """Copy the primary SQLite database onto the replica with the
+        SQLite online backup API and record when the copy was taken.
+
+        The recorded time is taken before the copy starts, so writes
+        made during the copy keep their clients on the primary until
+        the next refresh.
+        """
+        if self.replica_engine is None:
+            raise RuntimeError("No DATABASE_REPLICA is configured.")
+
+        synced_at: float = time.time()
+
+        replica_path: Optional[str] = self.replica_engine.url.database
+
+        with closing(self.engine.raw_connection()) as source:
+            with closing(sqlite3.connect(str(replica_path))) as replica:
+                cast(sqlite3.Connection, source.driver_connection).backup(
+                    replica
+                )
+
+                replica.execute(
+                    "CREATE TABLE IF NOT EXISTS replica_sync (synced_at REAL)"
+                )
+                replica.execute("DELETE FROM replica_sync")
+                replica.execute(
+                    "INSERT INTO replica_sync (synced_at) VALUES (?)", (synced_at,)
+                )
+                replica.commit()
+
+        self._replica_synced_at = synced_at
+        self._replica_checked_at = time.monotonic()
+
+    def create_async_engine(self, database_url: Optional[str] = None) -> None:
+        """Create the asyncio engine and async session factory.
+
+        Parameters
+        ----------
+            database_url (str) : Optional. The URL of the async engine.
+                Defaults to the app's database using the aiosqlite
+                driver.
+        """
+        self.async_engine = create_async_engine(
+            database_url
+            or str(make_url(self.database_url).set(drivername="sqlite+aiosqlite"))
+        )
+        self.AsyncSession = async_sessionmaker(bind=self.async_engine)
+
+    def create_tables(self) -> None:
+        """Create the tables of the models that inherit from
+        DbSetup.Base, along with any columns and indexes missing from
+        tables that already exist.
+        """
+        self.add_missing_columns()
+
+        DbSetup.Base.metadata.create_all(self.engine)
+
+        # create_all skips the indexes of tables it does not create.
+        for table in DbSetup.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
+
+    def add_missing_columns(self) -> None:
+        """Add the columns of the models that are missing from tables
+        that already exist, such as a column added to a model after the
+        database was created. Their values are left null, or set to the
+        column's server default.
+
+        Raises
+        ------
+            (RuntimeError) when a missing column cannot be null and has no
+                server default, since it cannot be added to the existing
+                rows.
+        """
+        with self.engine.begin() as connection:
+            inspector = inspect(connection)
+            existing_tables: set[str] = set(inspector.get_table_names())
+
+            for table in DbSetup.Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+
+                existing_columns: set[str] = {
+                    column["name"] for column in inspector.get_columns(table.name)
+                }
+
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+
+                    if not column.nullable and column.server_default is None:
+                        raise RuntimeError(
+                            f"Cannot add the column {table.name}.{column.name} "
+                            "to the existing rows since it is not nullable."
+                        )
+
+                    column_ddl = CreateColumn(column).compile(
+                        dialect=connection.dialect
+                    )
+                    connection.execute(
+                        text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                    )
+
+    def dispose(self) -> None:
+        """Close every pooled connection of the engines."""
+        self.engine.dispose()
+
+        if self.replica_engine is not None:
+            self.replica_engine.dispose()
+
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        """Drop the pooled connections inherited from the parent process
+        without closing them, since the parent may still be using them.
+        New connections are opened by the child on demand.
+        """
+        self.engine.dispose(close=False)
+
+        if self.replica_engine is not None:
+            self.replica_engine.dispose(close=False)
+
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose(close=False)
+
+
+def dispose_all_engines() -> None:
+    """Close the pooled connections of every extension, e.g. when a
+    server worker shuts down."""
+    for extension in list(DbExtension.instances):
+        extension.dispose()
+
+
+def _reset_engines_after_fork() -> None:
+    """Reset the pools of every extension in a newly forked child."""
+    for extension in list(DbExtension.instances):
+        extension.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+class _DbSetupMeta(type):
+    """Resolve DbSetup.engine and DbSetup.Session to the engine of the
+    current app, so that existing code keeps using them unchanged.
+    """
+
+    @property
+    def engine(cls) -> Engine:
+        return DbSetup.extension().engine
+
+    @property
+    def Session(cls) -> sessionmaker[sqlaSession]:
+        return DbSetup.extension().Session
+
+    @property
+    def ReadSession(cls) -> sessionmaker[sqlaSession]:
+        return DbSetup.extension().read_sessionmaker()
+
+    @property
+    def async_engine(cls) -> AsyncEngine:
+        async_engine: Optional[AsyncEngine] = DbSetup.extension().async_engine
+
+        if async_engine is None:
+            raise RuntimeError("The async engine has not been set up.")
+
+        return async_engine
+
+    @property
+    def AsyncSession(cls) -> async_sessionmaker[AsyncSession]:
+        async_session: Optional[
+            async_sessionmaker[AsyncSession]
+        ] = DbSetup.extension().AsyncSession
+
+        if async_session is None:
+            raise RuntimeError("The async engine has not been set up.")
+
+        return async_session
+
+
+class DbSetup(metaclass=_DbSetupMeta):
     """Namespace for database setup functions"""
 
-    engine: Engine
     Base = declarative_base()
-    Session: sessionmaker[sqlaSession]
+
+    # The extension used outside of an app context, e.g. by scripts and
+    # tests that call the services directly. It is the most recently set
+    # up one.
+    default_extension: Optional[DbExtension] = None
+
+    @classmethod
+    def extension(cls) -> DbExtension:
+        """Return the database extension of the current app, or the
+        default extension when there is no app context. When the app is
+        sharded by user and a user is set, returns that user's shard.
+
+        Returns
+        -------
+            (DbExtension) : The extension owning the engine to use.
+
+        Raises
+        ------
+            (RuntimeError) when no engine has been set up yet.
+        """
+        extension: Optional[DbExtension] = DbSetup.default_extension
+
+        if has_app_context() and DbExtension.name in current_app.extensions:
+            extension = current_app.extensions[DbExtension.name]
+
+        if extension is None:
+            raise RuntimeError(
+                "No database engine has been set up. Create the app first."
+            )
+
+        tenant_id: Optional[str] = _current_tenant.get()
+
+        if tenant_id is not None:
+            return extension.for_tenant(tenant_id)
+
+        return extension
+
+    @classmethod
+    def current_tenant(cls) -> Optional[str]:
+        """Return the ID of the user whose database is in use, if the
+        app is sharded by user."""
+        return _current_tenant.get()
+
+    @classmethod
+    @contextmanager
+    def use_tenant(cls, user_id: int | str) -> Iterator[None]:
+        """Use the given user's database within the block, for code that
+        runs outside of a request, such as scripts and tests.
+
+        Parameters
+        ----------
+            user_id (int | str) : The ID of the user whose ledger to use.
+        """
+        token = _current_tenant.set(str(user_id))
+
+        try:
+            yield
+        finally:
+            _current_tenant.reset(token)
 
     @classmethod
     def set_engine(cls):
-        """Set the SQL Alchemy engine according to the given engine_name
-        and rebind the session.
-        """
-        database_url: str = current_app.config.get(
-            "DATABASE",
-            "sqlite:///"
-            + path.join(
-                path.dirname(__file__), "models/databases/database.db"
-            ),
+        """Set the SQL Alchemy engine of the current app according to
+        its DATABASE config and rebind the session.
+        """
+        extension: Optional[DbExtension] = current_app.extensions.get(
+            DbExtension.name
+        )
+
+        if extension is None:
+            extension = DbExtension(current_app)
+        else:
+            extension.init_app(current_app)
+
+        DbSetup.default_extension = extension
+
+    @classmethod
+    def set_async_engine(cls):
+        """Set the asyncio SQL Alchemy engine used by the ASGI app and
+        rebind the async session.
+
+        The engine points at the same database as DbSetup.engine, using
+        the aiosqlite driver unless ASYNC_DATABASE is configured.
+        """
+        DbSetup.extension().create_async_engine(
+            current_app.config.get("ASYNC_DATABASE")
         )
-        DbSetup.engine = create_engine(database_url, echo=True)
-        DbSetup.Session = sessionmaker(bind=DbSetup.engine)
+
+    @classmethod
+    @contextmanager
+    def use_session(
+        cls, session: Optional[sqlaSession] = None, read_only: bool = False
+    ) -> Iterator[sqlaSession]:
+        """Yield the given session, or a new session that is closed on
+        exit if none is given. Lets the read services run either on
+        their own or inside a session owned by the caller, such as the
+        synchronous view of an async session.
+
+        Parameters
+        ----------
+            session (Session) : Optional. The session to use. It is not
+                closed on exit.
+            read_only (bool) : Optional. Whether the new session will
+                only read, in which case it may be opened on the read
+                replica. Defaults to False.
+        """
+        if session is not None:
+            yield session
+            return
+
+        Session: sessionmaker[sqlaSession] = (
+            DbSetup.ReadSession if read_only else DbSetup.Session
+        )
+
+        with Session() as new_session:
+            yield new_session
+
+    @classmethod
+    def refresh_replica(cls):
+        """Copy the primary database onto the read replica."""
+        DbSetup.extension().refresh_replica()
 
     @classmethod
     def add_tables(cls):
         """Add the tables to the database based on the models that
-        inherit from DbSetup.Base.
+        inherit from DbSetup.Base, then copy them onto the read replica
+        if there is one.
         """
-        DbSetup.Base.metadata.create_all(DbSetup.engine)
+        DbSetup.extension().create_tables()
+
+        if DbSetup.extension().replica_engine is not None:
+            DbSetup.refresh_replica()
@@ -0,0 +1,55 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .db_setup import DbSetup
+
+
+class Job(DbSetup.Base):
+    """ORM for background jobs.
+
+    Each job has a type, the JSON parameters it was submitted with, a
+    status of "queued", "running", "succeeded", or "failed", and its
+    progress from 0 to 1. Once finished, it holds either its JSON result
+    or the error that stopped it.
+    """
+
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_type: Mapped[str] = mapped_column(String(120))
+    status: Mapped[str] = mapped_column(String(20), default="queued")
+    progress: Mapped[float] = mapped_column(Float, default=0.0)
+    params: Mapped[str] = mapped_column(Text, default="{}")
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+
+    def to_dict(self) -> dict:
+        """Return the job as a JSON serializable dictionary."""
+        return dict(
+            id=self.id,
+            job_type=self.job_type,
+            status=self.status,
+            progress=self.progress,
+            params=json.loads(self.params),
+            result=json.loads(self.result) if self.result else None,
+            error=self.error,
+            created_at=self.created_at.isoformat(),
+            started_at=self.started_at.isoformat() if self.started_at else None,
+            finished_at=(
+                self.finished_at.isoformat() if self.finished_at else None
+            ),
+        )
+
+    def __repr__(self):
+        return f"<Job id={self.id} type={self.job_type}, status={self.status}>"
@@ -0,0 +1,572 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import event, func, inspect, or_, select, union_all
+from sqlalchemy.orm import InstanceState, Session, sessionmaker
+
+if TYPE_CHECKING:
+    from .db_setup import DbExtension
+
+from .account import Account
+from .archive import ArchivedBalance, TransactionArchive, attached_archives
+from .period_close import BalanceSnapshot
+from .posting import Posting
+from .transaction import Transaction
+
+# The debit account, credit account, amount, and date of a transaction,
+# which are all that its legs in the index depend on.
+TransactionState = tuple[Optional[int], Optional[int], float, datetime]
+
+TRANSACTION_STATE_ATTRIBUTES: tuple[str, ...] = (
+    "debit_account_id",
+    "credit_account_id",
+    "amount",
+    "transaction_date",
+)
+
+
+@dataclass
+class AccountLedger:
+    """The sorted transaction dates of one account, with the running
+    total of its categorized credits minus debits.
+
+    cumulative has one more entry than dates: cumulative[i] is the total
+    of the first i legs, so the total between two positions is a single
+    subtraction.
+    """
+
+    dates: np.ndarray = field(
+        default_factory=lambda: np.array([], dtype="datetime64[us]")
+    )
+    cumulative: np.ndarray = field(default_factory=lambda: np.zeros(1))
+    uncategorized_dates: np.ndarray = field(
+        default_factory=lambda: np.array([], dtype="datetime64[us]")
+    )
+
+    @property
+    def last_date(self) -> Optional[datetime]:
+        """The date of the account's latest transaction, or None if it
+        has none."""
+        latest: list[datetime] = [
+            dates[-1].item()
+            for dates in (self.dates, self.uncategorized_dates)
+            if len(dates)
+        ]
+
+        return max(latest) if latest else None
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes held by the arrays."""
+        return (
+            self.dates.nbytes + self.cumulative.nbytes + self.uncategorized_dates.nbytes
+        )
+
+    def changed(
+        self,
+        removed_legs: list[tuple[float, datetime]],
+        added_legs: list[tuple[float, datetime]],
+        removed_uncategorized: list[datetime],
+        added_uncategorized: list[datetime],
+    ) -> "AccountLedger":
+        """Return a copy of the ledger with the given legs and
+        uncategorized dates removed and added, keeping the dates sorted.
+
+        Parameters
+        ----------
+            removed_legs (list[tuple[float, datetime]]) : The amount and
+                date of each leg to remove.
+            added_legs (list[tuple[float, datetime]]) : The amount and
+                date of each leg to add.
+            removed_uncategorized (list[datetime]) : The dates of the
+                uncategorized transactions to remove.
+            added_uncategorized (list[datetime]) : The dates of the
+                uncategorized transactions to add.
+
+        Raises
+        ------
+            (ValueError) when a leg or date to remove is not in the
+                ledger.
+        """
+        dates: np.ndarray = self.dates
+        cumulative: np.ndarray = self.cumulative
+        uncategorized_dates: np.ndarray = self.uncategorized_dates
+
+        for amount, date in removed_legs:
+            when: np.datetime64 = np.datetime64(date, "us")
+            start, end = _positions(dates, date, date)
+            amounts: np.ndarray = np.diff(cumulative[start : end + 1])
+            matches: np.ndarray = np.flatnonzero(np.isclose(amounts, amount))
+
+            if not len(matches):
+                raise ValueError(f"No leg of {amount} on {when} to remove.")
+
+            # The totals after the leg no longer include it.
+            position: int = start + int(matches[0])
+            dates = np.delete(dates, position)
+            cumulative = np.concatenate(
+                [
+                    cumulative[: position + 1],
+                    cumulative[position + 2 :] - amounts[matches[0]],
+                ]
+            )
+
+        for amount, date in added_legs:
+            position = int(
+                np.searchsorted(dates, np.datetime64(date, "us"), side="right")
+            )
+            dates = np.insert(dates, position, np.datetime64(date, "us"))
+            cumulative = np.concatenate(
+                [cumulative[: position + 1], cumulative[position:] + amount]
+            )
+
+        for date in removed_uncategorized:
+            start, end = _positions(uncategorized_dates, date, date)
+
+            if start == end:
+                raise ValueError(f"No uncategorized transaction on {date} to remove.")
+
+            uncategorized_dates = np.delete(uncategorized_dates, start)
+
+        for date in added_uncategorized:
+            uncategorized_dates = np.insert(
+                uncategorized_dates,
+                np.searchsorted(
+                    uncategorized_dates, np.datetime64(date, "us"), side="right"
+                ),
+                np.datetime64(date, "us"),
+            )
+
+        return AccountLedger(dates, cumulative, uncategorized_dates)
+
+
+class LedgerIndex:
+    """Optional in-process index of every account's ledger, enabled with
+    the LEDGER_INDEX config.
+
+    The index is built from the database when the app starts, and the
+    transactions flushed by each commit are applied to the ledgers of
+    their accounts without reading them back, so range balances,
+    uncategorized counts, and last updated dates are answered with
+    binary searches instead of reading rows.
+
+    Each process keeps its own copy, so it is only consistent with a
+    single server process (SERVER_WORKERS = 1). Writes made outside of
+    the ORM sessions are not seen until the index is rebuilt.
+    """
+
+    def __init__(self, extension: "DbExtension") -> None:
+        """Build the index of the extension's database and keep it up to
+        date with the commits of its sessions.
+
+        Parameters
+        ----------
+            extension (DbExtension) : The extension owning the database.
+        """
+        self.extension: "DbExtension" = extension
+        self.ledgers: dict[int, AccountLedger] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        extension.ledger_index = self
+        self.listen(extension.Session)
+        self.build()
+
+    def listen(self, session_factory: sessionmaker[Session]) -> None:
+        """Track the transactions changed by the sessions of the factory.
+
+        Parameters
+        ----------
+            session_factory (sessionmaker) : The session factory to
+                listen to.
+        """
+        event.listen(session_factory, "before_flush", self._collect_changes)
+        event.listen(session_factory, "after_commit", self._apply_changes)
+        event.listen(session_factory, "after_rollback", self._discard_changes)
+
+    def build(self) -> None:
+        """Load every account's ledger from the database."""
+        self.reload(None)
+
+    def reload(self, account_ids: Optional[Iterable[int]]) -> None:
+        """Reload the ledgers of the given accounts from the database.
+
+        Parameters
+        ----------
+            account_ids (Iterable[int]) : The accounts to reload, or
+                None to reload every account.
+        """
+        ids: Optional[list[int]] = None if account_ids is None else list(account_ids)
+        legs_by_account: dict[int, list[tuple]] = {}
+        uncategorized_by_account: dict[int, list[datetime]] = {}
+
+        with Session(self.extension.engine) as session:
+            accounts_query = select(Account.id)
+
+            if ids is not None:
+                accounts_query = accounts_query.where(Account.id.in_(ids))
+
+            for account_id in session.scalars(accounts_query):
+                legs_by_account[account_id] = []
+                uncategorized_by_account[account_id] = []
+
+            archives: list[TransactionArchive] = TransactionArchive.reached_by(session)
+
+            with attached_archives(session.connection(), archives) as archive_years:
+                legs = Transaction.account_legs(ids, archive_years=archive_years)
+
+                for account_id, amount, transaction_date in session.execute(
+                    legs.order_by(legs.selected_columns.transaction_date)
+                ):
+                    if account_id in legs_by_account:
+                        legs_by_account[account_id].append((amount, transaction_date))
+
+            uncategorized_query = (
+                select(Posting.account_id, Posting.transaction_date)
+                .where(Posting.categorized.is_(False))
+                .order_by(Posting.transaction_date)
+            )
+
+            if ids is not None:
+                uncategorized_query = uncategorized_query.where(
+                    Posting.account_id.in_(ids)
+                )
+
+            for account_id, transaction_date in session.execute(uncategorized_query):
+                if account_id in uncategorized_by_account:
+                    uncategorized_by_account[account_id].append(transaction_date)
+
+        ledgers: dict[int, AccountLedger] = {}
+
+        for account_id, account_legs in legs_by_account.items():
+            ledgers[account_id] = AccountLedger(
+                dates=np.array(
+                    [_to_datetime(date) for _, date in account_legs],
+                    dtype="datetime64[us]",
+                ),
+                cumulative=np.concatenate(
+                    [[0.0], np.cumsum([amount for amount, _ in account_legs])]
+                ),
+                uncategorized_dates=np.array(
+                    [_to_datetime(date) for date in uncategorized_by_account[account_id]],
+                    dtype="datetime64[us]",
+                ),
+            )
+
+        with self._lock:
+            if ids is None:
+                self.ledgers = ledgers
+            else:
+                for account_id in ids:
+                    self.ledgers.pop(account_id, None)
+
+                self.ledgers.update(ledgers)
+
+    def apply(
+        self, changes: Iterable[tuple[Optional[TransactionState], ...]]
+    ) -> None:
+        """Apply the changes of transactions to the ledgers of their
+        accounts without reading the database. An account whose ledger
+        does not match a change is reloaded instead.
+
+        Parameters
+        ----------
+            changes (Iterable[tuple]) : The state of each changed
+                transaction before and after the change, with None before
+                an added transaction and after a removed one.
+        """
+        removed_legs: dict[int, list[tuple[float, datetime]]] = {}
+        added_legs: dict[int, list[tuple[float, datetime]]] = {}
+        removed_uncategorized: dict[int, list[datetime]] = {}
+        added_uncategorized: dict[int, list[datetime]] = {}
+
+        for before, after in changes:
+            for state, legs, uncategorized in (
+                (before, removed_legs, removed_uncategorized),
+                (after, added_legs, added_uncategorized),
+            ):
+                if state is None:
+                    continue
+
+                debit_account_id, credit_account_id, amount, date = state
+
+                if debit_account_id is not None and credit_account_id is not None:
+                    legs.setdefault(credit_account_id, []).append((amount, date))
+                    legs.setdefault(debit_account_id, []).append((-amount, date))
+                    continue
+
+                for account_id in (debit_account_id, credit_account_id):
+                    if account_id is not None:
+                        uncategorized.setdefault(account_id, []).append(date)
+
+        stale_ids: set[int] = set()
+
+        with self._lock:
+            for account_id in (
+                removed_legs.keys()
+                | added_legs.keys()
+                | removed_uncategorized.keys()
+                | added_uncategorized.keys()
+            ):
+                try:
+                    self.ledgers[account_id] = self.ledgers.get(
+                        account_id, AccountLedger()
+                    ).changed(
+                        removed_legs.get(account_id, []),
+                        added_legs.get(account_id, []),
+                        removed_uncategorized.get(account_id, []),
+                        added_uncategorized.get(account_id, []),
+                    )
+                except ValueError:
+                    stale_ids.add(account_id)
+
+        if stale_ids:
+            self.reload(stale_ids)
+
+    def balance(
+        self,
+        account_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> float:
+        """Return the credits minus the debits of the account between the
+        two dates, before it is negated for debit increase accounts.
+
+        Parameters
+        ----------
+            account_id (int) : The ID of the account.
+            start_date (datetime) : Optional. The first date to include.
+            end_date (datetime) : Optional. The last date to include.
+        """
+        ledger: AccountLedger = self.ledgers.get(account_id, AccountLedger())
+
+        start, end = _positions(ledger.dates, start_date, end_date)
+
+        return float(ledger.cumulative[end] - ledger.cumulative[start])
+
+    def uncategorized_count(
+        self,
+        account_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> int:
+        """Return the number of uncategorized transactions of the account
+        between the two dates.
+
+        Parameters
+        ----------
+            account_id (int) : The ID of the account.
+            start_date (datetime) : Optional. The first date to include.
+            end_date (datetime) : Optional. The last date to include.
+        """
+        ledger: AccountLedger = self.ledgers.get(account_id, AccountLedger())
+
+        start, end = _positions(ledger.uncategorized_dates, start_date, end_date)
+
+        return end - start
+
+    def last_updated(self, account_id: int) -> Optional[datetime]:
+        """Return the date of the account's latest transaction, or None
+        if it has none."""
+        ledger: Optional[AccountLedger] = self.ledgers.get(account_id)
+
+        return ledger.last_date if ledger else None
+
+    def memory_report(self) -> dict:
+        """Return how much memory the index holds.
+
+        Returns
+        -------
+            (dict) : The number of accounts, legs, and uncategorized
+                transactions indexed, and the bytes held by their arrays.
+        """
+        ledgers: list[AccountLedger] = list(self.ledgers.values())
+
+        return dict(
+            accounts=len(ledgers),
+            legs=sum(len(ledger.dates) for ledger in ledgers),
+            uncategorized=sum(len(ledger.uncategorized_dates) for ledger in ledgers),
+            bytes=sum(ledger.nbytes for ledger in ledgers),
+        )
+
+    def check_consistency(self) -> list[int]:
+        """Compare every account's balance, uncategorized count, and last
+        updated date with the database.
+
+        Returns
+        -------
+            (list[int]) : The IDs of the accounts whose indexed values do
+                not match the database.
+        """
+        with Session(self.extension.engine) as session:
+            account_ids: list[int] = list(session.scalars(select(Account.id)))
+            balances: dict[int, float] = BalanceSnapshot.raw_balances(
+                session, account_ids
+            )
+
+            uncategorized_account_id = func.coalesce(
+                Transaction.credit_account_id, Transaction.debit_account_id
+            )
+            uncategorized_counts: dict[int, int] = dict(
+                session.execute(
+                    select(uncategorized_account_id, func.count())
+                    .where(
+                        or_(
+                            Transaction.credit_account_id.is_(None),
+                            Transaction.debit_account_id.is_(None),
+                        )
+                    )
+                    .group_by(uncategorized_account_id)
+                )
+                .tuples()
+                .all()
+            )
+
+            dates = union_all(
+                select(
+                    Transaction.credit_account_id.label("account_id"),
+                    Transaction.transaction_date.label("transaction_date"),
+                ),
+                select(
+                    Transaction.debit_account_id, Transaction.transaction_date
+                ),
+                select(
+                    ArchivedBalance.account_id, ArchivedBalance.last_transaction_date
+                ),
+            ).subquery()
+            last_dates: dict[int, datetime] = {
+                account_id: _to_datetime(last_date)
+                for account_id, last_date in session.execute(
+                    select(dates.c.account_id, func.max(dates.c.transaction_date))
+                    .where(dates.c.account_id.is_not(None))
+                    .group_by(dates.c.account_id)
+                )
+            }
+
+        return [
+            account_id
+            for account_id in account_ids
+            if round(self.balance(account_id), 2) != round(balances[account_id], 2)
+            or self.uncategorized_count(account_id)
+            != uncategorized_counts.get(account_id, 0)
+            or self.last_updated(account_id) != last_dates.get(account_id)
+        ]
+
+    def _collect_changes(self, session: Session, flush_context, instances) -> None:
+        """Record the state of the transactions about to be flushed
+        before and after the flush, or that every account has to be
+        reloaded when an account is deleted or a transaction's state is
+        not loaded."""
+        changes: list[tuple] = session.info.setdefault("ledger_index_changes", [])
+
+        for obj in session.new | session.dirty | session.deleted:
+            if isinstance(obj, Account) and obj in session.deleted:
+                session.info["ledger_index_rebuild"] = True
+
+            if not isinstance(obj, Transaction):
+                continue
+
+            state: InstanceState = inspect(obj)
+
+            try:
+                before: Optional[TransactionState] = (
+                    None if obj in session.new else _transaction_state(state, True)
+                )
+                after: Optional[TransactionState] = (
+                    None if obj in session.deleted else _transaction_state(state, False)
+                )
+            except LookupError:
+                session.info["ledger_index_rebuild"] = True
+                continue
+
+            if before != after:
+                changes.append((before, after))
+
+    def _apply_changes(self, session: Session) -> None:
+        """Apply the changes of the committed transaction."""
+        changes: list[tuple] = session.info.pop("ledger_index_changes", [])
+
+        if session.info.pop("ledger_index_rebuild", False):
+            self.build()
+        elif changes:
+            self.apply(changes)
+
+    def _discard_changes(self, session: Session) -> None:
+        """Forget the changes of a rolled back transaction."""
+        session.info.pop("ledger_index_changes", None)
+        session.info.pop("ledger_index_rebuild", None)
+
+
+def _transaction_state(state: InstanceState, flushed: bool) -> TransactionState:
+    """Return the accounts, amount, and date of a transaction as last
+    flushed, or as about to be flushed.
+
+    Parameters
+    ----------
+        state (InstanceState) : The state of the transaction.
+        flushed (bool) : Whether to return the state as last flushed
+            instead of with its pending changes.
+
+    Raises
+    ------
+        (LookupError) when one of the values was never loaded, or is
+            left to a default of the database.
+    """
+    values: list = []
+
+    for attribute in TRANSACTION_STATE_ATTRIBUTES:
+        history = state.attrs[attribute].history
+        known: list = list(history.deleted if flushed else history.added) or list(
+            history.unchanged
+        )
+
+        if known:
+            values.append(known[0])
+        elif state.pending and attribute.endswith("_account_id"):
+            # Never set on a new, uncategorized transaction.
+            values.append(None)
+        else:
+            raise LookupError(f"The {attribute} of the transaction is not known.")
+
+    debit_account_id, credit_account_id, amount, transaction_date = values
+
+    return (
+        debit_account_id,
+        credit_account_id,
+        float(amount or 0.0),
+        _to_datetime(transaction_date),
+    )
+
+
+def _to_datetime(value: datetime | str) -> datetime:
+    """Return the date read from a union, which SQLite may return as a
+    string, as a datetime."""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _positions(
+    dates: np.ndarray, start_date: Optional[datetime], end_date: Optional[datetime]
+) -> tuple[int, int]:
+    """Return the positions of the first date on or after the start date
+    and just past the last date on or before the end date.
+
+    Parameters
+    ----------
+        dates (np.ndarray) : The sorted dates to search.
+        start_date (datetime) : Optional. The first date to include.
+        end_date (datetime) : Optional. The last date to include.
+    """
+    start: int = (
+        int(np.searchsorted(dates, np.datetime64(start_date, "us"), side="left"))
+        if start_date is not None
+        else 0
+    )
+    end: int = (
+        int(np.searchsorted(dates, np.datetime64(end_date, "us"), side="right"))
+        if end_date is not None
+        else len(dates)
+    )
+
+    return start, max(start, end)
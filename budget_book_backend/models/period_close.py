@@ -0,0 +1,164 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    UniqueConstraint,
+    func,
+    select,
+)
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from .archive import TransactionArchive, attached_archives
+from .db_setup import DbSetup
+from .transaction import Transaction
+
+
+class PeriodClose(DbSetup.Base):
+    """ORM for closed accounting periods.
+
+    Closing a period records the balance of every account as of the
+    close date in BalanceSnapshots and locks the transactions on or
+    before that date against changes.
+    """
+
+    __tablename__ = "period_closes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    close_date: Mapped[datetime] = mapped_column(
+        DateTime, unique=True, nullable=False
+    )
+    closed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+    @classmethod
+    def latest(
+        cls, session: Session, on_or_before: Optional[datetime] = None
+    ) -> Optional["PeriodClose"]:
+        """Return the most recent period close, optionally only
+        considering those on or before the given date.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            on_or_before (datetime) : Optional. The latest close date to
+                consider.
+
+        Returns
+        -------
+            (PeriodClose | None) : The period close, or None if there is
+                none.
+        """
+        query = select(cls).order_by(cls.close_date.desc()).limit(1)
+
+        if on_or_before is not None:
+            query = query.where(cls.close_date <= on_or_before)
+
+        return session.scalars(query).first()
+
+    @classmethod
+    def closed_through(cls, session: Session) -> Optional[datetime]:
+        """Return the date through which transactions are locked, or
+        None if no period has been closed."""
+        return session.scalar(select(func.max(cls.close_date)))
+
+    def __repr__(self):
+        return f"<PeriodClose id={self.id} close_date={self.close_date}>"
+
+
+class BalanceSnapshot(DbSetup.Base):
+    """ORM for the balance of an account at a period close.
+
+    The balance is the sum of the account's categorized credits minus
+    its categorized debits on or before the close date, before it is
+    negated for debit increase accounts.
+    """
+
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (UniqueConstraint("period_close_id", "account_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    period_close_id: Mapped[int] = mapped_column(
+        ForeignKey("period_closes.id"), nullable=False
+    )
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("accounts.id"), nullable=False
+    )
+    balance: Mapped[float] = mapped_column(Float, default=0.0)
+
+    @classmethod
+    def raw_balances(
+        cls,
+        session: Session,
+        account_ids: list[int],
+        end_date: Optional[datetime] = None,
+        start_date: Optional[datetime] = None,
+    ) -> dict[int, float]:
+        """Return the credits minus the debits of each account between
+        the two dates.
+
+        Without a start date, the balances start from the snapshots of
+        the nearest period close on or before the end date, so only the
+        transactions after that close are read. Archived years are only
+        attached if the transactions read reach them.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            account_ids (list[int]) : The IDs of the accounts.
+            end_date (datetime) : Optional. The last date to include. If
+                not given, every transaction is included.
+            start_date (datetime) : Optional. The first date to include.
+                If not given, the balances are from the beginning.
+
+        Returns
+        -------
+            (dict[int, float]) : A map of account ID to raw balance.
+        """
+        balances: dict[int, float] = {account_id: 0.0 for account_id in account_ids}
+        after: Optional[datetime] = None
+
+        if start_date is None:
+            close: Optional[PeriodClose] = PeriodClose.latest(session, end_date)
+
+            if close is not None:
+                after = close.close_date
+                balances.update(
+                    session.execute(
+                        select(cls.account_id, cls.balance).where(
+                            cls.period_close_id == close.id,
+                            cls.account_id.in_(account_ids),
+                        )
+                    )
+                    .tuples()
+                    .all()
+                )
+
+        archives: list[TransactionArchive] = TransactionArchive.reached_by(
+            session, start_date=start_date, end_date=end_date, after=after
+        )
+
+        with attached_archives(session.connection(), archives) as archive_years:
+            legs = Transaction.account_legs(
+                account_ids,
+                start_date=start_date,
+                end_date=end_date,
+                after=after,
+                archive_years=archive_years,
+            ).subquery()
+
+            for account_id, total in session.execute(
+                select(legs.c.account_id, func.sum(legs.c.amount)).group_by(
+                    legs.c.account_id
+                )
+            ).tuples():
+                balances[account_id] += total
+
+        return balances
+
+    def __repr__(self):
+        return (
+            f"<BalanceSnapshot account_id={self.account_id} "
+            f"balance={self.balance}>"
+        )
@@ -0,0 +1,177 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean,
+    Connection,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    MetaData,
+    Select,
+    Table,
+    event,
+    select,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .db_setup import DbSetup
+
+# The legs of a transaction as (account column, sign of the amount):
+# credits are positive and debits are negative.
+LEGS: list[tuple[str, str]] = [("credit_account_id", ""), ("debit_account_id", "-")]
+
+
+def _insert_legs(row: str) -> str:
+    """Return the statements that insert the postings of the legs of a
+    transactions row, e.g. new in a trigger."""
+    return "\n".join(
+        f"""INSERT INTO postings
+            (transaction_id, account_id, amount, transaction_date, categorized)
+        SELECT {row}.id, {row}.{account_column}, {sign}{row}.amount,
+            {row}.transaction_date,
+            {row}.debit_account_id IS NOT NULL
+            AND {row}.credit_account_id IS NOT NULL
+        WHERE {row}.{account_column} IS NOT NULL;"""
+        for account_column, sign in LEGS
+    )
+
+
+# Keep the postings in step with every write to the transactions table,
+# whether it comes from the ORM, a bulk update, or an archive move.
+POSTING_TRIGGERS_DDL: list[str] = [
+    f"""CREATE TRIGGER IF NOT EXISTS postings_insert
+    AFTER INSERT ON transactions BEGIN
+        {_insert_legs("new")}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS postings_delete
+    AFTER DELETE ON transactions BEGIN
+        DELETE FROM postings WHERE transaction_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS postings_update
+    AFTER UPDATE OF debit_account_id, credit_account_id, amount, transaction_date
+    ON transactions BEGIN
+        DELETE FROM postings WHERE transaction_id = old.id;
+        {_insert_legs("new")}
+    END""",
+]
+
+
+class Posting(DbSetup.Base):
+    """ORM for one leg of a transaction: the change it makes to one
+    account, with credits positive and debits negative like
+    Transaction.account_legs.
+
+    The postings are written by triggers on the transactions table, one
+    for each account a transaction is on, so that the rows of an account
+    are read with a range scan of a single index instead of an OR across
+    the debit and credit columns. The index covers the columns the
+    balance, listing, and report queries read.
+    """
+
+    __tablename__ = "postings"
+    __table_args__ = (
+        Index(
+            "ix_postings_account_id_transaction_date",
+            "account_id",
+            "transaction_date",
+            "categorized",
+            "amount",
+            "transaction_id",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    transaction_id: Mapped[int] = mapped_column(
+        ForeignKey("transactions.id"), index=True
+    )
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    amount: Mapped[float] = mapped_column(Float(precision=2))
+    transaction_date: Mapped[datetime] = mapped_column(DateTime)
+    # Whether the transaction has both of its sides. Only categorized
+    # transactions count towards balances.
+    categorized: Mapped[bool] = mapped_column(Boolean)
+
+    @classmethod
+    def transaction_ids(
+        cls,
+        account_ids: list[int],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        categorized: Optional[bool] = None,
+    ) -> Select:
+        """Return a select of the IDs of the transactions on either side
+        of any of the accounts, read from the account and date index.
+
+        Parameters
+        ----------
+            account_ids (list[int]) : The accounts.
+            start_date (datetime) : Optional. The earliest transaction
+                date.
+            end_date (datetime) : Optional. The latest transaction date.
+            categorized (bool) : Optional. Only select the categorized
+                transactions if True, or the uncategorized ones if False.
+
+        Returns
+        -------
+            (Select) : A select of the transaction_id column, for use in
+                an IN clause.
+        """
+        query = select(cls.transaction_id).where(cls.account_id.in_(account_ids))
+
+        if start_date is not None:
+            query = query.where(cls.transaction_date >= start_date)
+
+        if end_date is not None:
+            query = query.where(cls.transaction_date <= end_date)
+
+        if categorized is not None:
+            query = query.where(cls.categorized.is_(categorized))
+
+        return query
+
+    def __repr__(self):
+        return (
+            f"<Posting transaction_id={self.transaction_id} "
+            f"account_id={self.account_id}, amount={self.amount}>"
+        )
+
+
+@event.listens_for(Posting.__table__, "after_create")
+def fill_postings(target: Table, connection: Connection, **kw) -> None:
+    """Write the postings of the existing transactions when the postings
+    table is added to a database that already has some.
+
+    Parameters
+    ----------
+        target (Table) : The postings table.
+        connection (Connection) : The connection it was created on.
+    """
+    for account_column, sign in LEGS:
+        connection.exec_driver_sql(
+            f"""INSERT INTO postings
+                (transaction_id, account_id, amount, transaction_date, categorized)
+            SELECT id, {account_column}, {sign}amount, transaction_date,
+                debit_account_id IS NOT NULL AND credit_account_id IS NOT NULL
+            FROM transactions WHERE {account_column} IS NOT NULL"""
+        )
+
+
+@event.listens_for(DbSetup.Base.metadata, "after_create")
+def create_posting_triggers(
+    target: MetaData, connection: Connection, **kw
+) -> None:
+    """Create the triggers that write the postings of the transactions
+    once the model tables are created.
+
+    Parameters
+    ----------
+        target (MetaData) : The metadata of the created tables.
+        connection (Connection) : The connection they were created on.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+
+    for statement in POSTING_TRIGGERS_DDL:
+        connection.exec_driver_sql(statement)
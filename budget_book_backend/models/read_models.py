@@ -0,0 +1,271 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, NamedTuple, Optional, Sequence
+
+from sqlalchemy import CompoundSelect, Select, Table, func, null, select
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from .ledger_index import LedgerIndex
+
+from .account import Account
+from .account_type import AccountType
+from .archive import ArchivedBalance
+from .db_setup import DbSetup
+from .period_close import BalanceSnapshot
+from .posting import Posting
+from .transaction import Transaction
+
+
+class AccountRow(NamedTuple):
+    """Read-only row of an account and its type for the list and report
+    services, loaded with a Core select instead of as an ORM Account.
+
+    The classmethods compute the balances, uncategorized counts, and
+    last updated dates of many rows at once, the same values as the
+    Account methods of the same names.
+    """
+
+    id: int
+    name: str
+    account_type_id: int
+    debit_inc: bool
+    account_type: str
+    account_group: str
+    version: int
+
+    @staticmethod
+    def query() -> Select:
+        """Return the select of the rows, to be filtered by the caller."""
+        return select(
+            Account.id,
+            Account.name,
+            Account.account_type_id,
+            Account.debit_inc,
+            AccountType.name,
+            AccountType.group_name,
+            Account.version,
+        ).join(AccountType, Account.account_type_id == AccountType.id)
+
+    @classmethod
+    def load(cls, session: Session, query: Select) -> list["AccountRow"]:
+        """Return the rows of a query built from AccountRow.query().
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            query (Select) : The query of the rows.
+        """
+        return [cls._make(row) for row in session.execute(query)]
+
+    @classmethod
+    def balances(
+        cls,
+        session: Session,
+        rows: Sequence["AccountRow"],
+        start_date: datetime = datetime(1, 1, 1),
+        end_date: datetime = datetime.now(),
+    ) -> dict[int, float]:
+        """Return the net change balance of each account between the two
+        given dates, read with one query for all of them.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            rows (Sequence[AccountRow]) : The accounts.
+            start_date (datetime) : Optional. The starting date when the
+                account balances will be considered 0.
+            end_date (datetime) : Optional. The date to calculate the
+                account balance changes up to.
+
+        Returns
+        -------
+            (dict[int, float]) : A map of account ID to balance.
+        """
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
+
+        if ledger_index is not None:
+            raw_balances: dict[int, float] = {
+                row.id: ledger_index.balance(row.id, start_date, end_date)
+                for row in rows
+            }
+        else:
+            raw_balances = BalanceSnapshot.raw_balances(
+                session,
+                [row.id for row in rows],
+                end_date,
+                None if start_date == datetime(1, 1, 1) else start_date,
+            )
+
+        return {
+            row.id: -round(raw_balances[row.id], 2)
+            if row.debit_inc
+            else round(raw_balances[row.id], 2)
+            for row in rows
+        }
+
+    @classmethod
+    def uncategorized_counts(
+        cls,
+        session: Session,
+        rows: Sequence["AccountRow"],
+        start_date: datetime = datetime(1, 1, 1),
+        end_date: datetime = datetime.now(),
+    ) -> dict[int, int]:
+        """Return the number of uncategorized transactions of each
+        account within the given timeframe.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            rows (Sequence[AccountRow]) : The accounts.
+            start_date (datetime) : Optional. The first date to count.
+            end_date (datetime) : Optional. The last date to count.
+
+        Returns
+        -------
+            (dict[int, int]) : A map of account ID to count.
+        """
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
+
+        if ledger_index is not None:
+            return {
+                row.id: ledger_index.uncategorized_count(row.id, start_date, end_date)
+                for row in rows
+            }
+
+        counts: dict[int, int] = dict(
+            session.execute(
+                select(Posting.account_id, func.count())
+                .where(
+                    Posting.account_id.in_([row.id for row in rows]),
+                    Posting.transaction_date >= start_date,
+                    Posting.transaction_date <= end_date,
+                    Posting.categorized.is_(False),
+                )
+                .group_by(Posting.account_id)
+            )
+            .tuples()
+            .all()
+        )
+
+        return {row.id: counts.get(row.id, 0) for row in rows}
+
+    @classmethod
+    def last_updated_dates(
+        cls, session: Session, rows: Sequence["AccountRow"]
+    ) -> dict[int, datetime]:
+        """Return the date of each account's most recent transaction,
+        or today's date for accounts without any.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            rows (Sequence[AccountRow]) : The accounts.
+
+        Returns
+        -------
+            (dict[int, datetime]) : A map of account ID to date.
+        """
+        ledger_index: Optional["LedgerIndex"] = DbSetup.extension().ledger_index
+
+        if ledger_index is not None:
+            return {
+                row.id: ledger_index.last_updated(row.id) or datetime.now()
+                for row in rows
+            }
+
+        account_ids: list[int] = [row.id for row in rows]
+        latest: dict[int, datetime] = {}
+
+        # Archived years keep the latest date of each account.
+        for account_id, date in (
+            (Posting.account_id, Posting.transaction_date),
+            (ArchivedBalance.account_id, ArchivedBalance.last_transaction_date),
+        ):
+            for row_id, latest_date in session.execute(
+                select(account_id, func.max(date))
+                .where(account_id.in_(account_ids))
+                .group_by(account_id)
+            ):
+                if latest_date is not None and (
+                    row_id not in latest or latest_date > latest[row_id]
+                ):
+                    latest[row_id] = latest_date
+
+        return {row.id: latest.get(row.id, datetime.now()) for row in rows}
+
+
+class TransactionRow(NamedTuple):
+    """Read-only row of a transaction for the list services, loaded with
+    a Core select instead of as an ORM Transaction."""
+
+    id: int
+    name: str
+    description: str
+    amount: float
+    debit_account_id: Optional[int]
+    credit_account_id: Optional[int]
+    transaction_date: datetime
+    date_entered: Optional[datetime]
+    # None for archived transactions, which are never edited.
+    version: Optional[int]
+
+    @classmethod
+    def query(cls, table: Optional[Table] = None) -> Select:
+        """Return the select of the rows from the transactions table or
+        one of its archive tables.
+
+        Parameters
+        ----------
+            table (Table) : Optional. The table to read from. Defaults to
+                the transactions table.
+        """
+        if table is None or table is Transaction.__table__:
+            columns = Transaction.__table__.c
+
+            return select(*(columns[field] for field in cls._fields))
+
+        # Archives made before the version column do not have it.
+        return select(
+            *(table.c[field] for field in cls._fields if field != "version"),
+            null().label("version"),
+        )
+
+    @classmethod
+    def load(
+        cls, session: Session, query: Select | CompoundSelect
+    ) -> list["TransactionRow"]:
+        """Return the rows of a query built from TransactionRow.query(),
+        or a union of them across the archive tables.
+
+        Parameters
+        ----------
+            session (Session) : The session to read from.
+            query (Select | CompoundSelect) : The query of the rows.
+        """
+        return [cls._make(row) for row in session.execute(query)]
+
+    def to_dict(self) -> dict:
+        """Return the transaction as a JSON serializable dict, with the
+        missing side of an uncategorized transaction as "undefined"."""
+        return dict(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            amount=self.amount,
+            debit_account_id=(
+                "undefined" if self.debit_account_id is None else self.debit_account_id
+            ),
+            credit_account_id=(
+                "undefined"
+                if self.credit_account_id is None
+                else self.credit_account_id
+            ),
+            transaction_date=self.transaction_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            date_entered=(
+                "undefined"
+                if self.date_entered is None
+                else self.date_entered.strftime("%Y-%m-%d %H:%M:%S.%f")
+            ),
+            version=self.version,
+        )
@@ -0,0 +1,266 @@
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from flask import Flask
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import InstanceState, Session, sessionmaker
+
+from .account import Account
+from .account_type import AccountType
+from .db_setup import DbExtension
+from .transaction import Transaction
+
+# Marks that every report has to be dropped, e.g. after an account is
+# changed and may have moved between groups.
+ALL_ACCOUNTS: int = -1
+
+
+@dataclass
+class CachedReport:
+    """The balances of a report by account group, and the accounts they
+    were computed from."""
+
+    group_balances: dict[str, dict]
+    account_ids: frozenset[int]
+
+
+class ReportCache:
+    """Flask extension that keeps the most recently used results of
+    account_net_changes_by_group, enabled with the REPORT_CACHE config.
+
+    Reports are keyed by their account groups, their date ranges, and
+    the version of the ledger, and at most REPORT_CACHE_SIZE of them are
+    kept, evicting the least recently used. A commit that changes the
+    transactions of some accounts only drops the reports that include
+    them, while a change to the accounts or account types themselves
+    moves the ledger to a new version, dropping every report.
+
+    Like the LedgerIndex, each process keeps its own cache and only sees
+    the writes of its own sessions, so it is only consistent with a
+    single server process (SERVER_WORKERS = 1), and the production
+    server refuses to start more workers while it is enabled. It is not
+    used for per-user ledgers.
+    """
+
+    name: str = "budget_book_report_cache"
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.max_size: int = 128
+        self.reports: OrderedDict[tuple, CachedReport] = OrderedDict()
+        # Moved on by every change to the accounts or account types.
+        self.ledger_version: int = 0
+        # Moved on by every invalidation, recording in changed_at when
+        # each account last changed, so that a report computed while
+        # its accounts changed is not cached.
+        self.generation: int = 0
+        self.changed_at: dict[int, int] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Set the cache size from the app's config, listen to the
+        commits of the app's database, and register the extension on
+        the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app whose reports to cache.
+        """
+        self.max_size = app.config.get("REPORT_CACHE_SIZE", 128)
+
+        extension: DbExtension = app.extensions[DbExtension.name]
+        extension.report_cache = self
+        self.listen(extension.Session)
+
+        app.extensions[self.name] = self
+
+    def listen(self, session_factory: sessionmaker[Session]) -> None:
+        """Invalidate the reports changed by the sessions of the factory.
+
+        Parameters
+        ----------
+            session_factory (sessionmaker) : The session factory to
+                listen to.
+        """
+        event.listen(session_factory, "before_flush", self._collect_changes)
+        event.listen(session_factory, "after_commit", self._apply_changes)
+        event.listen(session_factory, "after_rollback", self._discard_changes)
+
+    def get_or_compute(
+        self,
+        account_groups: Iterable[str],
+        date_ranges: Iterable[tuple[datetime, datetime]],
+        compute: Callable[[], tuple[dict[str, dict], set[int]]],
+    ) -> dict[str, dict]:
+        """Return the cached balances of the report, computing and
+        caching them if they are not cached.
+
+        Parameters
+        ----------
+            account_groups (Iterable[str]) : The account groups of the
+                report. Their order and repeats do not matter.
+            date_ranges (Iterable[tuple[datetime, datetime]]) : The start
+                and end date of each range of the report.
+            compute (Callable) : Computes the balances of the report by
+                account group, along with the IDs of their accounts.
+
+        Returns
+        -------
+            (dict[str, dict]) : A copy of the balances of the report by
+                account group.
+        """
+        with self._lock:
+            key: tuple = (
+                tuple(sorted(set(account_groups))),
+                tuple(date_ranges),
+                self.ledger_version,
+            )
+            report: Optional[CachedReport] = self.reports.get(key)
+
+            if report is not None:
+                self.reports.move_to_end(key)
+                self.hits += 1
+
+                return copy.deepcopy(report.group_balances)
+
+            self.misses += 1
+            started_at: int = self.generation
+
+        group_balances, account_ids = compute()
+
+        with self._lock:
+            changed_since: bool = key[2] != self.ledger_version or any(
+                self.changed_at.get(account_id, -1) > started_at
+                for account_id in account_ids
+            )
+
+            if not changed_since and self.max_size > 0:
+                self.reports[key] = CachedReport(
+                    copy.deepcopy(group_balances), frozenset(account_ids)
+                )
+
+                while len(self.reports) > self.max_size:
+                    self.reports.popitem(last=False)
+                    self.evictions += 1
+
+        return group_balances
+
+    def invalidate(self, account_ids: set[int]) -> None:
+        """Drop the reports that include any of the given accounts.
+
+        Parameters
+        ----------
+            account_ids (set[int]) : The accounts whose transactions
+                changed, or ALL_ACCOUNTS to drop every report.
+        """
+        with self._lock:
+            self.generation += 1
+
+            if ALL_ACCOUNTS in account_ids:
+                self.ledger_version += 1
+                self.invalidations += len(self.reports)
+                self.reports.clear()
+                self.changed_at.clear()
+                return
+
+            for account_id in account_ids:
+                self.changed_at[account_id] = self.generation
+
+            stale_keys: list[tuple] = [
+                key
+                for key, report in self.reports.items()
+                if not report.account_ids.isdisjoint(account_ids)
+            ]
+
+            for key in stale_keys:
+                del self.reports[key]
+
+            self.invalidations += len(stale_keys)
+
+    def clear(self) -> None:
+        """Drop every report, e.g. when the database is replaced."""
+        self.invalidate({ALL_ACCOUNTS})
+
+    def stats(self) -> dict:
+        """Return how many reports are cached, how many lookups hit or
+        missed the cache, and how many reports were evicted or
+        invalidated."""
+        with self._lock:
+            lookups: int = self.hits + self.misses
+
+            return dict(
+                size=len(self.reports),
+                max_size=self.max_size,
+                hits=self.hits,
+                misses=self.misses,
+                hit_rate=self.hits / lookups if lookups else 0.0,
+                evictions=self.evictions,
+                invalidations=self.invalidations,
+            )
+
+    def _collect_changes(self, session: Session, flush_context, instances) -> None:
+        """Record the accounts whose transactions are about to be
+        flushed, or that every report changes if an account or account
+        type does."""
+        changed: set[int] = session.info.setdefault("report_cache_accounts", set())
+        changed.update(changed_account_ids(session))
+
+        if any(
+            isinstance(obj, (Account, AccountType))
+            for obj in session.new | session.dirty | session.deleted
+        ):
+            changed.add(ALL_ACCOUNTS)
+
+    def _apply_changes(self, session: Session) -> None:
+        """Invalidate the reports changed by the committed transaction."""
+        changed: set[int] = session.info.pop("report_cache_accounts", set())
+
+        if changed:
+            self.invalidate(changed)
+
+    def _discard_changes(self, session: Session) -> None:
+        """Forget the changes of a rolled back transaction."""
+        session.info.pop("report_cache_accounts", None)
+
+
+def changed_account_ids(session: Session) -> set[int]:
+    """Return the accounts whose transactions the session is about to
+    flush, including the accounts they are being moved from, or
+    ALL_ACCOUNTS if an account is being deleted.
+
+    Parameters
+    ----------
+        session (Session) : The session being flushed.
+    """
+    changed: set[int] = set()
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Account) and obj in session.deleted:
+            changed.add(ALL_ACCOUNTS)
+
+        if not isinstance(obj, Transaction):
+            continue
+
+        state: InstanceState = inspect(obj)
+
+        for attribute in ("debit_account_id", "credit_account_id"):
+            history = state.attrs[attribute].history
+            changed.update(
+                account_id
+                for account_id in (
+                    list(history.added) + list(history.deleted) + list(history.unchanged)
+                )
+                if account_id is not None
+            )
+
+    return changed
@@ -1,14 +1,35 @@
-from typing import TYPE_CHECKING
+import hashlib
+from collections import Counter
+from typing import TYPE_CHECKING, ClassVar, Iterable, Optional
 
 # Avoid circular imports but still use type checking.
 if TYPE_CHECKING:
     from .account import Account
 
-from sqlalchemy import Float, ForeignKey, String, DateTime
+from sqlalchemy import (
+    Column,
+    Connection,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    DateTime,
+    ColumnElement,
+    Select,
+    Table,
+    bindparam,
+    event,
+    select,
+    union_all,
+    update,
+)
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from datetime import datetime
 
 from .db_setup import DbSetup
+from .posting import Posting
 
 
 class Transaction(DbSetup.Base):
@@ -36,22 +57,292 @@ class Transaction(DbSetup.Base):
     debit_account: Mapped["Account"] = relationship(
         "Account",
         foreign_keys=[debit_account_id],
-        backref="debit_transactions",
+        back_populates="debit_transactions",
     )
     credit_account: Mapped["Account"] = relationship(
         "Account",
         foreign_keys=[credit_account_id],
-        backref="credit_transactions",
+        back_populates="credit_transactions",
     )
     transaction_date: Mapped[DateTime] = mapped_column(
-        DateTime, default=datetime.now()
+        DateTime, default=datetime.now(), index=True
     )
     date_entered: Mapped[DateTime] = mapped_column(
         DateTime, default=datetime.now()
     )
+    # Identifies the statement line the transaction was imported from.
+    # See content_hash_of.
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, index=True, unique=True
+    )
+    # Incremented by every update, which only applies if the row still
+    # has the version it was read with. See check_version.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # Tables of the yearly archives, built on first use.
+    _archive_tables: ClassVar[dict[int, Table]] = {}
+
+    @classmethod
+    def archive_table(cls, year: int) -> Table:
+        """Return the transactions table of the archive of the given
+        year, which is attached to the connection as archive_<year>.
+
+        Parameters
+        ----------
+            year (int) : The year of the archive.
+
+        Returns
+        -------
+            (Table) : A table with the same columns as transactions in
+                the archive_<year> schema.
+        """
+        if year not in cls._archive_tables:
+            columns: list[Column] = [
+                Column(column.name, column.type, primary_key=column.primary_key)
+                for column in cls.__table__.columns
+            ]
+            table = Table(
+                cls.__tablename__,
+                MetaData(),
+                *columns,
+                schema=f"archive_{year}",
+            )
+            Index(
+                f"ix_archive_{year}_transaction_date", table.c.transaction_date
+            )
+            cls._archive_tables[year] = table
+
+        return cls._archive_tables[year]
+
+    @staticmethod
+    def content_key(
+        debit_account_id: Optional[int],
+        credit_account_id: Optional[int],
+        transaction_date: datetime,
+        amount: float | str,
+        name: str,
+    ) -> str:
+        """Return the normalized content of a transaction that two
+        imports of the same statement line have in common: the accounts
+        it is imported into, its date, its amount to the cent, and its
+        name ignoring case and whitespace.
+
+        Raises
+        ------
+            (ValueError) when the amount is not a number.
+        """
+        return "|".join(
+            [
+                "" if debit_account_id is None else str(int(debit_account_id)),
+                "" if credit_account_id is None else str(int(credit_account_id)),
+                transaction_date.date().isoformat(),
+                f"{float(amount):.2f}",
+                " ".join(name.casefold().split()),
+            ]
+        )
+
+    @staticmethod
+    def content_hash_of(content_key: str, occurrence: int) -> str:
+        """Return the content hash of the given occurrence of a content
+        key, counting from 0.
+
+        Identical lines of a statement, such as two coffees on the same
+        day, are told apart by their occurrence, so that an account holds
+        the hashes of occurrences 0 to n - 1 of a key it has n
+        transactions of. A line is a duplicate when the hash of its
+        occurrence within its import is already taken.
+
+        Parameters
+        ----------
+            content_key (str) : The key from Transaction.content_key.
+            occurrence (int) : How many lines with the same key come
+                before it.
+
+        Returns
+        -------
+            (str) : The hex SHA-256 digest.
+        """
+        return hashlib.sha256(f"{content_key}#{occurrence}".encode()).hexdigest()
+
+    @classmethod
+    def fill_content_hashes(cls, connection: Connection) -> int:
+        """Set the content hashes of the transactions that were added
+        without one, e.g. before the column existed, in ID order.
+
+        Parameters
+        ----------
+            connection (Connection) : The connection to write on.
+
+        Returns
+        -------
+            (int) : The number of transactions given a hash.
+        """
+        table: Table = cls.__table__  # type: ignore
+        rows = connection.execute(
+            select(
+                table.c.id,
+                table.c.debit_account_id,
+                table.c.credit_account_id,
+                table.c.transaction_date,
+                table.c.amount,
+                table.c.name,
+            )
+            .where(table.c.content_hash.is_(None))
+            .order_by(table.c.id)
+        ).all()
+
+        if not rows:
+            return 0
+
+        taken: set[str] = set(
+            connection.scalars(
+                select(table.c.content_hash).where(table.c.content_hash.is_not(None))
+            )
+        )
+        occurrences: Counter[str] = Counter()
+        hashes: list[dict] = []
+
+        for row_id, *content in rows:
+            content_key: str = cls.content_key(*content)
+
+            while True:
+                content_hash: str = cls.content_hash_of(
+                    content_key, occurrences[content_key]
+                )
+                occurrences[content_key] += 1
+
+                if content_hash not in taken:
+                    break
+
+            hashes.append(dict(row_id=row_id, row_hash=content_hash))
+
+        connection.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(content_hash=bindparam("row_hash")),
+            hashes,
+        )
+
+        return len(hashes)
+
+    @classmethod
+    def account_legs(
+        cls,
+        account_ids: list[int] | None = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+        archive_years: Iterable[int] = (),
+    ) -> Select:
+        """Return a select of one row per account affected by each
+        categorized transaction, with the amount signed by side:
+        credits are positive and debits are negative. Summing the
+        amounts for an account gives the same value as Account.balance
+        before it is negated for debit increase accounts.
+
+        Parameters
+        ----------
+            account_ids (list[int]) : Optional. Only return the legs for
+                these accounts. If not given, returns the legs of every
+                account.
+            start_date (datetime) : Optional. Only return the legs of
+                transactions on or after this date.
+            end_date (datetime) : Optional. Only return the legs of
+                transactions on or before this date.
+            after (datetime) : Optional. Only return the legs of
+                transactions strictly after this date, such as the date
+                of a period close.
+            archive_years (Iterable[int]) : Optional. The years of the
+                archives to also read from. They must be attached to the
+                connection the select is executed on.
+
+        Returns
+        -------
+            (Select) : A select with the columns account_id, amount, and
+                transaction_date.
+        """
+        def date_conditions(date_column) -> list[ColumnElement[bool]]:
+            """Return the date bounds of the legs on the column."""
+            conditions: list[ColumnElement[bool]] = []
+
+            if start_date is not None:
+                conditions.append(date_column >= start_date)
+
+            if end_date is not None:
+                conditions.append(date_column <= end_date)
+
+            if after is not None:
+                conditions.append(date_column > after)
+
+            return conditions
+
+        # The legs of the transactions table are its categorized
+        # postings, read from the account and date index.
+        posting_legs = select(
+            Posting.account_id.label("account_id"),
+            Posting.amount.label("amount"),
+            Posting.transaction_date.label("transaction_date"),
+        ).where(Posting.categorized, *date_conditions(Posting.transaction_date))
+
+        if account_ids is not None:
+            posting_legs = posting_legs.where(Posting.account_id.in_(account_ids))
+
+        leg_selects: list[Select] = [posting_legs]
+
+        # The archives are read from their debit and credit columns.
+        for table in [cls.archive_table(year) for year in archive_years]:
+            conditions: list[ColumnElement[bool]] = [
+                table.c.debit_account_id.is_not(None),
+                table.c.credit_account_id.is_not(None),
+                *date_conditions(table.c.transaction_date),
+            ]
+
+            credit_legs = select(
+                table.c.credit_account_id.label("account_id"),
+                table.c.amount.label("amount"),
+                table.c.transaction_date.label("transaction_date"),
+            ).where(*conditions)
+
+            debit_legs = select(
+                table.c.debit_account_id.label("account_id"),
+                (-table.c.amount).label("amount"),
+                table.c.transaction_date.label("transaction_date"),
+            ).where(*conditions)
+
+            if account_ids is not None:
+                credit_legs = credit_legs.where(
+                    table.c.credit_account_id.in_(account_ids)
+                )
+                debit_legs = debit_legs.where(
+                    table.c.debit_account_id.in_(account_ids)
+                )
+
+            leg_selects += [credit_legs, debit_legs]
+
+        legs = union_all(*leg_selects).subquery("legs")
+
+        return select(
+            legs.c.account_id, legs.c.amount, legs.c.transaction_date
+        )
 
     def __repr__(self):
         return (
             f"<Transaction id={self.id} name={self.name}, "
             f"amount={self.amount}>"
         )
+
+
+@event.listens_for(DbSetup.Base.metadata, "after_create")
+def fill_content_hashes(target: MetaData, connection: Connection, **kw) -> None:
+    """Give the transactions without a content hash one once the tables
+    are created, so that the duplicates of rows added before the column
+    existed are found by later imports.
+
+    Parameters
+    ----------
+        target (MetaData) : The metadata of the created tables.
+        connection (Connection) : The connection they were created on.
+    """
+    Transaction.fill_content_hashes(connection)
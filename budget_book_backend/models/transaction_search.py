@@ -0,0 +1,82 @@
+from typing import Any
+
+from sqlalchemy import (
+    ColumnClause,
+    Connection,
+    MetaData,
+    column,
+    event,
+    literal_column,
+    table,
+)
+
+from .db_setup import DbSetup
+
+SEARCH_TABLE_NAME: str = "transactions_fts"
+
+# An external content FTS5 table: it only stores the index and reads the
+# name and description back from the transactions table by rowid. The
+# prefix indexes make the prefix queries of search_transactions fast.
+SEARCH_TABLE_DDL: list[str] = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE_NAME} USING fts5(
+        name,
+        description,
+        content='transactions',
+        content_rowid='id',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE_NAME}_insert
+    AFTER INSERT ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE_NAME}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE_NAME}_delete
+    AFTER DELETE ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE_NAME}({SEARCH_TABLE_NAME}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE_NAME}_update
+    AFTER UPDATE OF name, description ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE_NAME}({SEARCH_TABLE_NAME}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {SEARCH_TABLE_NAME}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+# The FTS5 table for use in Core selects. Its own name is the column
+# that MATCH and bm25() are applied to.
+transactions_fts = table(SEARCH_TABLE_NAME, column("rowid"))
+search_column: ColumnClause[Any] = literal_column(SEARCH_TABLE_NAME)
+
+
+@event.listens_for(DbSetup.Base.metadata, "after_create")
+def create_search_table(target: MetaData, connection: Connection, **kw) -> None:
+    """Create the full-text search table of the transactions and the
+    triggers that keep it in sync, after the model tables are created.
+
+    The index is built from the existing transactions the first time,
+    e.g. for a database created before the search table existed.
+
+    Parameters
+    ----------
+        target (MetaData) : The metadata of the created tables.
+        connection (Connection) : The connection they were created on.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists: bool = (
+        connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE_NAME,)
+        ).first()
+        is not None
+    )
+
+    for statement in SEARCH_TABLE_DDL:
+        connection.exec_driver_sql(statement)
+
+    if not exists:
+        connection.exec_driver_sql(
+            f"INSERT INTO {SEARCH_TABLE_NAME}({SEARCH_TABLE_NAME}) VALUES ('rebuild')"
+        )
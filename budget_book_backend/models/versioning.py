@@ -0,0 +1,36 @@
+from typing import Any, Optional
+
+
+class VersionConflict(Exception):
+    """Raised when a row was changed by another request since the client
+    read it, so the client's change would overwrite it."""
+
+    def __init__(self, description: str, version: int) -> None:
+        super().__init__(f"{description} was changed by another request.")
+        # The row's current version, for the client to reload it with.
+        self.version: int = version
+
+
+def check_version(
+    description: str, current_version: int, expected_version: Optional[Any]
+) -> None:
+    """Raise a VersionConflict if the client read the row at another
+    version than the one in the database.
+
+    The mappers of the versioned models also check the version they read
+    in the WHERE clause of their UPDATE, which catches a change made
+    between this check and the update.
+
+    Parameters
+    ----------
+        description (str) : The row, e.g. "Transaction with ID 3".
+        current_version (int) : The version of the row in the database.
+        expected_version (int | str) : Optional. The version the client
+            read. Nothing is checked if it is not given.
+
+    Raises
+    ------
+        (VersionConflict) when the versions differ.
+    """
+    if expected_version is not None and int(expected_version) != current_version:
+        raise VersionConflict(description, current_version)
@@ -0,0 +1,261 @@
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, ParamSpec, TypeVar
+from weakref import WeakSet
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy.exc import OperationalError
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class WriteQueueFull(Exception):
+    """Raised when a write is refused because WRITE_QUEUE_MAX_SIZE writes
+    are already waiting."""
+
+
+def is_busy_error(error: OperationalError) -> bool:
+    """Return whether the error is SQLite failing to get its write lock,
+    which is worth retrying."""
+    return "is locked" in str(error.orig)
+
+
+class WriteQueue:
+    """Flask extension that runs every write of the app on one writer
+    thread, so that the app's own threads never fight over SQLite's
+    write lock. Reads are not queued and still run in parallel.
+
+    At most WRITE_QUEUE_MAX_SIZE writes may wait before new ones are
+    refused with a 503. A write that still finds the database locked,
+    e.g. by another server process, is retried up to WRITE_RETRIES
+    times, waiting WRITE_RETRY_BACKOFF_MS before the first retry and
+    twice as long before each one after.
+    """
+
+    name: str = "budget_book_write_queue"
+
+    # Every started queue, so that their writer threads can be restarted
+    # after a fork.
+    instances: "WeakSet[WriteQueue]" = WeakSet()
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.max_size: int = 1000
+        self.max_retries: int = 5
+        self.backoff_seconds: float = 0.01
+        self.queue: queue.Queue
+        self.thread: threading.Thread
+        self.writes: int = 0
+        self.retries: int = 0
+        self.failures: int = 0
+        self.rejected: int = 0
+        self.max_depth: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Start the writer thread with the queue size and retries set in
+        the app's config, and register the extension on the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app whose writes to run.
+        """
+        self.max_size = app.config.get("WRITE_QUEUE_MAX_SIZE", 1000)
+        self.max_retries = app.config.get("WRITE_RETRIES", 5)
+        self.backoff_seconds = app.config.get("WRITE_RETRY_BACKOFF_MS", 10) / 1000
+        self.start()
+        WriteQueue.instances.add(self)
+
+        app.register_error_handler(WriteQueueFull, self.refuse)
+        app.extensions[self.name] = self
+
+    def start(self) -> None:
+        """Start the writer thread with an empty queue."""
+        self.queue = queue.Queue(maxsize=self.max_size)
+        self.thread = threading.Thread(
+            target=self.run, name="budget-books-writer", daemon=True
+        )
+        self.thread.start()
+
+    def restart_after_fork(self) -> None:
+        """Start a new writer thread in a newly forked child, which only
+        inherits the thread that forked it. The writes queued in the
+        parent are left to the parent's writer.
+        """
+        self._lock = threading.Lock()
+        self.start()
+
+    def submit(self, write: Callable[[], T]) -> T:
+        """Queue the write and wait for the writer thread to run it.
+
+        The write runs in a copy of the caller's context, so it uses the
+        same app, request, and user's database, and what it records in
+        the context, such as when it last wrote, is copied back.
+
+        Parameters
+        ----------
+            write (Callable) : The write to run.
+
+        Returns
+        -------
+            The value returned by the write.
+
+        Raises
+        ------
+            (WriteQueueFull) when too many writes are already waiting.
+            Whatever the write raised.
+        """
+        if threading.current_thread() is self.thread:
+            # A write made by another write is already on the writer.
+            return write()
+
+        context: contextvars.Context = contextvars.copy_context()
+        result: Future = Future()
+
+        try:
+            self.queue.put_nowait((context, write, result))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+
+            raise WriteQueueFull(
+                "Too many writes are pending. Please try again later."
+            )
+
+        with self._lock:
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+        value: T = result.result()
+
+        for var, var_value in context.items():
+            if var.get(None) is not var_value:
+                var.set(var_value)
+
+        return value
+
+    def run(self) -> None:
+        """Run the queued writes one at a time until shut down."""
+        while True:
+            item: Optional[tuple] = self.queue.get()
+
+            if item is None:
+                self.queue.task_done()
+                return
+
+            context, write, result = item
+
+            try:
+                result.set_result(context.run(self.call_with_retries, write))
+            except BaseException as e:
+                with self._lock:
+                    self.failures += 1
+
+                result.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    def call_with_retries(self, write: Callable[[], T]) -> T:
+        """Run the write, retrying with backoff while the database is
+        locked.
+
+        Parameters
+        ----------
+            write (Callable) : The write to run.
+
+        Returns
+        -------
+            The value returned by the write.
+        """
+        delay: float = self.backoff_seconds
+        attempt: int = 0
+
+        while True:
+            try:
+                value: T = write()
+            except OperationalError as e:
+                if not is_busy_error(e) or attempt == self.max_retries:
+                    raise
+
+                with self._lock:
+                    self.retries += 1
+
+                attempt += 1
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+            with self._lock:
+                self.writes += 1
+
+            return value
+
+    def refuse(self, error: WriteQueueFull) -> tuple[str, int]:
+        """Respond to a refused write with a 503 status."""
+        return json.dumps(dict(message="ERROR", error=str(error))), 503
+
+    def stats(self) -> dict:
+        """Return how many writes are waiting, the most that have waited
+        at once, and how many writes ran, were retried, failed, or were
+        refused."""
+        with self._lock:
+            return dict(
+                depth=self.queue.qsize(),
+                max_depth=self.max_depth,
+                max_size=self.max_size,
+                writes=self.writes,
+                retries=self.retries,
+                failures=self.failures,
+                rejected=self.rejected,
+            )
+
+    def shutdown(self) -> None:
+        """Stop the writer thread once the queued writes have run."""
+        self.queue.put(None)
+        self.thread.join()
+
+
+def _restart_writers_after_fork() -> None:
+    """Restart the writer thread of every queue in a newly forked child,
+    e.g. a server worker forked from a preloaded app."""
+    for write_queue in list(WriteQueue.instances):
+        write_queue.restart_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_writers_after_fork)
+
+
+def serialized_write(write: Callable[P, T]) -> Callable[P, T]:
+    """Run the decorated service on the current app's writer thread when
+    WRITE_QUEUE is enabled, and directly otherwise.
+
+    Parameters
+    ----------
+        write (Callable) : A service that writes to the database.
+
+    Returns
+    -------
+        (Callable) : The service, routed through the write queue.
+    """
+
+    @functools.wraps(write)
+    def queued_write(*args: P.args, **kwargs: P.kwargs) -> T:
+        write_queue: Any = (
+            current_app.extensions.get(WriteQueue.name) if has_app_context() else None
+        )
+
+        if write_queue is None:
+            return write(*args, **kwargs)
+
+        return write_queue.submit(functools.partial(write, *args, **kwargs))
+
+    return queued_write
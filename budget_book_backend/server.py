@@ -0,0 +1,124 @@
+"""Production server entry point.
+
+Serves the Flask app with gunicorn, using a pool of worker processes
+that each run a pool of threads. The bind address, pool sizes, and
+timeouts come from the SERVER_* config values, which can be set with
+BUDGET_BOOKS_* environment variables, e.g.
+
+    BUDGET_BOOKS_SERVER_BIND=0.0.0.0:8000 BUDGET_BOOKS_SERVER_WORKERS=4 \\
+        poetry run backend-server
+
+Requires the "server" extra.
+"""
+from typing import Any, Optional
+
+from flask import Flask
+from gunicorn.app.base import BaseApplication
+
+from budget_book_backend.backend import create_app
+from budget_book_backend.models.db_setup import dispose_all_engines
+
+# The config flags of the features that keep the ledger's state in the
+# process's memory, so that each worker only sees its own writes.
+SINGLE_PROCESS_FEATURES: tuple[str, ...] = ("LEDGER_INDEX", "REPORT_CACHE")
+
+
+def single_process_features(app: Flask) -> list[str]:
+    """Return the config flags of the enabled features that are only
+    consistent with a single worker process."""
+    return [flag for flag in SINGLE_PROCESS_FEATURES if app.config.get(flag)]
+
+
+def server_options(app: Flask) -> dict[str, Any]:
+    """Build the gunicorn settings from the app's config.
+
+    Parameters
+    ----------
+        app (Flask) : The app to serve.
+
+    Unless SERVER_WORKERS is set, 2 workers are started, or only 1 when
+    a single process feature such as LEDGER_INDEX is enabled.
+
+    Returns
+    -------
+        (dict) : The gunicorn settings, by setting name.
+    """
+    workers: Optional[int] = app.config["SERVER_WORKERS"]
+
+    if workers is None:
+        workers = 1 if single_process_features(app) else 2
+
+    return dict(
+        bind=str(app.config["SERVER_BIND"]),
+        workers=int(workers),
+        threads=int(app.config["SERVER_THREADS"]),
+        worker_class="gthread",
+        keepalive=int(app.config["SERVER_KEEPALIVE"]),
+        timeout=int(app.config["SERVER_TIMEOUT"]),
+        graceful_timeout=int(app.config["SERVER_GRACEFUL_TIMEOUT"]),
+        # Load the app once in the arbiter and fork it into the workers.
+        # Each worker's connection pools are reset after the fork.
+        preload_app=True,
+        worker_exit=worker_exit,
+        on_exit=on_exit,
+    )
+
+
+def worker_exit(server: Any, worker: Any) -> None:
+    """Close the worker's pooled database connections once it has
+    finished its in-flight requests."""
+    dispose_all_engines()
+
+
+def on_exit(server: Any) -> None:
+    """Close the arbiter's pooled database connections on shutdown."""
+    dispose_all_engines()
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn application that serves an already created Flask app."""
+
+    def __init__(self, app: Flask, options: Optional[dict] = None) -> None:
+        """Set up the server, refusing to start several workers when a
+        single process feature is enabled.
+
+        Parameters
+        ----------
+            app (Flask) : The app to serve.
+            options (dict) : Optional. The gunicorn settings, by default
+                built from the app's config.
+
+        Raises
+        ------
+            (RuntimeError) when LEDGER_INDEX or REPORT_CACHE is enabled
+                with more than one worker.
+        """
+        self.application: Flask = app
+        self.options: dict[str, Any] = options or server_options(app)
+
+        features: list[str] = single_process_features(app)
+        workers: int = int(self.options.get("workers", 1))
+
+        if features and workers > 1:
+            raise RuntimeError(
+                f"{' and '.join(features)} need a single worker process, "
+                f"but SERVER_WORKERS is {workers}."
+            )
+
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Flask:
+        return self.application
+
+
+def main() -> None:
+    """Create the Flask app and serve it with the production server."""
+    ProductionServer(create_app()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 """Subpackage for organizing the logic and routes for transactions."""
 
 from .transaction_routes import transaction_routes
+from .group_commit import GroupCommit
@@ -0,0 +1,151 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+
+from flask import Flask
+
+from budget_book_backend.models.db_setup import (
+    DbSetup,
+    last_write_time,
+    record_write_time,
+)
+
+from .transaction_services import categorize_transaction_batches
+
+
+@dataclass
+class PendingBatch:
+    """The categorize requests waiting to be committed together."""
+
+    requests: list[list[dict]] = field(default_factory=list)
+    results: list[Future] = field(default_factory=list)
+    # Set once the batch holds GROUP_COMMIT_MAX_BATCH requests, so its
+    # leader need not wait out the rest of the window.
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class GroupCommit:
+    """Flask extension that commits the categorize requests arriving
+    within GROUP_COMMIT_WINDOW_MS of each other in one transaction.
+
+    The first request of a batch leads it: it waits out the window, or
+    until GROUP_COMMIT_MAX_BATCH requests have joined, then categorizes
+    the transactions of every request with a single commit and hands
+    each request its own result. Requests to different users' databases
+    are batched separately.
+    """
+
+    name: str = "budget_book_group_commit"
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.window_seconds: float = 0.005
+        self.max_batch: int = 100
+        self.batches: int = 0
+        self.requests: int = 0
+        self._pending: dict[Optional[str], PendingBatch] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read the window and batch size from the app's config and
+        register the extension on the app.
+
+        Parameters
+        ----------
+            app (Flask) : The app whose writes to group.
+        """
+        self.window_seconds = app.config.get("GROUP_COMMIT_WINDOW_MS", 5) / 1000
+        self.max_batch = app.config.get("GROUP_COMMIT_MAX_BATCH", 100)
+
+        app.extensions[self.name] = self
+
+    def categorize(self, transactions: list[dict]) -> dict:
+        """Categorize the transactions along with the other requests of
+        the current batch.
+
+        Parameters
+        ----------
+            transactions (list[dict]) : The transactions to categorize,
+                as given to categorize_transactions.
+
+        Returns
+        -------
+            (dict) : The message of this request, as returned by
+                categorize_transactions.
+        """
+        tenant_id: Optional[str] = DbSetup.current_tenant()
+        result: Future = Future()
+
+        with self._lock:
+            batch: Optional[PendingBatch] = self._pending.get(tenant_id)
+            is_leader: bool = batch is None
+
+            if batch is None:
+                batch = self._pending[tenant_id] = PendingBatch()
+
+            batch.requests.append(transactions)
+            batch.results.append(result)
+
+            if len(batch.requests) >= self.max_batch:
+                # Later requests start a new batch.
+                del self._pending[tenant_id]
+                batch.full.set()
+
+        if is_leader:
+            self.commit(tenant_id, batch)
+
+        message, written_at = result.result()
+
+        if written_at:
+            # The leader's thread committed the write, so it is recorded
+            # for this request's reads here.
+            record_write_time(written_at)
+
+        return message
+
+    def commit(self, tenant_id: Optional[str], batch: PendingBatch) -> None:
+        """Wait for the batch to fill, then categorize all of its
+        requests with one commit and set their results, along with when
+        the commit was made.
+
+        Parameters
+        ----------
+            tenant_id (str | None) : The user whose database the batch
+                writes to, if the app is sharded by user.
+            batch (PendingBatch) : The batch this request leads.
+        """
+        batch.full.wait(self.window_seconds)
+
+        with self._lock:
+            if self._pending.get(tenant_id) is batch:
+                del self._pending[tenant_id]
+
+            self.batches += 1
+            self.requests += len(batch.requests)
+
+        try:
+            messages: list[dict] = categorize_transaction_batches(batch.requests)
+        except Exception as e:
+            for result in batch.results:
+                result.set_exception(e)
+            return
+
+        written_at: float = last_write_time()
+
+        for result, message in zip(batch.results, messages):
+            result.set_result((message, written_at))
+
+    def stats(self) -> dict:
+        """Return how many batches have been committed and the average
+        number of requests in each."""
+        with self._lock:
+            return dict(
+                batches=self.batches,
+                requests=self.requests,
+                average_batch_size=self.requests / self.batches
+                if self.batches
+                else 0.0,
+            )
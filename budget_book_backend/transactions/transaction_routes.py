@@ -1,14 +1,22 @@
-from flask import Blueprint, request
+from datetime import datetime
+from typing import Iterator, Mapping, Optional
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from sqlalchemy.orm import Session
 
 import json
+from budget_book_backend.jobs.job_routes import submit_job
 from budget_book_backend.utils import endpoint_error_wrapper
 
+from .group_commit import GroupCommit
 from .transaction_services import (
     get_transactions_by_account,
     add_new_transactions,
     categorize_transactions,
     update_transactions,
     remove_transactions,
+    archive_transactions,
+    search_transactions,
+    export_transactions,
 )
 
 
@@ -23,10 +31,46 @@ def get_transactions():
     """Return all the transactions that are associated with the
     account_id OR all of the given transaction categories.
 
+    Transactions in archived years are only included when
+    include_archived is true.
+
+    Request Arguments
+    -----------------
+        account_ids (str) : Comma separated account IDs.
+        categorize_type (str) : "uncategorized", "categorized", or "all".
+            Defaults to "all".
+        include_archived (bool) : Whether to include archived years.
+            Defaults to false.
+        start_date (date str) : The earliest transaction date. Optional.
+        end_date (date str) : The latest transaction date. Optional.
+        min_amount (float) : The smallest amount. Optional.
+        max_amount (float) : The largest amount. Optional.
+        order (str) : "asc" or "desc" to order by date. Optional.
+
     Example of arguments:
-        ?account_ids=1,2
+        ?account_ids=1,2&include_archived=true
+        ?account_ids=1&start_date=2023-01-01&min_amount=100&order=desc
+    """
+    return transactions_response(request.args)
+
+
+def transactions_response(
+    args: Mapping, session: Optional[Session] = None
+) -> tuple[str, int]:
+    """Build the response for GET /api/transactions from the request
+    arguments. Shared by the Flask route and the ASGI app so that both
+    return the same response.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+        session (Session) : Optional. The session to read from.
+
+    Returns
+    -------
+        (tuple[str, int]) : The JSON response and its status code.
     """
-    url_account_ids: str | None = request.args.get("account_ids")
+    url_account_ids: str | None = args.get("account_ids")
 
     if url_account_ids is None:
         return (
@@ -51,11 +95,13 @@ def get_transactions():
         )
 
     account_ids: list[int] = list(map(int, account_id_strings))
-    categorize_type: str = request.args.get("categorize_type", "all")
 
-    transactions: list[dict] = get_transactions_by_account(
-        account_ids, categorize_type
-    )
+    try:
+        transactions: list[dict] = get_transactions_by_account(
+            account_ids, session=session, **transaction_filters(args)
+        )
+    except ValueError as e:
+        return json.dumps(dict(message="ERROR", error=str(e))), 400
 
     return_dict: dict = {
         "message": "SUCCESS",
@@ -65,6 +111,120 @@ def get_transactions():
     return (json.dumps(return_dict), 200)
 
 
+def transaction_filters(args: Mapping) -> dict:
+    """Parse the filters of GET /api/transactions and its export from the
+    request arguments.
+
+    Parameters
+    ----------
+        args (Mapping) : The request arguments.
+
+    Returns
+    -------
+        (dict) : The keyword arguments of the filters for
+            get_transactions_by_account and export_transactions.
+
+    Raises
+    ------
+        (ValueError) when a date or amount cannot be parsed.
+    """
+    return dict(
+        categorize_type=args.get("categorize_type", "all"),
+        include_archived=args.get("include_archived", "false").lower() == "true",
+        start_date=(
+            datetime.strptime(args["start_date"], "%Y-%m-%d")
+            if "start_date" in args
+            else None
+        ),
+        end_date=(
+            datetime.strptime(args["end_date"], "%Y-%m-%d")
+            if "end_date" in args
+            else None
+        ),
+        min_amount=float(args["min_amount"]) if "min_amount" in args else None,
+        max_amount=float(args["max_amount"]) if "max_amount" in args else None,
+        order=args.get("order"),
+    )
+
+
+@endpoint_error_wrapper
+@transaction_routes.route(f"{BASE_TRANSACTION_URL}/search", methods=["GET"])
+def get_transaction_search():
+    """Return a page of the transactions whose name or description match
+    the search query, best matches first.
+
+    Request Arguments
+    -----------------
+        q (str) : The words to search for.
+        account_ids (str) : Comma separated account IDs to search within.
+            Optional.
+        start_date (date str) : The earliest transaction date. Optional.
+        end_date (date str) : The latest transaction date. Optional.
+        limit (int) : The size of a page. Defaults to 50.
+        offset (int) : How many matches to skip. Defaults to 0.
+
+    Example of arguments:
+        ?q=rent&account_ids=2,4&start_date=2023-01-01&limit=20&offset=20
+    """
+    try:
+        url_account_ids: str | None = request.args.get("account_ids")
+        start_date: str | None = request.args.get("start_date")
+        end_date: str | None = request.args.get("end_date")
+
+        response: dict = search_transactions(
+            request.args.get("q", ""),
+            account_ids=(
+                [int(id) for id in url_account_ids.split(",") if id]
+                if url_account_ids
+                else None
+            ),
+            start_date=(
+                datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+            ),
+            end_date=datetime.strptime(end_date, "%Y-%m-%d") if end_date else None,
+            limit=int(request.args.get("limit", 50)),
+            offset=int(request.args.get("offset", 0)),
+        )
+    except ValueError as e:
+        response = dict(message="ERROR", error=str(e))
+
+    return json.dumps(response), 200 if response["message"] == "SUCCESS" else 400
+
+
+@endpoint_error_wrapper
+@transaction_routes.route(f"{BASE_TRANSACTION_URL}/export", methods=["GET"])
+def get_transaction_export():
+    """Stream the transactions of the given accounts as a CSV file, with
+    the names of the accounts on both sides of each transaction.
+
+    Takes the same request arguments as GET /api/transactions. The rows
+    are read from the database and sent in chunks, so large exports are
+    never held in memory whole.
+
+    Example of arguments:
+        ?account_ids=1,2&include_archived=true&order=asc
+    """
+    try:
+        account_ids: list[int] = [
+            int(id) for id in request.args.get("account_ids", "").split(",") if id
+        ]
+
+        if not account_ids:
+            raise ValueError("URL is missing account_ids values.")
+
+        csv_text: Iterator[str] = export_transactions(
+            account_ids, **transaction_filters(request.args)
+        )
+    except ValueError as e:
+        return json.dumps(dict(message="ERROR", error=str(e))), 400
+
+    return Response(
+        stream_with_context(csv_text),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=transactions.csv"},
+    )
+
+
 @endpoint_error_wrapper
 @transaction_routes.route(f"{BASE_TRANSACTION_URL}", methods=["POST"])
 def post_new_transactions():
@@ -80,14 +240,27 @@ def post_new_transactions():
                 "credit_account_id": "1",
                 "transaction_date": "2022-10-02"
             }
-        ]
+        ],
+        "background": false,
+        "dry_run": false
     }
+
+    Transactions that were already imported are skipped, and the
+    numbers of new and duplicate transactions are returned. With
+    "dry_run": true, nothing is added and only those numbers are
+    returned. With "background": true, the transactions are imported
+    by a background job and its job ID is returned instead.
     """
     request_json: dict = request.get_json()
 
+    if request_json.get("background"):
+        return submit_job("transaction_import", request_json)
+
     transactions: list[dict] = request_json.get("transactions", [])
 
-    status_dict: dict = add_new_transactions(transactions)
+    status_dict: dict = add_new_transactions(
+        transactions, dry_run=bool(request_json.get("dry_run", False))
+    )
 
     return (
         json.dumps(status_dict),
@@ -116,7 +289,12 @@ def put_category():
 
     transactions: list[dict] = request_json.get("transactions", [])
 
-    status_dict: dict = categorize_transactions(transactions)
+    group_commit: Optional[GroupCommit] = current_app.extensions.get(GroupCommit.name)
+
+    if group_commit is not None:
+        status_dict: dict = group_commit.categorize(transactions)
+    else:
+        status_dict = categorize_transactions(transactions)
 
     return (
         json.dumps(status_dict),
@@ -206,3 +384,33 @@ def delete():
         json.dumps(status_dict),
         200,
     )
+
+
+@endpoint_error_wrapper
+@transaction_routes.route(f"{BASE_TRANSACTION_URL}/archive", methods=["POST"])
+def post_archive_transactions():
+    """Move the transactions of a closed year into its archive file.
+
+    Example request.json:
+    {
+        "year": 2019
+    }
+    """
+    request_json: dict = request.get_json()
+
+    year: int | None = request_json.get("year")
+
+    if year is None:
+        return (
+            json.dumps(
+                dict(
+                    message="ERROR",
+                    error="No field for 'year' found within the request body.",
+                )
+            ),
+            400,
+        )
+
+    status_dict: dict = archive_transactions(int(year))
+
+    return json.dumps(status_dict), 200 if status_dict["message"] == "SUCCESS" else 400
@@ -1,110 +1,550 @@
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-import pandas as pd
-
-from budget_book_backend.models.db_setup import DbSetup
+from typing import Iterator, Optional, Sequence
+
+from budget_book_backend.models.account import Account
+from budget_book_backend.models.account_summary import AccountSummary
+from budget_book_backend.models.archive import (
+    ArchivedBalance,
+    TransactionArchive,
+    attached_archives,
+)
+from budget_book_backend.models.db_setup import DbSetup, begin_for_savepoints
+from budget_book_backend.models.period_close import PeriodClose
+from budget_book_backend.models.posting import Posting
+from budget_book_backend.models.read_models import TransactionRow
 from budget_book_backend.models.transaction import Transaction
-from budget_book_backend.utils import dict_to_json
-from sqlalchemy import text, select
+from budget_book_backend.models.transaction_search import (
+    search_column,
+    transactions_fts,
+)
+from budget_book_backend.models.versioning import VersionConflict, check_version
+from budget_book_backend.models.write_queue import serialized_write
+from budget_book_backend.utils import csv_chunks
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.exc import StaleDataError
 import sqlalchemy as sqla
 
+# The number of rows fetched from the cursor at a time by the exports.
+EXPORT_CHUNK_SIZE: int = 1000
+
+# The number of content hashes looked up per query by the imports.
+HASH_PROBE_BATCH_SIZE: int = 500
+
+TRANSACTION_EXPORT_COLUMNS: list[str] = [
+    "id",
+    "transaction_date",
+    "name",
+    "description",
+    "amount",
+    "debit_account_id",
+    "debit_account",
+    "credit_account_id",
+    "credit_account",
+]
+
+
+def matching_transactions(
+    account_ids: list[int],
+    archive_years: Sequence[int] = (),
+    categorize_type: str = "all",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> sqla.CompoundSelect:
+    """Return the union of the selects of the matching TransactionRows of
+    the transactions table and of the attached archive tables, with every
+    filter in the WHERE clause of each select.
+
+    Parameters
+    ----------
+        account_ids (list of ints) : The accounts on either side of the
+            transactions.
+        archive_years (Sequence[int]) : Optional. The years of the
+            attached archive tables to also read.
+        categorize_type (str) : Optional. "uncategorized",
+            "categorized", or "all". Defaults to "all".
+        start_date (datetime) : Optional. The earliest transaction date.
+        end_date (datetime) : Optional. The latest transaction date.
+        min_amount (float) : Optional. The smallest amount.
+        max_amount (float) : Optional. The largest amount.
+
+    Returns
+    -------
+        (CompoundSelect) : The unordered union of the matching rows.
+    """
+
+    categorized: Optional[bool] = dict(categorized=True, uncategorized=False).get(
+        categorize_type
+    )
+
+    def matching(table: sqla.Table) -> sqla.Select:
+        """Return the select of the matching transactions of the table."""
+        query = TransactionRow.query(table)
+
+        if table is Transaction.__table__:
+            # Find the transactions of the accounts from their postings.
+            query = query.where(
+                table.c.id.in_(
+                    Posting.transaction_ids(
+                        account_ids, start_date, end_date, categorized
+                    )
+                )
+            )
+        else:
+            query = query.where(
+                sqla.or_(
+                    table.c.debit_account_id.in_(account_ids),
+                    table.c.credit_account_id.in_(account_ids),
+                )
+            )
+
+            if categorized is False:
+                query = query.where(
+                    sqla.or_(
+                        table.c.debit_account_id.is_(None),
+                        table.c.credit_account_id.is_(None),
+                    )
+                )
+            elif categorized:
+                query = query.where(
+                    table.c.debit_account_id.is_not(None),
+                    table.c.credit_account_id.is_not(None),
+                )
+
+            if start_date is not None:
+                query = query.where(table.c.transaction_date >= start_date)
+
+            if end_date is not None:
+                query = query.where(table.c.transaction_date <= end_date)
+
+        if min_amount is not None:
+            query = query.where(table.c.amount >= min_amount)
+
+        if max_amount is not None:
+            query = query.where(table.c.amount <= max_amount)
+
+        return query
+
+    return sqla.union_all(
+        *(
+            matching(table)
+            for table in [Transaction.__table__]
+            + [Transaction.archive_table(year) for year in archive_years]
+        )
+    )
+
 
 def get_transactions_by_account(
-    account_ids: list[int], categorize_type: str = "all"
+    account_ids: list[int],
+    categorize_type: str = "all",
+    session: Optional[Session] = None,
+    include_archived: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    order: Optional[str] = None,
 ) -> list[dict]:
     """Return all the transactions that are associated with the
     account_id OR all of the given transaction categories.
 
+    Every filter is applied in the WHERE clause of the query of each
+    table read, so only the matching rows are read from the database.
+
     Parameters
     ----------
         account_ids (list of ints) : The account/category ID's to fetch
             the transactions from.
         categorize_type (str) : Whether to only fetch uncategorized,
             categorized, or all kinds of transactions.
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
+        include_archived (bool) : Optional. Whether to also read the
+            transactions of the archived years within the dates.
+            Defaults to False.
+        start_date (datetime) : Optional. The earliest transaction date.
+        end_date (datetime) : Optional. The latest transaction date.
+        min_amount (float) : Optional. The smallest amount.
+        max_amount (float) : Optional. The largest amount.
+        order (str) : Optional. "asc" or "desc" to order the
+            transactions by date. If not given, they are in the order
+            they were added.
 
     Returns
     -------
         (list of dicts) : List of dictionary transaction objects
             matching the given query.
     """
-    df: pd.DataFrame = pd.DataFrame()
-
-    if len(account_ids) == 1:
-        df = pd.read_sql_query(
-            text(
-                f"""SELECT * FROM transactions
-                WHERE debit_account_id = {account_ids[0]}
-                    OR credit_account_id = {account_ids[0]}"""
-            ),
-            DbSetup.engine.connect(),
+    if order not in (None, "asc", "desc"):
+        raise ValueError(f"Order must be asc or desc, not {order}.")
+
+    with DbSetup.use_session(session, read_only=True) as session:
+        archives: list[TransactionArchive] = (
+            TransactionArchive.reached_by(
+                session, start_date=start_date, end_date=end_date
+            )
+            if include_archived
+            else []
+        )
+
+        with attached_archives(session.connection(), archives) as archive_years:
+            query = matching_transactions(
+                account_ids,
+                archive_years,
+                categorize_type,
+                start_date,
+                end_date,
+                min_amount,
+                max_amount,
+            )
+
+            if order is not None:
+                transaction_date = query.selected_columns.transaction_date
+                query = query.order_by(
+                    transaction_date.desc() if order == "desc" else transaction_date,
+                    query.selected_columns.id,
+                )
+
+            rows: list[TransactionRow] = TransactionRow.load(session, query)
+
+    return [row.to_dict() for row in rows]
+
+
+def export_transactions(
+    account_ids: list[int],
+    categorize_type: str = "all",
+    include_archived: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    order: Optional[str] = None,
+) -> Iterator[str]:
+    """Return the CSV text of the transactions matching the same filters
+    as get_transactions_by_account, with the names of the accounts on
+    both sides joined in.
+
+    The rows are streamed from the database EXPORT_CHUNK_SIZE at a time
+    and written out chunk by chunk as the returned iterator is consumed,
+    so the export never holds the full result in memory. Its session
+    stays open until the iterator is exhausted or closed.
+
+    Parameters
+    ----------
+        account_ids (list of ints) : The account/category ID's to export
+            the transactions of.
+        categorize_type (str) : Optional. "uncategorized",
+            "categorized", or "all". Defaults to "all".
+        include_archived (bool) : Optional. Whether to also export the
+            transactions of the archived years within the dates.
+            Defaults to False.
+        start_date (datetime) : Optional. The earliest transaction date.
+        end_date (datetime) : Optional. The latest transaction date.
+        min_amount (float) : Optional. The smallest amount.
+        max_amount (float) : Optional. The largest amount.
+        order (str) : Optional. "asc" or "desc" to order the
+            transactions by date.
+
+    Returns
+    -------
+        (Iterator[str]) : The CSV text, header first.
+
+    Raises
+    ------
+        (ValueError) when the order is invalid, before anything is read.
+    """
+    if order not in (None, "asc", "desc"):
+        raise ValueError(f"Order must be asc or desc, not {order}.")
+
+    def csv_text() -> Iterator[str]:
+        with DbSetup.ReadSession() as session:
+            archives: list[TransactionArchive] = (
+                TransactionArchive.reached_by(
+                    session, start_date=start_date, end_date=end_date
+                )
+                if include_archived
+                else []
+            )
+
+            with attached_archives(session.connection(), archives) as archive_years:
+                rows = matching_transactions(
+                    account_ids,
+                    archive_years,
+                    categorize_type,
+                    start_date,
+                    end_date,
+                    min_amount,
+                    max_amount,
+                ).subquery()
+                debit_account = aliased(Account)
+                credit_account = aliased(Account)
+
+                query = (
+                    select(
+                        rows.c.id,
+                        rows.c.transaction_date,
+                        rows.c.name,
+                        rows.c.description,
+                        rows.c.amount,
+                        rows.c.debit_account_id,
+                        debit_account.name,
+                        rows.c.credit_account_id,
+                        credit_account.name,
+                    )
+                    .outerjoin(
+                        debit_account, debit_account.id == rows.c.debit_account_id
+                    )
+                    .outerjoin(
+                        credit_account, credit_account.id == rows.c.credit_account_id
+                    )
+                )
+
+                if order is not None:
+                    query = query.order_by(
+                        rows.c.transaction_date.desc()
+                        if order == "desc"
+                        else rows.c.transaction_date,
+                        rows.c.id,
+                    )
+
+                result = session.execute(
+                    query, execution_options=dict(yield_per=EXPORT_CHUNK_SIZE)
+                )
+
+                yield from csv_chunks(
+                    TRANSACTION_EXPORT_COLUMNS,
+                    (
+                        [
+                            (
+                                row[0],
+                                row[1].strftime("%Y-%m-%d"),
+                                *row[2:],
+                            )
+                            for row in partition
+                        ]
+                        for partition in result.partitions()
+                    ),
+                )
+
+    return csv_text()
+
+
+def search_transactions(
+    query: str,
+    account_ids: Optional[list[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 50,
+    offset: int = 0,
+    session: Optional[Session] = None,
+) -> dict:
+    """Return the transactions whose name or description match the
+    search query, best matches first.
+
+    Each word of the query must match the start of a word in the name or
+    description, so partial words typed so far also match. Archived
+    transactions are not searched.
+
+    Parameters
+    ----------
+        query (str) : The words to search for.
+        account_ids (list[int]) : Optional. Only return transactions on
+            either side of these accounts.
+        start_date (datetime) : Optional. The earliest transaction date.
+        end_date (datetime) : Optional. The latest transaction date.
+        limit (int) : Optional. The size of a page. Defaults to 50.
+        offset (int) : Optional. How many matches to skip. Defaults to 0.
+        session (Session) : Optional. The session to read from. If not
+            given, a new session is opened.
+
+    Returns
+    -------
+        (dict) : The page of transactions and whether there are more
+            matches after it.
+    """
+    # Quote each word so that FTS5 operators in the query are searched
+    # for instead of raising syntax errors.
+    words: list[str] = [
+        '"' + word.replace('"', '""') + '"*' for word in query.split() if word
+    ]
+
+    if not words:
+        return dict(message="ERROR", error="The search query is empty.")
+
+    if limit < 1 or offset < 0:
+        return dict(
+            message="ERROR", error="limit must be positive and offset not negative."
         )
 
-    else:
-        df = pd.read_sql_query(
-            text(
-                f"""SELECT * FROM transactions
-                WHERE debit_account_id IN {tuple(account_ids)}
-                    OR credit_account_id IN {tuple(account_ids)}"""
-            ),
-            DbSetup.engine.connect(),
+    rank = func.bm25(search_column)
+    search_query = (
+        TransactionRow.query()
+        .join(transactions_fts, transactions_fts.c.rowid == Transaction.id)
+        .where(search_column.op("MATCH")(" ".join(words)))
+    )
+
+    if account_ids is not None:
+        search_query = search_query.where(
+            Transaction.id.in_(Posting.transaction_ids(account_ids))
         )
 
-    if categorize_type == "uncategorized":
-        # Only accept those that are uncategorized
-        df = df[(pd.isna(df["debit_account_id"]) | (pd.isna(df["credit_account_id"])))]
+    if start_date is not None:
+        search_query = search_query.where(Transaction.transaction_date >= start_date)
 
-    elif categorize_type == "categorized":
-        # Only accept those that are categorized
-        df = df[
-            (pd.notna(df["debit_account_id"]) & (pd.notna(df["credit_account_id"])))
-        ]
+    if end_date is not None:
+        search_query = search_query.where(Transaction.transaction_date <= end_date)
 
-    # Else, assume all the transactions are wanted.
-    df.fillna("undefined", inplace=True)
+    with DbSetup.use_session(session, read_only=True) as session:
+        # Read one more than the page to know whether there is another.
+        rows: list[TransactionRow] = TransactionRow.load(
+            session,
+            search_query.order_by(rank, Transaction.id).limit(limit + 1).offset(offset),
+        )
+
+    return dict(
+        message="SUCCESS",
+        transactions=[row.to_dict() for row in rows[:limit]],
+        has_more=len(rows) > limit,
+    )
+
+
+def check_period_open(
+    transaction_date: datetime, closed_through: Optional[datetime]
+) -> None:
+    """Raise an exception if the transaction date is in a closed period.
+
+    Parameters
+    ----------
+        transaction_date (datetime) : The date of the transaction being
+            added, changed, or removed.
+        closed_through (datetime) : The date through which periods are
+            closed, or None if none are.
+    """
+    if closed_through is not None and transaction_date <= closed_through:
+        raise Exception(
+            f"Transaction date {transaction_date.strftime('%Y-%m-%d')} is in "
+            f"a period closed through {closed_through.strftime('%Y-%m-%d')}."
+        )
 
-    return dict_to_json(df.to_dict(), df.index)
 
+@serialized_write
+def add_new_transactions(
+    transactions: list[dict],
+    dry_run: bool = False,
+    occurrences: Optional[Counter[str]] = None,
+) -> dict:
+    """Add new transaction(s) with the given information, skipping those
+    that were already imported.
 
-def add_new_transactions(transactions: list[dict]) -> dict:
-    """Add new transaction(s) with the given information.
+    A transaction is a duplicate when an earlier import added the same
+    statement line: the same accounts, date, amount, and name, up to
+    case and whitespace. Each one is found with a probe of the unique
+    content hash index instead of comparing it with the other
+    transactions.
 
     Parameters
     ----------
         transactions (list[dict]) : List of transaction data to add
             to the Transactions table.
+        dry_run (bool) : Optional. Whether to only count the new and
+            duplicate transactions without adding any. Defaults to False.
+        occurrences (Counter[str]) : Optional. The number of lines of
+            each content key in the earlier chunks of the same import,
+            updated with the lines of these transactions. Identical
+            lines are only told apart within one import.
 
     Returns
     -------
         (dict) : Dictionary containing a message about whether or not
-            there was a problem with one or more transacations.
+            there was a problem with one or more transacations, the
+            number of new (added) and duplicate (skipped) transactions,
+            and the indexes of the duplicates in the given list.
     """
 
     with DbSetup.Session() as session:
-        new_transactions: list[Transaction] = []
+        new_transactions: list[tuple[int, Transaction]] = []
         problem_transactions: list[tuple] = []
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+        occurrences = Counter() if occurrences is None else occurrences
 
         for i, trxn in enumerate(transactions):
             try:
-                new_transactions.append(
-                    Transaction(
-                        name=trxn["name"],
-                        description=trxn["description"],
-                        amount=trxn["amount"],
-                        debit_account_id=trxn.get("debit_account_id"),
-                        credit_account_id=trxn.get("credit_account_id"),
-                        transaction_date=datetime.fromisoformat(
-                            trxn["transaction_date"]
-                        ),
-                        date_entered=datetime.now(),
-                    )
+                transaction_date: datetime = datetime.fromisoformat(
+                    trxn["transaction_date"]
+                )
+                check_period_open(transaction_date, closed_through)
+
+                transaction: Transaction = Transaction(
+                    name=trxn["name"],
+                    description=trxn["description"],
+                    amount=trxn["amount"],
+                    debit_account_id=trxn.get("debit_account_id"),
+                    credit_account_id=trxn.get("credit_account_id"),
+                    transaction_date=transaction_date,
+                    date_entered=datetime.now(),
+                )
+                content_key: str = Transaction.content_key(
+                    transaction.debit_account_id,
+                    transaction.credit_account_id,
+                    transaction_date,
+                    transaction.amount,
+                    transaction.name,
+                )
+                transaction.content_hash = Transaction.content_hash_of(
+                    content_key, occurrences[content_key]
                 )
 
+                new_transactions.append((i, transaction))
+                occurrences[content_key] += 1
+
             except KeyError as key_err:
                 problem_transactions.append((i, f"Missing key {str(key_err)}."))
             except Exception as e:
                 problem_transactions.append((i, str(e)))
 
-        session.add_all(new_transactions)
-        session.commit()
+        existing_hashes: set[str] = set()
+
+        for first in range(0, len(new_transactions), HASH_PROBE_BATCH_SIZE):
+            existing_hashes.update(
+                session.scalars(
+                    select(Transaction.content_hash).where(
+                        Transaction.content_hash.in_(
+                            [
+                                transaction.content_hash
+                                for _, transaction in new_transactions[
+                                    first : first + HASH_PROBE_BATCH_SIZE
+                                ]
+                            ]
+                        )
+                    )
+                )
+            )
+
+        duplicate_indexes: list[int] = [
+            i
+            for i, transaction in new_transactions
+            if transaction.content_hash in existing_hashes
+        ]
+        added_transactions: list[Transaction] = [
+            transaction
+            for _, transaction in new_transactions
+            if transaction.content_hash not in existing_hashes
+        ]
+
+        if not dry_run:
+            session.add_all(added_transactions)
+
+            AccountSummary.refresh(
+                session,
+                {trxn.debit_account_id for trxn in added_transactions}
+                | {trxn.credit_account_id for trxn in added_transactions},
+            )
+
+            session.commit()
 
     message: str = "SUCCESS"
 
@@ -114,7 +554,12 @@ def add_new_transactions(transactions: list[dict]) -> dict:
         for idx, problem in problem_transactions:
             message += f"\n{idx}: {problem}"
 
-    return dict(message=message)
+    return dict(
+        message=message,
+        new=len(added_transactions),
+        duplicates=len(duplicate_indexes),
+        duplicate_indexes=duplicate_indexes,
+    )
 
 
 def categorize_transactions(transactions: list[dict]) -> dict:
@@ -130,35 +575,188 @@ def categorize_transactions(transactions: list[dict]) -> dict:
         (dict) : Dictionary containing a message about whether or not
             there was a problem with one or more transacations.
     """
-    problem_transactions: list[tuple] = []
+    return categorize_transaction_batches([transactions])[0]
+
+
+class StaleRow(Exception):
+    """Raised when the update of a row finds it was changed since it was
+    read, with the position of the row in the request batches."""
+
+    def __init__(self, position: tuple[int, int]) -> None:
+        super().__init__(f"Row {position} was changed since it was read.")
+        self.position: tuple[int, int] = position
+
+
+@contextmanager
+def row_savepoint(session: Session, position: tuple[int, int]) -> Iterator[None]:
+    """Change a row in a savepoint of its own and flush it, so that an
+    error writing the row only rolls back that row, leaving the others
+    of the session to be committed.
+
+    Parameters
+    ----------
+        session (Session) : The session changing the row.
+        position (tuple[int, int]) : The position of the row in the
+            request batches.
+
+    Raises
+    ------
+        (StaleRow) when the row was changed since it was read.
+    """
+    begin_for_savepoints(session)
+
+    try:
+        with session.begin_nested():
+            yield
+            session.flush()
+    except StaleDataError as e:
+        raise StaleRow(position) from e
+
+
+@serialized_write
+def categorize_transaction_batches(batches: list[list[dict]]) -> list[dict]:
+    """Categorize the transactions of several requests in one database
+    transaction, so that they share a single commit.
+
+    Each transaction is checked before it is changed, so a problem with
+    one only skips that transaction, as if each had been committed on
+    its own. A transaction given with a version that is no longer its
+    current one is reported as a conflict instead of being changed.
+
+    Parameters
+    ---------
+        batches (list[list[dict]]) : The transactions of each request,
+            as given to categorize_transactions.
+
+    Returns
+    -------
+        (list[dict]) : The message of each request, in the same order,
+            with its conflicts if it had any.
+    """
+    stale_rows: set[tuple[int, int]] = set()
+
+    while True:
+        try:
+            return categorize_batches_once(batches, stale_rows)
+        except StaleRow as stale:
+            # The rolled back transaction took the rows before the stale
+            # one with it, so start over and report it as a conflict.
+            stale_rows.add(stale.position)
+
+
+def categorize_batches_once(
+    batches: list[list[dict]], stale_rows: set[tuple[int, int]]
+) -> list[dict]:
+    """Make one attempt at categorize_transaction_batches.
+
+    Parameters
+    ---------
+        batches (list[list[dict]]) : The transactions of each request.
+        stale_rows (set[tuple[int, int]]) : The (request, row) positions
+            of the transactions that an earlier attempt found changed by
+            another request, to be reported as conflicts.
+
+    Returns
+    -------
+        (list[dict]) : The message of each request, in the same order.
+
+    Raises
+    ------
+        (StaleRow) when a transaction is changed by another request
+            between its read and its update.
+    """
+    problems_by_batch: list[list[tuple]] = [[] for _ in batches]
+    conflicts_by_batch: list[list[dict]] = [[] for _ in batches]
+    touched_account_ids: set[int | None] = set()
 
     with DbSetup.Session() as session:
-        for i, trxn in enumerate(transactions):
-            try:
-                transaction_id: int = trxn["transaction_id"]
-                transaction: Transaction | None = session.get(
-                    Transaction, transaction_id
-                )
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
+        for b, transactions in enumerate(batches):
+            for i, trxn in enumerate(transactions):
+                try:
+                    transaction_id: int = trxn["transaction_id"]
+                    transaction: Transaction | None = session.get(
+                        Transaction, transaction_id
+                    )
 
-                if transaction is None:
-                    raise Exception(
-                        f"Transaction with ID {transaction_id} cannot be found."
+                    if transaction is None:
+                        raise Exception(
+                            f"Transaction with ID {transaction_id} cannot be found."
+                        )
+
+                    check_period_open(
+                        transaction.transaction_date, closed_through  # type: ignore
                     )
 
-                if trxn["debit_or_credit"] == "debit":
-                    transaction.debit_account_id = int(trxn["category_id"])
+                    description: str = f"Transaction with ID {transaction_id}"
 
-                else:
-                    transaction.credit_account_id = int(trxn["category_id"])
+                    if (b, i) in stale_rows:
+                        raise VersionConflict(description, transaction.version)
 
-                session.commit()
+                    check_version(description, transaction.version, trxn.get("version"))
 
-            except KeyError as key_err:
-                problem_transactions.append((i, f"Missing key {str(key_err)}."))
+                    debit_or_credit: str = trxn["debit_or_credit"]
+                    category_id: int = int(trxn["category_id"])
 
-            except Exception as e:
-                problem_transactions.append((i, str(e)))
+                    touched_account_ids |= {
+                        transaction.debit_account_id,
+                        transaction.credit_account_id,
+                        category_id,
+                    }
+
+                    with row_savepoint(session, (b, i)):
+                        if debit_or_credit == "debit":
+                            transaction.debit_account_id = category_id
+
+                        else:
+                            transaction.credit_account_id = category_id
 
+                except StaleRow:
+                    raise
+
+                except VersionConflict as conflict:
+                    problems_by_batch[b].append((i, str(conflict)))
+                    conflicts_by_batch[b].append(
+                        dict(
+                            index=i,
+                            transaction_id=transaction_id,
+                            version=conflict.version,
+                        )
+                    )
+
+                except KeyError as key_err:
+                    problems_by_batch[b].append((i, f"Missing key {str(key_err)}."))
+
+                except Exception as e:
+                    problems_by_batch[b].append((i, str(e)))
+
+        AccountSummary.refresh(session, touched_account_ids)
+        session.commit()
+
+    return [
+        problems_response(problem_transactions, conflicts)
+        for problem_transactions, conflicts in zip(
+            problems_by_batch, conflicts_by_batch
+        )
+    ]
+
+
+def problems_response(problem_transactions: list[tuple], conflicts: list[dict]) -> dict:
+    """Return the message of a request that changes transactions, listing
+    the problem with each transaction that could not be changed.
+
+    Parameters
+    ----------
+        problem_transactions (list[tuple]) : The index of each problem
+            transaction in the request, with its problem.
+        conflicts (list[dict]) : The index, ID, and current version of
+            each transaction that was changed by another request.
+
+    Returns
+    -------
+        (dict) : The message, and the conflicts if there were any.
+    """
     message: str = "SUCCESS"
 
     if len(problem_transactions) != 0:
@@ -167,12 +765,20 @@ def categorize_transactions(transactions: list[dict]) -> dict:
         for idx, problem in problem_transactions:
             message += f"\n{idx}: {problem}"
 
+    if conflicts:
+        return dict(message=message, conflicts=conflicts)
+
     return dict(message=message)
 
 
+@serialized_write
 def update_transactions(transactions: list[dict]) -> dict:
     """Change existing transaction(s) to have new given values.
 
+    The transactions are changed in one database transaction along with
+    the summaries of their accounts, and a problem with one transaction
+    only skips that transaction.
+
     Parameters
     ----------
         transactions (list[dict]) : The list of transactions to
@@ -180,11 +786,51 @@ def update_transactions(transactions: list[dict]) -> dict:
 
     Returns
     -------
-        (dict) : Dictionary containing a status message of the udpates.
+        (dict) : Dictionary containing a status message of the udpates,
+            and the index, ID, and current version of each transaction
+            that was changed by another request since the version given
+            with it, if any were.
+    """
+    stale_rows: set[tuple[int, int]] = set()
+
+    while True:
+        try:
+            return update_transactions_once(transactions, stale_rows)
+        except StaleRow as stale:
+            # The rolled back transaction took the rows before the stale
+            # one with it, so start over and report it as a conflict.
+            stale_rows.add(stale.position)
+
+
+def update_transactions_once(
+    transactions: list[dict], stale_rows: set[tuple[int, int]]
+) -> dict:
+    """Make one attempt at update_transactions.
+
+    Parameters
+    ----------
+        transactions (list[dict]) : The transactions to update.
+        stale_rows (set[tuple[int, int]]) : The (0, row) positions of the
+            transactions that an earlier attempt found changed by
+            another request, to be reported as conflicts.
+
+    Returns
+    -------
+        (dict) : The message of the request, with its conflicts if it
+            had any.
+
+    Raises
+    ------
+        (StaleRow) when a transaction is changed by another request
+            between its read and its update.
     """
     problem_transactions: list[tuple] = []
+    conflicts: list[dict] = []
+    touched_account_ids: set[int | None] = set()
 
     with DbSetup.Session() as session:
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
         for i, trxn in enumerate(transactions):
             try:
                 transaction_id: int = trxn["transaction_id"]
@@ -197,55 +843,88 @@ def update_transactions(transactions: list[dict]) -> dict:
                         f"Transaction with ID of {transaction_id} cannot be found."
                     )
 
-                transaction.name = trxn.get("name", transaction.name)
-
-                transaction.description = trxn.get(
-                    "description", transaction.description
+                check_period_open(
+                    transaction.transaction_date, closed_through  # type: ignore
                 )
 
-                transaction.amount = trxn.get("amount", transaction.amount)
+                description: str = f"Transaction with ID {transaction_id}"
 
-                sent_debit_account_id = trxn.get(
-                    "debit_account_id", transaction.debit_account_id
-                )
-                if sent_debit_account_id != "undefined":
-                    transaction.debit_account_id = sent_debit_account_id
+                if (0, i) in stale_rows:
+                    raise VersionConflict(description, transaction.version)
 
-                sent_credit_account_id = trxn.get(
-                    "credit_account_id", transaction.credit_account_id
-                )
-                if sent_credit_account_id != "undefined":
-                    transaction.credit_account_id = sent_credit_account_id
+                check_version(description, transaction.version, trxn.get("version"))
 
+                # Checked before anything is changed, so that a rejected
+                # row is not left changed in the session for the commit.
                 transaction_date: str | None = trxn.get("transaction_date")
+                new_date: Optional[datetime] = None
 
                 if transaction_date:
-                    transaction.transaction_date = datetime.fromisoformat(  # type: ignore
-                        transaction_date
+                    new_date = datetime.fromisoformat(transaction_date)
+                    check_period_open(new_date, closed_through)
+
+                touched_account_ids |= {
+                    transaction.debit_account_id,
+                    transaction.credit_account_id,
+                }
+
+                with row_savepoint(session, (0, i)):
+                    transaction.name = trxn.get("name", transaction.name)
+
+                    transaction.description = trxn.get(
+                        "description", transaction.description
                     )
-                else:
-                    transaction.transaction_date = transaction.transaction_date
 
-                transaction.date_entered = datetime.now()  # type: ignore
+                    transaction.amount = trxn.get("amount", transaction.amount)
 
-                session.commit()
+                    sent_debit_account_id = trxn.get(
+                        "debit_account_id", transaction.debit_account_id
+                    )
+                    if sent_debit_account_id != "undefined":
+                        transaction.debit_account_id = sent_debit_account_id
 
-            except Exception as e:
-                problem_transactions.append((i, str(e)))
+                    sent_credit_account_id = trxn.get(
+                        "credit_account_id", transaction.credit_account_id
+                    )
+                    if sent_credit_account_id != "undefined":
+                        transaction.credit_account_id = sent_credit_account_id
 
-    message: str = "SUCCESS"
+                    if new_date is not None:
+                        transaction.transaction_date = new_date  # type: ignore
 
-    if len(problem_transactions) != 0:
-        message = "There were some errors processing the following transactions:"
+                    transaction.date_entered = datetime.now()  # type: ignore
 
-        for idx, problem in problem_transactions:
-            message += f"\n{idx}: {problem}"
+                    touched_account_ids |= {
+                        transaction.debit_account_id,
+                        transaction.credit_account_id,
+                    }
 
-    return dict(message=message)
+            except StaleRow:
+                raise
+
+            except VersionConflict as conflict:
+                problem_transactions.append((i, str(conflict)))
+                conflicts.append(
+                    dict(
+                        index=i,
+                        transaction_id=transaction_id,
+                        version=conflict.version,
+                    )
+                )
+
+            except Exception as e:
+                problem_transactions.append((i, str(e)))
+
+        AccountSummary.refresh(session, touched_account_ids)
+        session.commit()
+
+    return problems_response(problem_transactions, conflicts)
 
 
+@serialized_write
 def remove_transactions(transaction_ids: list[int]) -> dict:
-    """Removes the transactions with the given IDs.
+    """Removes the transactions with the given IDs, in one database
+    transaction along with the summaries of their accounts.
 
     Parameters
     ----------
@@ -258,8 +937,11 @@ def remove_transactions(transaction_ids: list[int]) -> dict:
             deleted transactions.
     """
     problem_transactions: list[tuple] = []
+    touched_account_ids: set[int | None] = set()
 
     with DbSetup.Session() as session:
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
         for transaction_id in transaction_ids:
             try:
                 transaction: Transaction | None = session.get(
@@ -271,12 +953,22 @@ def remove_transactions(transaction_ids: list[int]) -> dict:
                         f"Transaction with ID of {transaction_id} cannot be found."
                     )
 
-                session.delete(transaction)
+                check_period_open(
+                    transaction.transaction_date, closed_through  # type: ignore
+                )
+
+                touched_account_ids |= {
+                    transaction.debit_account_id,
+                    transaction.credit_account_id,
+                }
 
-                session.commit()
+                session.delete(transaction)
             except Exception as e:
                 problem_transactions.append((transaction_id, str(e)))
 
+        AccountSummary.refresh(session, touched_account_ids)
+        session.commit()
+
     message: str = "SUCCESS"
 
     if len(problem_transactions) != 0:
@@ -313,12 +1005,15 @@ def find_matches(
             found and a list of transaction IDs that match.
     """
     with DbSetup.Session() as session:
-        transaction: Transaction | None = session.get(Transaction, transaction_id)
+        transactions: list[TransactionRow] = TransactionRow.load(
+            session, TransactionRow.query().where(Transaction.id == transaction_id)
+        )
 
-        if transaction is None:
+        if not transactions:
             raise Exception(f"Transaciton with id {transaction_id} could not be found.")
 
-        t_date: datetime = transaction.transaction_date  # type: ignore
+        transaction: TransactionRow = transactions[0]
+        t_date: datetime = transaction.transaction_date
 
         if uncategorized_only:
             matching_query = select(Transaction.id).where(
@@ -351,3 +1046,119 @@ def find_matches(
     return dict(
         message="Matching transactions found!", transaction_ids=matching_transaction_ids
     )
+
+
+@serialized_write
+def archive_transactions(year: int) -> dict:
+    """Move the transactions of the given year out of the transactions
+    table into the year's archive file, leaving each account's balance
+    from the year behind. The archive is only attached to later queries
+    whose date range reaches the year.
+
+    Parameters
+    ----------
+        year (int) : The year to archive. Every transaction in it must
+            be in a closed period.
+
+    Returns
+    -------
+        (dict) : Dictionary containing a status message, the path of the
+            archive, and the number of transactions archived.
+    """
+    database_path: str | None = DbSetup.engine.url.database
+
+    if not database_path or database_path == ":memory:":
+        return dict(message="ERROR", error="Only file databases can be archived.")
+
+    year_start: datetime = datetime(year, 1, 1)
+    in_year = sqla.and_(
+        Transaction.transaction_date >= year_start,
+        Transaction.transaction_date < datetime(year + 1, 1, 1),
+    )
+
+    with DbSetup.Session() as session:
+        if session.get(TransactionArchive, year) is not None:
+            return dict(message="ERROR", error=f"{year} is already archived.")
+
+        first_date, last_date, transaction_count = session.execute(
+            select(
+                sqla.func.min(Transaction.transaction_date),
+                sqla.func.max(Transaction.transaction_date),
+                sqla.func.count(Transaction.id),
+            ).where(in_year)
+        ).one()
+
+        if not transaction_count:
+            return dict(
+                message="ERROR", error=f"There are no transactions in {year}."
+            )
+
+        closed_through: Optional[datetime] = PeriodClose.closed_through(session)
+
+        if closed_through is None or last_date > closed_through:
+            return dict(
+                message="ERROR",
+                error=f"Every transaction in {year} must be in a closed period.",
+            )
+
+        legs = Transaction.account_legs(
+            start_date=year_start, end_date=last_date
+        ).subquery()
+        archived_balances: list[dict] = [
+            dict(
+                year=year,
+                account_id=account_id,
+                balance=round(balance, 2),
+                transaction_count=count,
+                last_transaction_date=datetime.fromisoformat(str(last_leg_date)),
+            )
+            for account_id, balance, count, last_leg_date in session.execute(
+                select(
+                    legs.c.account_id,
+                    sqla.func.sum(legs.c.amount),
+                    sqla.func.count(),
+                    sqla.func.max(legs.c.transaction_date),
+                ).group_by(legs.c.account_id)
+            )
+        ]
+
+    archive: TransactionArchive = TransactionArchive(
+        year=year,
+        path=TransactionArchive.archive_path(database_path, year),
+        first_transaction_date=first_date,
+        last_transaction_date=last_date,
+        transaction_count=transaction_count,
+    )
+
+    # The archive is attached before anything is written so that the
+    # move is a single transaction across both files.
+    with DbSetup.engine.connect() as connection:
+        with attached_archives(connection, [archive]):
+            archive_table: sqla.Table = Transaction.archive_table(year)
+            archive_table.create(connection, checkfirst=True)
+
+            connection.execute(
+                sqla.insert(archive_table).from_select(
+                    [column.name for column in Transaction.__table__.columns],
+                    select(Transaction.__table__).where(in_year),
+                )
+            )
+            connection.execute(sqla.delete(Transaction.__table__).where(in_year))
+            connection.execute(
+                sqla.insert(TransactionArchive).values(
+                    year=archive.year,
+                    path=archive.path,
+                    first_transaction_date=archive.first_transaction_date,
+                    last_transaction_date=archive.last_transaction_date,
+                    transaction_count=archive.transaction_count,
+                    archived_at=datetime.now(),
+                )
+            )
+            connection.execute(sqla.insert(ArchivedBalance), archived_balances)
+            connection.commit()
+
+    return dict(
+        message="SUCCESS",
+        path=archive.path,
+        transactions=transaction_count,
+    )
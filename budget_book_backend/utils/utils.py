@@ -1,8 +1,10 @@
 """
 Utility functions to be used to help with backend operations.
 """
+import csv
+import io
 import json
-from typing import Callable, Tuple
+from typing import Any, Callable, Iterable, Iterator, Sequence, Tuple
 from flask import request
 from pandas import Index
 
@@ -81,3 +83,36 @@ def endpoint_error_wrapper(endpoint_func: Callable) -> Callable:
             return json.dumps(dict(message=str(e))), 500
 
     return wrap_try
+
+
+def csv_chunks(
+    header: Sequence[str], chunks: Iterable[Iterable[Sequence[Any]]]
+) -> Iterator[str]:
+    """Yield the CSV text of the header, then of each chunk of rows, so
+    that a streamed response only holds one chunk at a time.
+
+    Parameters
+    ----------
+        header (Sequence[str]) : The column names.
+        chunks (Iterable[Iterable[Sequence]]) : The rows, in chunks such
+            as the partitions of a database result.
+
+    Returns
+    -------
+        (Iterator[str]) : The CSV text of the header and of each chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(header)
+
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+        buffer.seek(0)
+        buffer.truncate()
+
+    # The header alone when there are no rows.
+    if buffer.tell():
+        yield buffer.getvalue()
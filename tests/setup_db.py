@@ -1,6 +1,7 @@
 from budget_book_backend.models.account import Account
+from budget_book_backend.models.account_summary import AccountSummary
 from budget_book_backend.models.account_type import AccountType
-from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.db_setup import DbExtension, DbSetup
 from budget_book_backend.models.transaction import Transaction
 from tests.test_data.account_test_data import ACCOUNTS
 from tests.test_data.account_type_test_data import ACCOUNT_TYPES
@@ -47,9 +48,12 @@ def setup_db(is_test: bool = True) -> None:
 
             session.commit()
 
+        AccountSummary.refresh(session)
+        session.commit()
+
 
 if __name__ == "__main__":
-    DbSetup.set_engine(
-        url="sqlite:///budget_book_backend/models//databases/database.db"
+    DbSetup.default_extension = DbExtension(
+        database_url="sqlite:///budget_book_backend/models/databases/database.db"
     )
     setup_db(is_test=False)
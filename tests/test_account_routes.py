@@ -0,0 +1,98 @@
+import json
+
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+from budget_book_backend.accounts.account_routes import BASE_ACCOUNTS_URL
+
+
+def test_balance_history_missing_start(client: FlaskClient, use_test_db) -> None:
+    """Expect a balance history request without a start date to return
+    a 400 status with the error information in the response dict.
+    """
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_ACCOUNTS_URL}/balance-history?account_ids=1,2",
+        )
+
+    assert response.status_code == 400
+
+    response_data: dict = json.loads(response.data)
+
+    assert response_data.get("message") == "ERROR"
+
+    assert response_data.get("error")
+
+
+def test_balance_history(client: FlaskClient, use_test_db) -> None:
+    """Expect a balance history request to return a series of balances
+    keyed by the account IDs."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_ACCOUNTS_URL}/balance-history"
+            "?account_ids=1&start=2023-02-01&end=2023-03-01&interval=month",
+        )
+
+    assert response.status_code == 200
+
+    response_data: dict = json.loads(response.data)
+
+    assert response_data["dates"] == ["2023-02-01", "2023-03-01"]
+    assert response_data["balances"] == {"1": [0.0, -11.40]}
+
+
+def test_accounts_sorted_by_balance(client: FlaskClient, use_test_db) -> None:
+    """Expect the largest expense of a month to be listed first."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_ACCOUNTS_URL}?account_type=Gas,Rent"
+            "&balance_start_date=2023-02-01&balance_end_date=2023-03-31"
+            "&sort=balance&order=desc&limit=1",
+        )
+
+    assert response.status_code == 200
+
+    response_data: dict = json.loads(response.data)
+
+    assert [account["name"] for account in response_data["accounts"]] == [
+        "Apartment Rent"
+    ]
+
+
+def test_accounts_invalid_balance_options(client: FlaskClient, use_test_db) -> None:
+    """Expect an invalid balance option to return a 400 status."""
+    with client as cli:
+        response: TestResponse = cli.get(f"{BASE_ACCOUNTS_URL}?min_balance=lots")
+
+    assert response.status_code == 400
+
+    response_data: dict = json.loads(response.data)
+
+    assert response_data.get("message") == "ERROR"
+    assert response_data.get("error")
+
+
+def test_export(client: FlaskClient, use_test_db) -> None:
+    """Expect the account export to be streamed as CSV with a row for
+    each account of the requested types."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_ACCOUNTS_URL}/export?account_type=bank"
+            "&balance_start_date=2023-02-01&balance_end_date=2023-02-28",
+        )
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == "text/csv"
+
+        lines: list[str] = response.get_data(as_text=True).splitlines()
+
+        invalid_response: TestResponse = cli.get(
+            f"{BASE_ACCOUNTS_URL}/export?balance_start_date=February",
+        )
+
+    assert lines[0].startswith("id,name,account_type,account_group,")
+    assert [line.split(",")[1] for line in lines[1:]] == ["AMEX", "Chase Savings"]
+
+    assert invalid_response.status_code == 400
+    assert json.loads(invalid_response.data)["message"] == "ERROR"
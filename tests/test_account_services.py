@@ -1,18 +1,39 @@
+import csv
+import io
 from datetime import datetime
 
 import pytest
 
+from budget_book_backend.accounts import account_services
 from budget_book_backend.accounts.account_services import (
+    ACCOUNT_EXPORT_COLUMNS,
     account_balances,
+    account_balance_history,
     add_new_account_to_db,
+    get_account_summaries_by_type,
     get_accounts_by_type,
     update_account_info,
     delete_account,
     account_net_changes_by_group,
+    close_period,
+    export_accounts,
 )
 from budget_book_backend.models.account import Account
+from budget_book_backend.models.account_summary import AccountSummary
 from budget_book_backend.models.db_setup import DbSetup
-from tests.testing_utils import partial_dict_list_match, partial_dict_match
+from budget_book_backend.models.period_close import BalanceSnapshot, PeriodClose
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+    categorize_transactions,
+    remove_transactions,
+    update_transactions,
+)
+from tests.testing_utils import (
+    partial_dict_list_match,
+    partial_dict_match,
+    recorded_statements,
+)
 from tests.test_data.transaction_test_data import account_name_to_id
 from tests.test_data.account_test_data import account_type_name_to_id, ACCOUNTS
 
@@ -294,6 +315,60 @@ def test_delete_account(delete_account_id: int, expected: dict, use_test_db):
             assert deleted_account is None
 
 
+def test_delete_account_uncategorizes_transactions(use_test_db):
+    """Test that deleting an account uncategorizes its transactions
+    without loading the account's transaction history."""
+    with DbSetup.Session() as session:
+        account: Account | None = session.get(Account, 3)
+        assert account is not None
+
+        assert account.uncategorized_count() == 0
+        assert account.last_updated() == datetime(2023, 2, 27)
+        assert "debit_transactions" not in account.__dict__
+
+    assert delete_account(3) == dict(message="SUCCESS")
+
+    with DbSetup.Session() as session:
+        gas: Transaction | None = session.get(Transaction, 3)
+        amex: Account | None = session.get(Account, 1)
+        assert gas is not None and amex is not None
+
+        assert gas.debit_account_id is None
+        assert gas in amex.uncategorized_transactions()
+        assert amex.uncategorized_count() == 2
+
+
+@pytest.mark.parametrize(
+    "read_accounts",
+    [
+        lambda: get_accounts_by_type(
+            ("all",), datetime(1, 1, 1), datetime(2023, 12, 31)
+        ),
+        lambda: get_accounts_by_type(
+            ("Gas", "Rent"), datetime(1, 1, 1), datetime(2023, 12, 31), limit=1
+        ),
+        lambda: account_net_changes_by_group(
+            ["Assets", "Expenses", "Liabilities"], ["2023-01-01", "2023-12-31"]
+        ),
+    ],
+    ids=["all accounts", "some types", "net changes by group"],
+)
+def test_account_types_load_with_accounts(read_accounts, use_test_db):
+    """Test that the accounts and their types are read in one query
+    instead of lazy loading each account's type."""
+    with recorded_statements() as statements:
+        read_accounts()
+
+    account_queries: list[str] = [
+        statement
+        for statement in statements
+        if "FROM accounts" in statement or "account_types" in statement
+    ]
+
+    assert len(account_queries) == 1
+    assert "JOIN account_types" in account_queries[0]
+
+
 @pytest.mark.parametrize(
     ["account_groups", "date_ranges", "expected"],
     [
@@ -334,3 +409,422 @@ def test_account_net_changes_by_group(
     result: dict = account_net_changes_by_group(account_groups, date_ranges)
 
     assert partial_dict_match(expected, result)
+
+
+@pytest.mark.parametrize(
+    ["start_date", "end_date", "interval", "expected"],
+    [
+        (
+            datetime(2023, 2, 1),
+            datetime(2023, 3, 31),
+            "month",
+            {
+                "dates": ["2023-02-01", "2023-03-01", "2023-03-31"],
+                "balances": {
+                    account_name_to_id("AMEX"): [0.0, -11.40, -11.40],
+                    account_name_to_id("Chase Savings"): [
+                        0.0,
+                        -1328.90,
+                        -1328.90,
+                    ],
+                },
+            },
+        ),
+        (
+            datetime(2023, 2, 20),
+            datetime(2023, 3, 6),
+            "week",
+            {
+                "dates": ["2023-02-20", "2023-02-27", "2023-03-06"],
+                "balances": {
+                    account_name_to_id("AMEX"): [0.0, -11.40, -11.40],
+                    account_name_to_id("Chase Savings"): [
+                        0.0,
+                        -78.90,
+                        -1328.90,
+                    ],
+                },
+            },
+        ),
+    ],
+    ids=["Monthly Balances", "Weekly Balances"],
+)
+def test_account_balance_history(
+    start_date: datetime,
+    end_date: datetime,
+    interval: str,
+    expected: dict,
+    use_test_db,
+):
+    """Test that the balance history matches the balances as of each
+    date in the series."""
+    account_ids: list[int] = list(expected["balances"].keys())
+
+    result: dict = account_balance_history(
+        account_ids, start_date, end_date, interval
+    )
+
+    assert result["message"] == "SUCCESS"
+    assert result["dates"] == expected["dates"]
+    assert result["balances"] == expected["balances"]
+
+    with DbSetup.Session() as session:
+        for account_id in account_ids:
+            account: Account | None = session.get(Account, account_id)
+            assert account is not None
+
+            for date, balance in zip(
+                result["dates"], result["balances"][account_id]
+            ):
+                assert account.balance(
+                    end_date=datetime.strptime(date, "%Y-%m-%d")
+                ) == balance
+
+
+def test_account_balance_history_invalid_interval(use_test_db):
+    """Test that an unknown interval returns an error message."""
+    result: dict = account_balance_history(
+        [1], datetime(2023, 1, 1), datetime(2023, 2, 1), "fortnight"
+    )
+
+    assert result["message"] == "ERROR"
+    assert "error" in result
+
+
+@pytest.mark.parametrize(
+    "balance_options",
+    [
+        dict(sort="balance"),
+        dict(sort="balance", order="desc", limit=2),
+        dict(min_balance=0.0),
+        dict(min_balance=-100.0, max_balance=100.0, sort="balance"),
+        dict(limit=1),
+    ],
+    ids=["sort", "top two", "minimum", "between", "limit"],
+)
+@pytest.mark.parametrize(
+    "balance_dates",
+    [None, (datetime(1, 1, 1), datetime(2023, 2, 26))],
+    ids=["summaries", "date range"],
+)
+def test_accounts_balance_options(
+    balance_options: dict, balance_dates: tuple | None, use_test_db
+):
+    """Test that sorting and filtering accounts by balance in SQL gives
+    the same accounts as doing it on the computed balances."""
+    if balance_dates is None:
+        accounts: list[dict] = get_account_summaries_by_type(("all",))
+        selected: list[dict] = get_account_summaries_by_type(
+            ("all",), **balance_options
+        )
+    else:
+        accounts = get_accounts_by_type(("all",), *balance_dates)
+        selected = get_accounts_by_type(("all",), *balance_dates, **balance_options)
+
+    expected: list[dict] = [
+        account
+        for account in accounts
+        if account["balance"] >= balance_options.get("min_balance", float("-inf"))
+        and account["balance"] <= balance_options.get("max_balance", float("inf"))
+    ]
+
+    if "sort" in balance_options:
+        expected.sort(
+            key=lambda account: account["balance"],
+            reverse=balance_options.get("order") == "desc",
+        )
+
+    assert selected == expected[: balance_options.get("limit")]
+
+
+def test_accounts_balance_options_errors(use_test_db):
+    """Test that unknown sorts and orders are rejected."""
+    with pytest.raises(ValueError, match="Cannot sort accounts by name."):
+        get_account_summaries_by_type(("all",), sort="name")
+
+    with pytest.raises(ValueError, match="Order must be asc or desc, not up."):
+        get_accounts_by_type(
+            ("all",), datetime(1, 1, 1), datetime(2023, 3, 1), order="up"
+        )
+
+
+SUMMARY_KEYS: tuple[str, ...] = (
+    "id",
+    "name",
+    "balance",
+    "last_updated",
+    "uncategorized_transactions",
+    "account_type",
+    "account_group",
+)
+
+
+def assert_summaries_match_accounts(types: tuple[str, ...] = ("all",)) -> None:
+    """Assert that the account summaries give the same accounts list as
+    computing every balance from the transactions up to now."""
+    computed: list[dict] = get_accounts_by_type(
+        types, datetime(1, 1, 1), datetime.now()
+    )
+    summarized: list[dict] = get_account_summaries_by_type(types)
+
+    assert [
+        {key: account[key] for key in SUMMARY_KEYS} for account in summarized
+    ] == [{key: account[key] for key in SUMMARY_KEYS} for account in computed]
+
+
+@pytest.mark.parametrize(
+    "types",
+    [("all",), ("Credit Card", "Savings Account"), ("Gas",)],
+    ids=["all", "bank accounts", "single type"],
+)
+def test_get_account_summaries_by_type(types: tuple[str, ...], use_test_db):
+    """Test that the summaries match the computed account balances."""
+    assert_summaries_match_accounts(types)
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda: add_new_transactions(
+            [
+                dict(
+                    name="Groceries",
+                    description="Weekly groceries",
+                    amount=82.15,
+                    credit_account_id=1,
+                    debit_account_id=3,
+                    transaction_date="2023-03-04",
+                ),
+                dict(
+                    name="Refund",
+                    description="Uncategorized refund",
+                    amount=12.00,
+                    debit_account_id=2,
+                    transaction_date="2023-03-06",
+                ),
+            ]
+        ),
+        lambda: categorize_transactions(
+            [dict(transaction_id=1, debit_or_credit="debit", category_id=3)]
+        ),
+        lambda: update_transactions(
+            [dict(transaction_id=4, amount=80.00, credit_account_id=2)]
+        ),
+        lambda: remove_transactions([4, 5]),
+        lambda: add_new_account_to_db("Groceries", 5, "Groceries", True),
+        lambda: update_account_info(
+            dict(id=1, name="AMEX", account_type_id=4, debit_inc=True)
+        ),
+        lambda: delete_account(3),
+    ],
+    ids=[
+        "add transactions",
+        "categorize transaction",
+        "update transaction",
+        "remove transactions",
+        "add account",
+        "update account",
+        "delete account",
+    ],
+)
+def test_account_summaries_stay_in_sync(write, use_test_db):
+    """Test that the write services keep the summaries up to date."""
+    assert write()["message"] == "SUCCESS"
+
+    assert_summaries_match_accounts()
+
+
+def test_account_summaries_leave_out_future_transactions(use_test_db):
+    """Test that transactions dated after today are left out of the
+    summarized balances and uncategorized counts."""
+    next_year: str = f"{datetime.now().year + 1}-01-01"
+    result: dict = add_new_transactions(
+        [
+            dict(
+                name="Annual fee",
+                description="Next year's card fee",
+                amount=95.00,
+                credit_account_id=1,
+                debit_account_id=3,
+                transaction_date=next_year,
+            ),
+            dict(
+                name="Deposit",
+                description="Uncategorized future deposit",
+                amount=40.00,
+                debit_account_id=2,
+                transaction_date=next_year,
+            ),
+        ]
+    )
+    assert result["message"] == "SUCCESS"
+
+    assert_summaries_match_accounts()
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda: update_transactions([dict(transaction_id=4, amount=80.00)]),
+        lambda: remove_transactions([4]),
+    ],
+    ids=["update transaction", "remove transaction"],
+)
+def test_account_summaries_commit_with_their_writes(write, monkeypatch, use_test_db):
+    """Test that the transactions are only changed if the summaries of
+    their accounts are refreshed in the same commit."""
+
+    def failing_refresh(session, account_ids=None) -> None:
+        raise RuntimeError("Interrupted before the summaries were refreshed.")
+
+    monkeypatch.setattr(AccountSummary, "refresh", failing_refresh)
+
+    with pytest.raises(RuntimeError):
+        write()
+
+    monkeypatch.undo()
+
+    with DbSetup.Session() as session:
+        transaction: Transaction | None = session.get(Transaction, 4)
+        assert transaction is not None
+
+        assert transaction.amount == 1250.0
+
+    assert_summaries_match_accounts()
+
+
+def test_missing_account_summaries_are_rebuilt(use_test_db):
+    """Test that accounts without a summary get one when listed."""
+    with DbSetup.Session() as session:
+        session.query(AccountSummary).delete()
+        session.commit()
+
+    assert_summaries_match_accounts()
+
+    with DbSetup.Session() as session:
+        assert session.query(AccountSummary).count() == len(ACCOUNTS)
+
+
+def categorize_test_transactions() -> None:
+    """Categorize the uncategorized test transactions so that their
+    period can be closed."""
+    categorize_transactions(
+        [
+            dict(transaction_id=1, debit_or_credit="debit", category_id=3),
+            dict(transaction_id=2, debit_or_credit="debit", category_id=1),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "close_dates",
+    [[datetime(2023, 2, 28)], [datetime(2023, 2, 22), datetime(2023, 2, 28)]],
+    ids=["One close", "Two closes"],
+)
+def test_close_period(close_dates: list[datetime], use_test_db):
+    """Test that closing periods records a snapshot for each account and
+    leaves every balance unchanged."""
+    categorize_test_transactions()
+
+    ranges: list[tuple[datetime, datetime]] = [
+        (datetime(1, 1, 1), datetime(2023, 2, 25)),
+        (datetime(1, 1, 1), datetime(2023, 3, 31)),
+        (datetime(2023, 2, 24), datetime(2023, 3, 31)),
+    ]
+    before: list[list[dict]] = [
+        get_accounts_by_type(("all",), start, end) for start, end in ranges
+    ]
+    history_before: dict = account_balance_history(
+        [1, 2, 3, 4], datetime(2023, 2, 1), datetime(2023, 4, 1), "week"
+    )
+
+    for close_date in close_dates:
+        result: dict = close_period(close_date)
+
+        assert result == dict(
+            message="SUCCESS",
+            close_date=close_date.strftime("%Y-%m-%d"),
+            accounts=len(ACCOUNTS),
+        )
+
+    assert [
+        get_accounts_by_type(("all",), start, end) for start, end in ranges
+    ] == before
+    assert (
+        account_balance_history(
+            [1, 2, 3, 4], datetime(2023, 2, 1), datetime(2023, 4, 1), "week"
+        )
+        == history_before
+    )
+
+    with DbSetup.Session() as session:
+        assert session.query(PeriodClose).count() == len(close_dates)
+        assert session.query(BalanceSnapshot).count() == len(close_dates) * len(
+            ACCOUNTS
+        )
+
+
+@pytest.mark.parametrize(
+    ["categorize", "close_dates", "expected_error"],
+    [
+        (
+            False,
+            [datetime(2023, 2, 28)],
+            "There are 2 uncategorized transactions on or before 2023-02-28.",
+        ),
+        (
+            True,
+            [datetime(2023, 2, 28), datetime(2023, 2, 1)],
+            "Periods are already closed through 2023-02-28.",
+        ),
+    ],
+    ids=["Uncategorized transactions", "Already closed"],
+)
+def test_close_period_errors(
+    categorize: bool,
+    close_dates: list[datetime],
+    expected_error: str,
+    use_test_db,
+):
+    """Test that a period cannot be closed with uncategorized
+    transactions or before an existing close."""
+    if categorize:
+        categorize_test_transactions()
+
+    for close_date in close_dates:
+        result: dict = close_period(close_date)
+
+    assert result == dict(message="ERROR", error=expected_error)
+
+
+def test_delete_account_in_closed_period(use_test_db):
+    """Test that an account with closed transactions cannot be deleted."""
+    categorize_test_transactions()
+    close_period(datetime(2023, 2, 28))
+
+    assert delete_account(3) == dict(
+        message="ERROR", error="The account has transactions in a closed period."
+    )
+
+
+@pytest.mark.parametrize(
+    ["types", "chunk_size"],
+    [(("all",), 1), (("all",), 500), (("Credit Card", "Gas"), 1)],
+    ids=["One account per chunk", "One chunk", "Account types"],
+)
+def test_export_accounts(
+    types: tuple[str, ...], chunk_size: int, monkeypatch, use_test_db
+):
+    """Test that the export writes the same account details as
+    get_accounts_by_type, whatever the chunk size."""
+    monkeypatch.setattr(account_services, "EXPORT_CHUNK_SIZE", chunk_size)
+    start_date, end_date = datetime(2023, 2, 22), datetime(2023, 2, 28)
+
+    csv_text: str = "".join(export_accounts(types, start_date, end_date))
+    rows: list[dict] = list(csv.DictReader(io.StringIO(csv_text)))
+
+    assert list(rows[0]) == ACCOUNT_EXPORT_COLUMNS
+    assert rows == [
+        {column: str(account[column]) for column in ACCOUNT_EXPORT_COLUMNS}
+        for account in get_accounts_by_type(types, start_date, end_date)
+    ]
@@ -0,0 +1,141 @@
+from datetime import datetime
+from os import path
+
+import pytest
+from flask import Flask
+
+from budget_book_backend.accounts.account_services import (
+    account_balance_history,
+    close_period,
+    get_account_summaries_by_type,
+    get_accounts_by_type,
+)
+from budget_book_backend.models.account_summary import AccountSummary
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.posting import Posting
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_services import (
+    archive_transactions,
+    categorize_transactions,
+    get_transactions_by_account,
+)
+from tests.testing_utils import app_with_config
+
+
+@pytest.fixture
+def archive_app(tmp_path) -> Flask:
+    """Initialize an app on its own database file, filled with the test
+    data with every transaction categorized."""
+    archive_app: Flask = app_with_config(tmp_path)
+
+    categorize_transactions(
+        [
+            dict(transaction_id=1, debit_or_credit="debit", category_id=3),
+            dict(transaction_id=2, debit_or_credit="debit", category_id=1),
+        ]
+    )
+
+    return archive_app
+
+
+def ledger_reads() -> list:
+    """Return the results of the reads that span the 2023 transactions."""
+    return [
+        get_accounts_by_type(("all",), datetime(1, 1, 1), datetime(2023, 2, 25)),
+        get_accounts_by_type(("all",), datetime(2023, 2, 24), datetime(2023, 3, 31)),
+        get_accounts_by_type(("all",), datetime(1, 1, 1), datetime(2024, 1, 31)),
+        get_accounts_by_type(
+            ("all",),
+            datetime(2023, 2, 24),
+            datetime(2023, 3, 31),
+            sort="balance",
+            min_balance=0.0,
+        ),
+        account_balance_history(
+            [1, 2, 3, 4], datetime(2023, 2, 1), datetime(2023, 4, 1), "week"
+        ),
+    ]
+
+
+def test_archive_transactions(archive_app: Flask, tmp_path) -> None:
+    """Test that archiving a closed year moves its transactions into the
+    archive file without changing any balance."""
+    assert close_period(datetime(2023, 12, 31))["message"] == "SUCCESS"
+
+    before: list = ledger_reads()
+
+    result: dict = archive_transactions(2023)
+
+    assert result == dict(
+        message="SUCCESS",
+        path=str(tmp_path / "ledger_archive_2023.db"),
+        transactions=5,
+    )
+    assert path.exists(result["path"])
+
+    with DbSetup.Session() as session:
+        assert session.query(Transaction).count() == 0
+        assert session.query(Posting).count() == 0
+
+        # Rebuilding the summaries adds the archived balances back.
+        AccountSummary.refresh(session)
+        session.commit()
+
+    assert ledger_reads() == before
+    assert [
+        account["balance"] for account in get_account_summaries_by_type(("all",))
+    ] == [account["balance"] for account in before[2]]
+
+    assert get_transactions_by_account([1, 2, 3, 4]) == []
+    assert len(get_transactions_by_account([1, 2, 3, 4], include_archived=True)) == 5
+    assert [
+        transaction["name"]
+        for transaction in get_transactions_by_account(
+            [1, 2, 3, 4], include_archived=True, min_amount=1000.0
+        )
+    ] == ["March Rent"]
+    assert (
+        get_transactions_by_account(
+            [1, 2, 3, 4], include_archived=True, start_date=datetime(2024, 1, 1)
+        )
+        == []
+    )
+
+    # The archive is detached once the reads are done.
+    with DbSetup.engine.connect() as connection:
+        assert "archive_2023" not in [
+            row[1] for row in connection.exec_driver_sql("PRAGMA database_list")
+        ]
+
+
+@pytest.mark.parametrize(
+    ["close_date", "year", "expected_error"],
+    [
+        (None, 2023, "Every transaction in 2023 must be in a closed period."),
+        (
+            datetime(2023, 2, 28),
+            2023,
+            "Every transaction in 2023 must be in a closed period.",
+        ),
+        (datetime(2023, 12, 31), 2019, "There are no transactions in 2019."),
+    ],
+    ids=["No closed period", "Partly closed year", "Empty year"],
+)
+def test_archive_transactions_errors(
+    close_date: datetime | None, year: int, expected_error: str, archive_app: Flask
+) -> None:
+    """Test that only closed years with transactions are archived."""
+    if close_date is not None:
+        close_period(close_date)
+
+    assert archive_transactions(year) == dict(message="ERROR", error=expected_error)
+
+
+def test_archive_transactions_twice(archive_app: Flask) -> None:
+    """Test that a year cannot be archived twice."""
+    close_period(datetime(2023, 12, 31))
+
+    assert archive_transactions(2023)["message"] == "SUCCESS"
+    assert archive_transactions(2023) == dict(
+        message="ERROR", error="2023 is already archived."
+    )
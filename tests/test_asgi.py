@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+from budget_book_backend import create_app  # noqa: E402
+from budget_book_backend.account_types.account_type_services import (  # noqa: E402
+    create_account_type,
+)
+from budget_book_backend.asgi import AsyncBackend  # noqa: E402
+from budget_book_backend.models.db_setup import DbSetup  # noqa: E402
+
+READ_REQUESTS: list[tuple[str, str]] = [
+    ("/api/accounts", ""),
+    ("/api/accounts", "account_type=bank&balance_end_date=2023-02-27"),
+    (
+        "/api/accounts/balance-history",
+        "account_ids=1,2&start=2023-01-01&end=2023-04-01&interval=week",
+    ),
+    ("/api/accounttypes", "group=Expenses"),
+    ("/api/transactions", "account_ids=1,2&categorize_type=uncategorized"),
+    ("/api/transactions", ""),
+]
+
+
+async def asgi_get(
+    asgi_app: AsyncBackend,
+    path: str,
+    query_string: str,
+    headers: tuple[tuple[bytes, bytes], ...] = (),
+) -> tuple[int, bytes]:
+    """Send a GET request to the ASGI app and collect its response.
+
+    Parameters
+    ----------
+        asgi_app (AsyncBackend) : The ASGI app to send the request to.
+        path (str) : The path of the request.
+        query_string (str) : The URL arguments of the request.
+        headers (tuple[tuple[bytes, bytes], ...]) : Optional. Request headers
+            to send besides the host.
+
+    Returns
+    -------
+        (tuple[int, bytes]) : The status code and body of the response.
+    """
+    messages: list[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    scope: dict = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"localhost"), *headers],
+        "server": ("localhost", 80),
+    }
+
+    await asgi_app(scope, receive, send)
+
+    body: bytes = b"".join(
+        message.get("body", b"")
+        for message in messages
+        if message["type"] == "http.response.body"
+    )
+
+    return messages[0]["status"], body
+
+
+def test_async_reads_match_sync_reads(
+    app: Flask, client: FlaskClient, use_test_db
+) -> None:
+    """Test that the async read endpoints return exactly what the Flask
+    routes return, even when the requests are served concurrently."""
+    asgi_app: AsyncBackend = AsyncBackend(app)
+
+    async def get_all() -> list[tuple[int, bytes]]:
+        responses = await asyncio.gather(
+            *[asgi_get(asgi_app, path, query) for path, query in READ_REQUESTS]
+        )
+        await asgi_app.async_engine.dispose()
+        return list(responses)
+
+    async_responses: list[tuple[int, bytes]] = asyncio.run(get_all())
+
+    for (path, query), (status, body) in zip(READ_REQUESTS, async_responses):
+        sync_response = client.get(f"{path}?{query}")
+
+        assert status == sync_response.status_code
+        assert json.loads(body) == json.loads(sync_response.data)
+
+
+def test_writes_pass_through_to_flask(app: Flask, use_test_db) -> None:
+    """Test that requests other than the async reads are handled by the
+    Flask app."""
+    asgi_app: AsyncBackend = AsyncBackend(app)
+
+    status, body = asyncio.run(
+        asgi_get(asgi_app, "/api/accounts/balances", "account_ids=1")
+    )
+
+    assert status == 200
+    assert json.loads(body)["balances"] == {"1": -11.4}
+
+
+def test_async_reads_compressed(
+    app: Flask, client: FlaskClient, use_test_db
+) -> None:
+    """Test that the async read endpoints compress their responses like
+    the Flask app does."""
+    app.config["COMPRESSION_MIN_SIZE"] = 100
+    asgi_app: AsyncBackend = AsyncBackend(app)
+
+    async def get() -> tuple[int, bytes]:
+        response = await asgi_get(
+            asgi_app,
+            "/api/transactions",
+            "account_ids=1,2",
+            ((b"accept-encoding", b"gzip"),),
+        )
+        await asgi_app.async_engine.dispose()
+        return response
+
+    status, body = asyncio.run(get())
+
+    assert status == 200
+    assert json.loads(gzip.decompress(body)) == json.loads(
+        client.get("/api/transactions?account_ids=1,2").data
+    )
+
+
+def test_sharded_reads_use_the_users_database(tmp_path) -> None:
+    """Test that with a database per user, the read endpoints read the
+    requesting user's database and reject requests without a user."""
+    tenant_app: Flask = create_app(
+        test_config=dict(
+            DATABASE=f"sqlite:///{tmp_path / 'main.db'}",
+            TENANT_DATABASE=f"sqlite:///{tmp_path / 'ledgers'}/user_{{user_id}}.db",
+        )
+    )
+
+    with tenant_app.app_context(), DbSetup.use_tenant(1):
+        create_account_type("User One Checking")
+
+    asgi_app: AsyncBackend = AsyncBackend(tenant_app)
+
+    async def get_all() -> list[tuple[int, bytes]]:
+        responses = [
+            await asgi_get(asgi_app, "/api/accounttypes", ""),
+            await asgi_get(
+                asgi_app, "/api/accounttypes", "", ((b"x-user-id", b"1"),)
+            ),
+            await asgi_get(asgi_app, "/api/accounttypes", "user_id=2"),
+        ]
+        await asgi_app.async_engine.dispose()
+        return responses
+
+    (no_user, _), (status_one, user_one), (status_two, user_two) = asyncio.run(
+        get_all()
+    )
+
+    assert no_user == 400
+    assert status_one == status_two == 200
+    assert [
+        account_type["name"] for account_type in json.loads(user_one)["account_types"]
+    ] == ["User One Checking"]
+    assert json.loads(user_two)["account_types"] == []
@@ -1,7 +1,11 @@
+import os
+from typing import cast
+
+import pytest
 from flask import Flask
-from sqlalchemy import Inspector, inspect
+from sqlalchemy import Engine, Inspector, QueuePool, inspect, text
 
-from budget_book_backend import __version__
+from budget_book_backend import __version__, create_app
 from budget_book_backend.models.db_setup import DbSetup
 
 
@@ -17,6 +21,8 @@ def test_app_creation(app: Flask):
         "accounts",
         "account_types",
         "transactions",
+        "jobs",
+        "metrics",
     ]
 
     assert app.config.get("DATABASE") == "sqlite:///tests/test.db"
@@ -32,3 +38,49 @@ def test_database_setup(use_test_db):
     tables: list[str] = inspector.get_table_names()
 
     assert tables != []
+
+
+def test_apps_own_their_engines(tmp_path) -> None:
+    """Test that two apps in one process each get their own engine for
+    their own database."""
+    first_app: Flask = create_app(
+        test_config=dict(DATABASE=f"sqlite:///{tmp_path / 'first.db'}")
+    )
+    second_app: Flask = create_app(
+        test_config=dict(DATABASE=f"sqlite:///{tmp_path / 'second.db'}")
+    )
+
+    with first_app.app_context():
+        first_engine: Engine = DbSetup.engine
+
+    with second_app.app_context():
+        second_engine: Engine = DbSetup.engine
+
+    assert first_engine is not second_engine
+    assert str(first_engine.url).endswith("first.db")
+    assert str(second_engine.url).endswith("second.db")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork.")
+def test_engine_pool_reset_after_fork(app: Flask) -> None:
+    """Test that a forked child does not reuse the pooled connections it
+    inherited from its parent."""
+    with app.app_context():
+        engine: Engine = DbSetup.engine
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    parent_pool: QueuePool = cast(QueuePool, engine.pool)
+    assert parent_pool.checkedin() == 1
+
+    child_pid: int = os.fork()
+
+    if child_pid == 0:
+        # Exit the child without running pytest's teardown.
+        os._exit(0 if engine.pool is not parent_pool else 1)
+
+    _, status = os.waitpid(child_pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert engine.pool is parent_pool
@@ -0,0 +1,159 @@
+import gzip
+import json
+from typing import Callable, Optional
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+from budget_book_backend.compression import Compression
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TRANSACTIONS_URL: str = f"{BASE_TRANSACTION_URL}?account_ids=1,2,3,4"
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    """Return the body of a response sent with the given encoding."""
+    decompressors: dict[Optional[str], Callable[[bytes], bytes]] = {
+        None: lambda body: body,
+        "gzip": gzip.decompress,
+    }
+
+    if brotli is not None:
+        decompressors["br"] = brotli.decompress
+
+    return decompressors[encoding](data)
+
+
+@pytest.mark.parametrize(
+    ["accept_encoding", "min_size", "expected_encoding"],
+    [
+        ("gzip", 100, "gzip"),
+        ("gzip, deflate", 100, "gzip"),
+        ("*", 100, "br" if brotli is not None else "gzip"),
+        ("gzip", 1_000_000, None),
+        ("deflate", 100, None),
+        ("gzip;q=0", 100, None),
+        ("", 100, None),
+    ],
+    ids=[
+        "gzip",
+        "gzip among others",
+        "Any encoding",
+        "Below the threshold",
+        "No supported encoding",
+        "gzip refused",
+        "No Accept-Encoding",
+    ],
+)
+def test_buffered_responses(
+    accept_encoding: str,
+    min_size: int,
+    expected_encoding: Optional[str],
+    app: Flask,
+    client: FlaskClient,
+    use_test_db,
+) -> None:
+    """Test that buffered responses above the threshold are compressed
+    with the encoding the client accepts, and are otherwise unchanged."""
+    app.config["COMPRESSION_MIN_SIZE"] = min_size
+    plain_data: bytes = client.get(TRANSACTIONS_URL).data
+
+    response: TestResponse = client.get(
+        TRANSACTIONS_URL, headers={"Accept-Encoding": accept_encoding}
+    )
+
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == expected_encoding
+    assert "Accept-Encoding" in response.vary
+    assert response.content_length == len(response.data)
+    assert decompress(response.data, expected_encoding) == plain_data
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_preferred(app: Flask, client: FlaskClient, use_test_db) -> None:
+    """Test that brotli is used over gzip at the configured level."""
+    app.config.update(COMPRESSION_MIN_SIZE=100, COMPRESSION_BROTLI_LEVEL=11)
+
+    response: TestResponse = client.get(
+        TRANSACTIONS_URL, headers={"Accept-Encoding": "gzip, br"}
+    )
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.data == brotli.compress(
+        client.get(TRANSACTIONS_URL).data, quality=11
+    )
+
+
+@pytest.mark.parametrize("level", [1, 9], ids=["Fastest", "Smallest"])
+def test_compression_level(
+    level: int, app: Flask, client: FlaskClient, use_test_db
+) -> None:
+    """Test that gzip uses the configured compression level."""
+    app.config.update(COMPRESSION_MIN_SIZE=100, COMPRESSION_LEVEL=level)
+
+    response: TestResponse = client.get(
+        TRANSACTIONS_URL, headers={"Accept-Encoding": "gzip"}
+    )
+
+    # The extra flags byte of the gzip header records the level.
+    assert response.data[8] == (4 if level == 1 else 2)
+
+
+@pytest.mark.parametrize(
+    "encoding",
+    [
+        "gzip",
+        pytest.param(
+            "br",
+            marks=pytest.mark.skipif(brotli is None, reason="brotli is not installed"),
+        ),
+    ],
+)
+def test_streamed_responses(
+    encoding: str, app: Flask, client: FlaskClient, use_test_db
+) -> None:
+    """Test that streamed responses are compressed chunk by chunk,
+    whatever their size."""
+    app.config["COMPRESSION_MIN_SIZE"] = 1_000_000
+    export_url: str = f"{BASE_TRANSACTION_URL}/export?account_ids=1,2,3,4"
+
+    with client as cli:
+        plain_data: bytes = cli.get(export_url).get_data()
+        response: TestResponse = cli.get(
+            export_url, headers={"Accept-Encoding": encoding}
+        )
+
+        assert response.is_streamed
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Content-Length" not in response.headers
+
+        assert decompress(response.get_data(), encoding) == plain_data
+
+
+def test_errors_not_compressed(app: Flask, client: FlaskClient, use_test_db) -> None:
+    """Test that error responses are sent as they are."""
+    app.config["COMPRESSION_MIN_SIZE"] = 0
+
+    response: TestResponse = client.get(
+        f"{BASE_TRANSACTION_URL}?account_ids=1&order=sideways",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 400
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data)["message"] == "ERROR"
+
+
+def test_choose_encoding_without_brotli(monkeypatch) -> None:
+    """Test that gzip is used when brotli is not installed."""
+    monkeypatch.setattr("budget_book_backend.compression.brotli", None)
+
+    assert Compression.choose_encoding("br, gzip") == "gzip"
+    assert Compression.choose_encoding("br") is None
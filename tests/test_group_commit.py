@@ -0,0 +1,215 @@
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from budget_book_backend.models.db_setup import DbSetup, last_write_time
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions import GroupCommit
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+from budget_book_backend.transactions.transaction_services import (
+    categorize_transaction_batches,
+)
+from tests.testing_utils import app_with_config
+
+
+@pytest.fixture
+def group_app(tmp_path) -> Flask:
+    """Initialize an app with group commit enabled and a window long
+    enough for every request of a test to join one batch."""
+    return app_with_config(tmp_path, GROUP_COMMIT=True, GROUP_COMMIT_WINDOW_MS=500)
+
+
+def group_commit(app: Flask) -> GroupCommit:
+    """Return the group commit extension of the app."""
+    return app.extensions[GroupCommit.name]
+
+
+def categorize_concurrently(app: Flask, requests: list[list[dict]]) -> list[dict]:
+    """Send each request from its own thread, as concurrent requests to
+    the app would, and return their results."""
+
+    def categorize(transactions: list[dict]) -> dict:
+        with app.app_context():
+            return group_commit(app).categorize(transactions)
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        return list(executor.map(categorize, requests))
+
+
+def category_ids(transaction_id: int) -> tuple:
+    """Return the debit and credit accounts of a transaction."""
+    with DbSetup.Session() as session:
+        transaction: Transaction | None = session.get(Transaction, transaction_id)
+        assert transaction is not None
+
+        return (transaction.debit_account_id, transaction.credit_account_id)
+
+
+def test_concurrent_requests_share_a_commit(group_app: Flask) -> None:
+    """Test that requests arriving within the window are committed
+    together, and that each gets its own result."""
+    commits: list[int] = []
+
+    with group_app.app_context():
+        event.listen(DbSetup.engine, "commit", lambda connection: commits.append(1))
+
+    results: list[dict] = categorize_concurrently(
+        group_app,
+        [
+            [dict(transaction_id=1, category_id=3, debit_or_credit="debit")],
+            [dict(transaction_id=2, category_id=1, debit_or_credit="debit")],
+            [dict(transaction_id=-1, category_id=1, debit_or_credit="debit")],
+        ],
+    )
+
+    assert results[:2] == [dict(message="SUCCESS")] * 2
+    assert results[2]["message"].endswith(
+        "0: Transaction with ID -1 cannot be found."
+    )
+    assert len(commits) == 1
+    assert group_commit(group_app).stats() == dict(
+        batches=1, requests=3, average_batch_size=3.0
+    )
+
+    with group_app.app_context():
+        assert category_ids(1) == (3, 1)
+        assert category_ids(2) == (1, 2)
+
+
+def test_full_batch_is_committed_early(group_app: Flask) -> None:
+    """Test that a batch is committed as soon as it is full, and that
+    the requests after it start a new batch."""
+    group_commit(group_app).max_batch = 2
+    group_commit(group_app).window_seconds = 60.0
+
+    results: list[dict] = categorize_concurrently(
+        group_app,
+        [
+            [dict(transaction_id=1, category_id=3, debit_or_credit="debit")],
+            [dict(transaction_id=2, category_id=1, debit_or_credit="debit")],
+        ],
+    )
+
+    assert results == [dict(message="SUCCESS")] * 2
+    assert group_commit(group_app).stats()["batches"] == 1
+
+
+def test_every_request_of_a_batch_records_the_write(tmp_path) -> None:
+    """Test that the requests following a batch's leader also record
+    when the batch was committed, so that their reads stay on the
+    primary."""
+    group_app: Flask = app_with_config(
+        tmp_path,
+        DATABASE_REPLICA=f"sqlite:///{tmp_path / 'replica.db'}",
+        GROUP_COMMIT=True,
+    )
+    group_commit(group_app).max_batch = 2
+    group_commit(group_app).window_seconds = 60.0
+
+    def categorize(transactions: list[dict]) -> float:
+        with group_app.app_context():
+            group_commit(group_app).categorize(transactions)
+
+            return last_write_time()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        written_at: list[float] = list(
+            executor.map(
+                categorize,
+                [
+                    [dict(transaction_id=1, category_id=3, debit_or_credit="debit")],
+                    [dict(transaction_id=2, category_id=1, debit_or_credit="debit")],
+                ],
+            )
+        )
+
+    assert written_at[0] > 0.0
+    assert written_at[0] == written_at[1]
+
+
+def test_batches_keep_earlier_results(use_test_db) -> None:
+    """Test that a problem in one request of a batch does not undo the
+    other requests or the rest of its own transactions."""
+    messages: list[dict] = categorize_transaction_batches(
+        [
+            [
+                dict(transaction_id=1, category_id=3, debit_or_credit="debit"),
+                dict(transaction_id=2, debit_or_credit="debit"),
+            ],
+            [dict(transaction_id=2, category_id=1, debit_or_credit="debit")],
+        ]
+    )
+
+    assert messages == [
+        dict(
+            message="There were some errors processing the following "
+            "transactions:\n1: Missing key 'category_id'."
+        ),
+        dict(message="SUCCESS"),
+    ]
+    assert category_ids(1) == (3, 1)
+    assert category_ids(2) == (1, 2)
+
+
+def test_failed_row_only_skips_itself(use_test_db) -> None:
+    """Test that a row whose write fails, e.g. on a locked database, is
+    reported as a problem while the other rows of the batch are still
+    committed."""
+
+    def lock_transaction_2(session, flush_context, instances) -> None:
+        if any(getattr(obj, "id", None) == 2 for obj in session.dirty):
+            raise OperationalError(
+                "UPDATE transactions",
+                {},
+                sqlite3.OperationalError("database is locked"),
+            )
+
+    event.listen(DbSetup.Session, "before_flush", lock_transaction_2)
+
+    try:
+        messages: list[dict] = categorize_transaction_batches(
+            [
+                [dict(transaction_id=1, category_id=3, debit_or_credit="debit")],
+                [
+                    dict(transaction_id=2, category_id=1, debit_or_credit="debit"),
+                    dict(transaction_id=4, category_id=3, debit_or_credit="debit"),
+                ],
+            ]
+        )
+    finally:
+        event.remove(DbSetup.Session, "before_flush", lock_transaction_2)
+
+    assert messages[0] == dict(message="SUCCESS")
+    assert "0: (sqlite3.OperationalError) database is locked" in (
+        messages[1]["message"]
+    )
+    assert category_ids(1) == (3, 1)
+    assert category_ids(2) == (None, 2)
+    assert category_ids(4) == (3, 2)
+
+
+def test_put_route_with_group_commit(group_app: Flask) -> None:
+    """Expect the PUT route to categorize through the group commit when
+    it is enabled."""
+    group_commit(group_app).window_seconds = 0.0
+
+    with group_app.test_client() as cli:
+        response = cli.put(
+            BASE_TRANSACTION_URL,
+            json=dict(
+                transactions=[
+                    dict(transaction_id=1, category_id=3, debit_or_credit="debit")
+                ]
+            ),
+        )
+
+    assert json.loads(response.data) == dict(message="SUCCESS")
+    assert group_commit(group_app).stats()["requests"] == 1
+
+    with group_app.app_context():
+        assert category_ids(1) == (3, 1)
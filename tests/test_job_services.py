@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from budget_book_backend.accounts.account_services import (
+    account_net_changes_by_group,
+)
+from budget_book_backend.jobs import job_services
+from budget_book_backend.jobs.job_services import JOB_TYPES, JobRunner, get_job
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.transaction import Transaction
+from tests.test_data.transaction_test_data import account_name_to_id
+
+
+def wait_for_job(job_id: int, timeout: float = 5.0) -> dict:
+    """Poll a job until it has finished and return its details."""
+    deadline: float = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        job: dict = get_job(job_id)["job"]
+
+        if job["status"] in ("succeeded", "failed"):
+            return job
+
+        time.sleep(0.01)
+
+    raise TimeoutError(f"Job {job_id} did not finish in time.")
+
+
+def test_report_job(app: Flask, use_test_db) -> None:
+    """Test that a report job records the same result as running the
+    report directly."""
+    runner: JobRunner = app.extensions[JobRunner.name]
+
+    response: dict = runner.submit(
+        "account_net_changes_by_group",
+        dict(accountGroups=["Expenses"], dateRanges=["2023-01-01", "2023-12-31"]),
+    )
+    assert response["message"] == "SUCCESS"
+
+    job: dict = wait_for_job(response["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["result"] == account_net_changes_by_group(
+        ["Expenses"], ["2023-01-01", "2023-12-31"]
+    )
+
+
+def test_import_job(app: Flask, use_test_db) -> None:
+    """Test that an import job adds the transactions."""
+    runner: JobRunner = app.extensions[JobRunner.name]
+
+    response: dict = runner.submit(
+        "transaction_import",
+        dict(
+            transactions=[
+                dict(
+                    name=f"Imported Transaction {i}",
+                    description="Imported by a background job.",
+                    amount=10.0,
+                    credit_account_id=account_name_to_id("AMEX"),
+                    transaction_date="2023-04-01",
+                )
+                for i in range(3)
+            ]
+        ),
+    )
+
+    job: dict = wait_for_job(response["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["message"] == "SUCCESS"
+
+    with DbSetup.Session() as session:
+        assert (
+            session.query(Transaction)
+            .filter(Transaction.name.like("Imported Transaction %"))
+            .count()
+            == 3
+        )
+
+
+def test_import_job_identical_lines_across_chunks(
+    app: Flask, monkeypatch, use_test_db
+) -> None:
+    """Test that identical lines in different chunks of an import job
+    are all added, and are all duplicates when imported again."""
+    monkeypatch.setattr(job_services, "IMPORT_CHUNK_SIZE", 1)
+    runner: JobRunner = app.extensions[JobRunner.name]
+    params: dict = dict(
+        transactions=[
+            dict(
+                name="Parking",
+                description="Parking meter",
+                amount=2.0,
+                credit_account_id=account_name_to_id("AMEX"),
+                transaction_date="2023-04-01",
+            )
+        ]
+        * 3
+    )
+
+    first_job: dict = wait_for_job(
+        runner.submit("transaction_import", params)["job_id"]
+    )
+    second_job: dict = wait_for_job(
+        runner.submit("transaction_import", params)["job_id"]
+    )
+
+    assert [chunk["new"] for chunk in first_job["result"]["chunks"]] == [1, 1, 1]
+    assert [chunk["duplicates"] for chunk in second_job["result"]["chunks"]] == [
+        1,
+        1,
+        1,
+    ]
+
+
+def test_match_scan_job(app: Flask, use_test_db) -> None:
+    """Test that a match scan job records the matches of each
+    transaction."""
+    runner: JobRunner = app.extensions[JobRunner.name]
+
+    response: dict = runner.submit("match_scan", dict(transaction_ids=[5, 1]))
+
+    job: dict = wait_for_job(response["job_id"])
+
+    assert job["result"] == dict(message="SUCCESS", matches={"5": [2], "1": []})
+
+
+def test_failed_job(app: Flask, use_test_db) -> None:
+    """Test that an exception in a job is recorded as its error."""
+    runner: JobRunner = app.extensions[JobRunner.name]
+
+    response: dict = runner.submit("match_scan", dict(transaction_ids=[-1]))
+
+    job: dict = wait_for_job(response["job_id"])
+
+    assert job["status"] == "failed"
+    assert "could not be found" in job["error"]
+
+
+def test_pending_jobs_are_bounded(app: Flask, use_test_db, monkeypatch) -> None:
+    """Test that submissions are refused once JOB_MAX_PENDING jobs are
+    queued or running."""
+    app.config.update(JOB_MAX_PENDING=1)
+    runner: JobRunner = JobRunner(app)
+
+    release = threading.Event()
+    monkeypatch.setitem(
+        JOB_TYPES, "wait", lambda params, report_progress: dict(done=release.wait(5))
+    )
+
+    first: dict = runner.submit("wait", {})
+    second: dict = runner.submit("wait", {})
+
+    assert first["message"] == "SUCCESS"
+    assert second["message"] == "ERROR"
+
+    release.set()
+    assert wait_for_job(first["job_id"])["result"] == dict(done=True)
+
+    assert runner.submit("wait", {})["message"] == "SUCCESS"
+    runner.shutdown()
+
+
+def test_job_routes(client: FlaskClient, use_test_db) -> None:
+    """Test submitting a job and polling it through the routes."""
+    response = client.post(
+        "/api/jobs",
+        json=dict(job_type="match_scan", params=dict(transaction_ids=[5])),
+    )
+    assert response.status_code == 202
+
+    job_id: int = json.loads(response.data)["job_id"]
+    wait_for_job(job_id)
+
+    job: dict = json.loads(client.get(f"/api/jobs/{job_id}").data)["job"]
+    assert job["result"]["matches"] == {"5": [2]}
+
+    assert client.get("/api/jobs/-1").status_code == 404
+    assert (
+        client.post("/api/jobs", json=dict(job_type="not a job")).status_code == 400
+    )
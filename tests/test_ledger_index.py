@@ -0,0 +1,179 @@
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import insert
+
+from budget_book_backend.accounts.account_services import (
+    delete_account,
+    get_accounts_by_type,
+)
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.ledger_index import LedgerIndex
+from budget_book_backend.models.period_close import BalanceSnapshot
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+    categorize_transactions,
+    remove_transactions,
+    update_transactions,
+)
+from tests.testing_utils import app_with_config
+
+
+@pytest.fixture
+def index_app(tmp_path) -> Flask:
+    """Initialize an app with the ledger index enabled, filled with the
+    test data after the index was built."""
+    return app_with_config(tmp_path, LEDGER_INDEX=True)
+
+
+def ledger_index() -> LedgerIndex:
+    """Return the ledger index of the current database."""
+    index: LedgerIndex | None = DbSetup.extension().ledger_index
+    assert index is not None
+
+    return index
+
+
+@pytest.mark.parametrize(
+    ["start_date", "end_date"],
+    [
+        (None, None),
+        (None, datetime(2023, 2, 26)),
+        (datetime(2023, 2, 25), datetime(2023, 3, 1)),
+        (datetime(2023, 3, 2), None),
+    ],
+    ids=["All time", "Up to a date", "Between dates", "Nothing in range"],
+)
+def test_ledger_index_balances(
+    start_date: datetime | None, end_date: datetime | None, index_app: Flask
+) -> None:
+    """Test that the index gives the same range balances as SQL."""
+    with DbSetup.Session() as session:
+        expected: dict[int, float] = BalanceSnapshot.raw_balances(
+            session, [1, 2, 3, 4], end_date, start_date
+        )
+
+    assert {
+        account_id: round(ledger_index().balance(account_id, start_date, end_date), 2)
+        for account_id in expected
+    } == {account_id: round(balance, 2) for account_id, balance in expected.items()}
+
+
+def test_ledger_index_serves_account_list(index_app: Flask) -> None:
+    """Test that the accounts list is the same with the index."""
+    indexed: list[dict] = get_accounts_by_type(
+        ("all",), datetime(1, 1, 1), datetime(2023, 12, 31)
+    )
+
+    DbSetup.extension().ledger_index = None
+
+    assert indexed == get_accounts_by_type(
+        ("all",), datetime(1, 1, 1), datetime(2023, 12, 31)
+    )
+
+
+def test_ledger_index_memory_report(index_app: Flask) -> None:
+    """Test that the report counts the indexed legs and transactions."""
+    report: dict = ledger_index().memory_report()
+
+    assert report["accounts"] == 4
+    assert report["legs"] == 6
+    assert report["uncategorized"] == 2
+    assert report["bytes"] > 0
+
+
+TRANSACTION_WRITES: list = [
+    pytest.param(
+        lambda: add_new_transactions(
+            [
+                dict(
+                    name="Groceries",
+                    description="Weekly groceries",
+                    amount=82.15,
+                    credit_account_id=1,
+                    debit_account_id=3,
+                    transaction_date="2023-03-04",
+                )
+            ]
+        ),
+        id="add transaction",
+    ),
+    pytest.param(
+        lambda: categorize_transactions(
+            [dict(transaction_id=1, debit_or_credit="debit", category_id=3)]
+        ),
+        id="categorize transaction",
+    ),
+    pytest.param(
+        lambda: update_transactions(
+            [dict(transaction_id=4, transaction_date="2023-01-15", credit_account_id=1)]
+        ),
+        id="update transaction",
+    ),
+    pytest.param(lambda: remove_transactions([3, 5]), id="remove transactions"),
+]
+
+
+@pytest.mark.parametrize(
+    "write",
+    TRANSACTION_WRITES + [pytest.param(lambda: delete_account(3), id="delete account")],
+)
+def test_ledger_index_follows_writes(write, index_app: Flask) -> None:
+    """Test that the write services keep the index consistent."""
+    assert write()["message"] == "SUCCESS"
+
+    assert ledger_index().check_consistency() == []
+
+
+@pytest.mark.parametrize("write", TRANSACTION_WRITES)
+def test_ledger_index_applies_writes_without_reading(
+    write, index_app: Flask, monkeypatch
+) -> None:
+    """Test that the changes of transactions are applied to the index
+    instead of reloading their accounts."""
+
+    def reload(account_ids) -> None:
+        raise AssertionError(f"Reloaded {account_ids}.")
+
+    monkeypatch.setattr(ledger_index(), "reload", reload)
+    monkeypatch.setattr(ledger_index(), "build", lambda: reload(None))
+
+    assert write()["message"] == "SUCCESS"
+
+    monkeypatch.undo()
+
+    assert ledger_index().check_consistency() == []
+
+
+def test_ledger_index_consistency_check(index_app: Flask) -> None:
+    """Test that writes made around the ORM are reported until the index
+    is rebuilt."""
+    with DbSetup.engine.begin() as connection:
+        connection.execute(
+            insert(Transaction).values(
+                name="Written Elsewhere",
+                description="Not seen by the index.",
+                amount=10.0,
+                debit_account_id=3,
+                credit_account_id=1,
+                transaction_date=datetime(2023, 2, 28),
+            )
+        )
+
+    assert ledger_index().check_consistency() == [1, 3]
+
+    ledger_index().build()
+
+    assert ledger_index().check_consistency() == []
+
+
+def test_ledger_index_report_command(index_app: Flask) -> None:
+    """Test that the CLI command prints the memory report."""
+    result = index_app.test_cli_runner().invoke(args=["ledger-index-report"])
+
+    assert json.loads(result.output) == dict(
+        **ledger_index().memory_report(), mismatched_accounts=[]
+    )
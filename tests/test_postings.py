@@ -0,0 +1,123 @@
+import pytest
+from sqlalchemy import select
+
+from budget_book_backend.accounts.account_services import delete_account
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.posting import Posting
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+    categorize_transactions,
+    get_transactions_by_account,
+    remove_transactions,
+    update_transactions,
+)
+from tests.testing_utils import recorded_statements
+
+# The postings of the test transactions, as
+# (transaction_id, account_id, amount, categorized).
+TEST_POSTINGS: set[tuple] = {
+    (1, 1, 123.45, False),
+    (2, 2, 78.9, False),
+    (3, 1, 67.5, True),
+    (3, 3, -67.5, True),
+    (4, 2, 1250.0, True),
+    (4, 4, -1250.0, True),
+    (5, 2, 78.9, True),
+    (5, 1, -78.9, True),
+}
+
+
+def postings() -> set[tuple]:
+    """Return the postings in the database."""
+    with DbSetup.Session() as session:
+        return {
+            (
+                posting.transaction_id,
+                posting.account_id,
+                posting.amount,
+                posting.categorized,
+            )
+            for posting in session.scalars(select(Posting))
+        }
+
+
+def test_postings_of_transactions(use_test_db) -> None:
+    """Test that each transaction has a posting for each of its
+    accounts."""
+    assert postings() == TEST_POSTINGS
+
+
+def test_postings_follow_writes(use_test_db) -> None:
+    """Test that the triggers keep the postings in step with the
+    transactions."""
+    add_new_transactions(
+        [
+            dict(
+                name="Groceries",
+                description="Weekly groceries",
+                amount=82.15,
+                credit_account_id=1,
+                transaction_date="2023-03-04",
+            )
+        ]
+    )
+    categorize_transactions(
+        [dict(transaction_id=1, category_id=3, debit_or_credit="debit")]
+    )
+    update_transactions([dict(transaction_id=4, amount=1300.0)])
+    remove_transactions([5])
+
+    assert postings() == {
+        (1, 1, 123.45, True),
+        (1, 3, -123.45, True),
+        (2, 2, 78.9, False),
+        (3, 1, 67.5, True),
+        (3, 3, -67.5, True),
+        (4, 2, 1300.0, True),
+        (4, 4, -1300.0, True),
+        (6, 1, 82.15, False),
+    }
+
+
+def test_postings_follow_bulk_updates(use_test_db) -> None:
+    """Test that the postings follow the bulk update that uncategorizes
+    the transactions of a deleted account."""
+    delete_account(4)
+
+    assert postings() == TEST_POSTINGS - {
+        (4, 2, 1250.0, True),
+        (4, 4, -1250.0, True),
+    } | {(4, 2, 1250.0, False)}
+
+
+def test_postings_are_built_for_existing_databases(use_test_db) -> None:
+    """Test that the postings table is filled from the existing
+    transactions when it is added to a database without one."""
+    with DbSetup.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE postings")
+
+    DbSetup.add_tables()
+
+    assert postings() == TEST_POSTINGS
+
+
+@pytest.mark.parametrize(
+    ["categorize_type", "expected_ids"],
+    [("all", {1, 3, 5}), ("categorized", {3, 5}), ("uncategorized", {1})],
+)
+def test_transactions_by_account_use_postings(
+    categorize_type: str, expected_ids: set[int], use_test_db
+) -> None:
+    """Test that the transactions of an account are found through the
+    postings instead of an OR across the debit and credit columns."""
+    with recorded_statements() as statements:
+        transactions: list[dict] = get_transactions_by_account([1], categorize_type)
+
+    assert {transaction["id"] for transaction in transactions} == expected_ids
+
+    listing: str = next(
+        statement for statement in statements if "FROM transactions" in statement
+    )
+
+    assert "FROM postings" in listing
+    assert " OR " not in listing
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from budget_book_backend.models.account import Account
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.read_models import AccountRow, TransactionRow
+from budget_book_backend.models.transaction import Transaction
+
+
+@pytest.mark.parametrize(
+    ["start_date", "end_date"],
+    [
+        (datetime(1, 1, 1), datetime(9999, 12, 31)),
+        (datetime(1, 1, 1), datetime(2023, 2, 26)),
+        (datetime(2023, 2, 25), datetime(2023, 3, 1)),
+    ],
+    ids=["All time", "Up to a date", "Between dates"],
+)
+def test_account_rows_match_accounts(
+    start_date: datetime, end_date: datetime, use_test_db
+) -> None:
+    """Test that the account rows give the same details as the ORM
+    accounts."""
+    with DbSetup.Session() as session:
+        rows: list[AccountRow] = AccountRow.load(
+            session, AccountRow.query().order_by(Account.id)
+        )
+        accounts: list[Account] = list(
+            session.scalars(select(Account).order_by(Account.id))
+        )
+
+        assert [
+            (row.id, row.name, row.debit_inc, row.account_type, row.account_group)
+            for row in rows
+        ] == [
+            (
+                account.id,
+                account.name,
+                account.debit_inc,
+                account.account_type.name,
+                account.account_type.group_name,
+            )
+            for account in accounts
+        ]
+
+        assert AccountRow.balances(session, rows, start_date, end_date) == {
+            account.id: account.balance(start_date, end_date) for account in accounts
+        }
+        assert AccountRow.uncategorized_counts(
+            session, rows, start_date, end_date
+        ) == {
+            account.id: account.uncategorized_count(start_date, end_date)
+            for account in accounts
+        }
+        assert AccountRow.last_updated_dates(session, rows) == {
+            account.id: account.last_updated() for account in accounts
+        }
+
+
+def test_transaction_rows_match_transactions(use_test_db) -> None:
+    """Test that the transaction rows hold the same values as the ORM
+    transactions."""
+    with DbSetup.Session() as session:
+        rows: list[TransactionRow] = TransactionRow.load(
+            session, TransactionRow.query().order_by(Transaction.id)
+        )
+        transactions: list[Transaction] = list(
+            session.scalars(select(Transaction).order_by(Transaction.id))
+        )
+
+        assert rows == [
+            tuple(getattr(transaction, field) for field in TransactionRow._fields)
+            for transaction in transactions
+        ]
+
+    assert rows[0].date_entered is not None
+    assert rows[0].to_dict() == dict(
+        id=1,
+        name=rows[0].name,
+        description=rows[0].description,
+        amount=rows[0].amount,
+        debit_account_id="undefined",
+        credit_account_id=rows[0].credit_account_id,
+        transaction_date="2023-02-21 00:00:00.000000",
+        date_entered=rows[0].date_entered.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        version=1,
+    )
@@ -0,0 +1,145 @@
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import insert
+
+from budget_book_backend.accounts.account_services import account_balance_history
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+    get_transactions_by_account,
+)
+from tests.test_data.transaction_test_data import account_name_to_id
+from tests.testing_utils import app_with_config
+
+
+@pytest.fixture
+def replica_app(tmp_path) -> Flask:
+    """Initialize an app with a primary and a read replica database,
+    both filled with the test data."""
+    replica_app: Flask = app_with_config(
+        tmp_path,
+        DATABASE_REPLICA=f"sqlite:///{tmp_path / 'replica.db'}",
+        DATABASE_REPLICA_CHECK_SECONDS=0,
+    )
+
+    DbSetup.refresh_replica()
+
+    return replica_app
+
+
+def transaction_names(account_name: str) -> list[str]:
+    """Return the names of the transactions read for the given account."""
+    return [
+        transaction["name"]
+        for transaction in get_transactions_by_account(
+            [account_name_to_id(account_name)]
+        )
+    ]
+
+
+def test_reads_use_replica_until_refreshed(replica_app: Flask) -> None:
+    """Test that reads are served from the replica, which only sees
+    changes written outside of the app once it is refreshed."""
+    with DbSetup.engine.begin() as connection:
+        connection.execute(
+            insert(Transaction).values(
+                name="Written Elsewhere",
+                description="Not yet copied to the replica.",
+                amount=10.0,
+                debit_account_id=account_name_to_id("Gas for Car"),
+                credit_account_id=account_name_to_id("AMEX"),
+                transaction_date=datetime(2023, 2, 28),
+            )
+        )
+
+    assert "Written Elsewhere" not in transaction_names("Gas for Car")
+
+    DbSetup.refresh_replica()
+
+    assert "Written Elsewhere" in transaction_names("Gas for Car")
+
+
+def test_reads_follow_own_writes(replica_app: Flask) -> None:
+    """Test that after writing through a session, reads go to the
+    primary so the writer sees its own changes before a refresh."""
+    add_new_transactions(
+        [
+            dict(
+                name="My Own Write",
+                description="Should be read back immediately.",
+                amount=20.0,
+                debit_account_id=account_name_to_id("Gas for Car"),
+                credit_account_id=account_name_to_id("AMEX"),
+                transaction_date="2023-02-28",
+            )
+        ]
+    )
+
+    assert "My Own Write" in transaction_names("Gas for Car")
+
+    history: dict = account_balance_history(
+        [account_name_to_id("Gas for Car")],
+        datetime(2023, 3, 1),
+        datetime(2023, 3, 1),
+    )
+    assert history["balances"][account_name_to_id("Gas for Car")] == [87.5]
+
+    DbSetup.refresh_replica()
+
+    with DbSetup.ReadSession() as session:
+        assert session.get_bind() is DbSetup.extension().replica_engine
+
+
+def test_requests_forget_earlier_writes_of_their_thread(replica_app: Flask) -> None:
+    """Test that a request is not kept on the primary because an earlier
+    request handled by the same thread wrote, but only by its client's
+    own writes."""
+    add_new_transactions(
+        [
+            dict(
+                name="Another Client's Write",
+                description="Written before this thread's next request.",
+                amount=20.0,
+                debit_account_id=account_name_to_id("Gas for Car"),
+                credit_account_id=account_name_to_id("AMEX"),
+                transaction_date="2023-02-28",
+            )
+        ]
+    )
+
+    with replica_app.test_client() as cli:
+        response = cli.get(
+            f"{BASE_TRANSACTION_URL}?account_ids={account_name_to_id('Gas for Car')}"
+        )
+
+    assert "Another Client's Write" not in [
+        transaction["name"] for transaction in json.loads(response.data)["transactions"]
+    ]
+
+
+def test_writes_without_replica_set_no_cookie(client: FlaskClient, use_test_db) -> None:
+    """Test that without a replica, writes do not record their time in
+    a session cookie that nothing reads."""
+    response = client.post(
+        BASE_TRANSACTION_URL,
+        json=dict(
+            transactions=[
+                dict(
+                    name="No Cookie",
+                    description="Written without a replica.",
+                    amount=5.0,
+                    credit_account_id=1,
+                    transaction_date="2023-03-02",
+                )
+            ]
+        ),
+    )
+
+    assert json.loads(response.data)["message"] == "SUCCESS"
+    assert "Set-Cookie" not in response.headers
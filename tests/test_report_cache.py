@@ -0,0 +1,148 @@
+import json
+
+import pytest
+from flask import Flask
+
+from budget_book_backend.accounts.account_routes import BASE_ACCOUNTS_URL
+from budget_book_backend.accounts.account_services import (
+    account_net_changes_by_group,
+    update_account_info,
+)
+from budget_book_backend.metrics.metrics_routes import BASE_METRICS_URL
+from budget_book_backend.models.report_cache import ReportCache
+from budget_book_backend.transactions.transaction_services import (
+    categorize_transactions,
+)
+from tests.testing_utils import app_with_config, recorded_statements
+
+YEAR: list[str] = ["2023-01-01", "2023-12-31"]
+
+
+@pytest.fixture
+def cache_app(tmp_path) -> Flask:
+    """Initialize an app with the report cache enabled."""
+    return app_with_config(tmp_path, REPORT_CACHE=True)
+
+
+def report_cache(app: Flask) -> ReportCache:
+    """Return the report cache of the app."""
+    return app.extensions[ReportCache.name]
+
+
+def test_repeated_reports_are_cached(cache_app: Flask) -> None:
+    """Test that a report asked for again, with its groups in any order
+    or its dates written differently, is answered without reading the
+    database."""
+    first: dict = account_net_changes_by_group(["Expenses", "Assets"], list(YEAR))
+
+    with recorded_statements() as statements:
+        again: dict = account_net_changes_by_group(
+            ["Assets", "Expenses", "Assets"], ["2023-1-1", "2023-12-31"]
+        )
+
+    assert statements == []
+    assert again["Expenses"] == first["Expenses"] == {
+        "Gas": {"Gas for Car": [-67.5]},
+        "Rent": {"Apartment Rent": [-1250.0]},
+    }
+    assert again["dates"] == ["2023-1-1", "2023-12-31"]
+    assert report_cache(cache_app).stats() | dict(hit_rate=0.5) == dict(
+        size=1,
+        max_size=128,
+        hits=1,
+        misses=1,
+        hit_rate=0.5,
+        evictions=0,
+        invalidations=0,
+    )
+
+
+def test_writes_only_invalidate_their_accounts(cache_app: Flask) -> None:
+    """Test that categorizing a transaction only drops the reports that
+    include its accounts."""
+    account_net_changes_by_group(["Expenses"], list(YEAR))
+    account_net_changes_by_group(["Assets"], list(YEAR))
+
+    categorize_transactions(
+        [dict(transaction_id=1, category_id=3, debit_or_credit="debit")]
+    )
+
+    assert report_cache(cache_app).stats()["invalidations"] == 1
+
+    with recorded_statements() as statements:
+        assets: dict = account_net_changes_by_group(["Assets"], list(YEAR))
+
+    assert statements == []
+    assert assets["Assets"] == {"Savings Account": {"Chase Savings": [1328.9]}}
+    assert account_net_changes_by_group(["Expenses"], list(YEAR))["Expenses"][
+        "Gas"
+    ] == {"Gas for Car": [-190.95]}
+
+
+def test_account_changes_invalidate_every_report(cache_app: Flask) -> None:
+    """Test that a change to an account moves the ledger to a new
+    version, since it may move the account between groups."""
+    account_net_changes_by_group(["Expenses"], list(YEAR))
+    account_net_changes_by_group(["Assets"], list(YEAR))
+
+    update_account_info(dict(id=2, name="Savings", account_type_id=1, debit_inc=True))
+
+    assert report_cache(cache_app).stats() | dict(hits=0, misses=0) == dict(
+        size=0,
+        max_size=128,
+        hits=0,
+        misses=0,
+        hit_rate=0.0,
+        evictions=0,
+        invalidations=2,
+    )
+    assert account_net_changes_by_group(["Assets"], list(YEAR))["Assets"] == {
+        "Checking Account": {"Savings": [1328.9]}
+    }
+
+
+def test_least_recently_used_reports_are_evicted(cache_app: Flask) -> None:
+    """Test that only REPORT_CACHE_SIZE reports are kept, evicting the
+    least recently used."""
+    report_cache(cache_app).max_size = 2
+
+    account_net_changes_by_group(["Expenses"], list(YEAR))
+    account_net_changes_by_group(["Assets"], list(YEAR))
+    account_net_changes_by_group(["Expenses"], list(YEAR))
+    account_net_changes_by_group(["Liabilities"], list(YEAR))
+
+    assert [key[0] for key in report_cache(cache_app).reports] == [
+        ("Expenses",),
+        ("Liabilities",),
+    ]
+    assert report_cache(cache_app).stats()["evictions"] == 1
+
+
+def test_reports_changed_while_computed_are_not_cached(cache_app: Flask) -> None:
+    """Test that a report whose accounts change while it is computed is
+    returned but not cached, since it may be missing the change."""
+
+    def compute() -> tuple[dict[str, dict], set[int]]:
+        report_cache(cache_app).invalidate({3})
+
+        return dict(Expenses={}), {3, 4}
+
+    assert report_cache(cache_app).get_or_compute(["Expenses"], [], compute) == dict(
+        Expenses={}
+    )
+    assert report_cache(cache_app).stats()["size"] == 0
+
+
+def test_metrics_include_hit_rate(cache_app: Flask) -> None:
+    """Expect the metrics route to report the hits and misses of the
+    report cache."""
+    with cache_app.test_client() as cli:
+        for _ in range(4):
+            cli.post(
+                f"{BASE_ACCOUNTS_URL}/balances-by-group",
+                json=dict(accountGroups=["Expenses"], dateRanges=YEAR),
+            )
+
+        metrics: dict = json.loads(cli.get(BASE_METRICS_URL).data)
+
+    assert metrics["metrics"][ReportCache.name]["hit_rate"] == 0.75
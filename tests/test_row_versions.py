@@ -0,0 +1,188 @@
+import sqlite3
+from datetime import datetime
+from typing import Iterator
+
+import pytest
+from sqlalchemy import event, inspect
+
+from budget_book_backend.accounts.account_services import (
+    delete_account,
+    get_accounts_by_type,
+    update_account_info,
+)
+from budget_book_backend.models.account import Account
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_services import (
+    categorize_transaction_batches,
+    categorize_transactions,
+    get_transactions_by_account,
+    update_transactions,
+)
+
+# Every date of the test transactions.
+DATE_RANGE: tuple[datetime, datetime] = (datetime(1, 1, 1), datetime(2024, 1, 1))
+
+
+def version_of(model: type, row_id: int) -> int:
+    """Return the version of a transaction or account."""
+    with DbSetup.Session() as session:
+        row = session.get(model, row_id)
+        assert row is not None
+
+        return row.version
+
+
+@pytest.fixture
+def concurrent_edit(use_test_db) -> Iterator[None]:
+    """Have another connection change transaction 2 just before this
+    process's first update, after the transaction was read."""
+    database: str = DbSetup.engine.url.database or ""
+    edited: list[bool] = []
+
+    def edit_first(conn, cursor, statement: str, parameters, context, executemany):
+        if statement.startswith("UPDATE transactions") and not edited:
+            edited.append(True)
+
+            with sqlite3.connect(database) as other:
+                other.execute(
+                    "UPDATE transactions SET name = 'Edited elsewhere', "
+                    "version = version + 1 WHERE id = 2"
+                )
+
+    event.listen(DbSetup.engine, "before_cursor_execute", edit_first)
+
+    yield
+
+    event.remove(DbSetup.engine, "before_cursor_execute", edit_first)
+
+
+def test_updates_move_to_a_new_version(use_test_db) -> None:
+    """Test that every kind of update increments the version."""
+    assert version_of(Transaction, 1) == 1
+
+    categorize_transactions(
+        [dict(transaction_id=1, category_id=3, debit_or_credit="debit")]
+    )
+    update_transactions([dict(transaction_id=1, name="Renamed", version=2)])
+    delete_account(3)
+
+    assert version_of(Transaction, 1) == 4
+    assert version_of(Transaction, 4) == 1
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda version: categorize_transactions(
+            [
+                dict(transaction_id=1, category_id=3, debit_or_credit="debit"),
+                dict(
+                    transaction_id=2,
+                    category_id=1,
+                    debit_or_credit="debit",
+                    version=version,
+                ),
+            ]
+        ),
+        lambda version: update_transactions(
+            [
+                dict(transaction_id=1, name="Renamed"),
+                dict(transaction_id=2, name="Renamed", version=version),
+            ]
+        ),
+    ],
+    ids=["Categorize", "Update"],
+)
+def test_stale_versions_conflict(update, use_test_db) -> None:
+    """Test that a transaction sent with an old version is reported as a
+    conflict and left as is, while the other transactions are changed."""
+    update_transactions([dict(transaction_id=2, name="Edited in another tab")])
+
+    result: dict = update(1)
+
+    assert result == dict(
+        message="There were some errors processing the following transactions:"
+        "\n1: Transaction with ID 2 was changed by another request.",
+        conflicts=[dict(index=1, transaction_id=2, version=2)],
+    )
+    assert version_of(Transaction, 1) == 2
+    assert version_of(Transaction, 2) == 2
+
+    assert update(2)["message"] == "SUCCESS"
+    assert version_of(Transaction, 2) == 3
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda: categorize_transaction_batches(
+            [
+                [dict(transaction_id=2, category_id=1, debit_or_credit="debit")],
+                [dict(transaction_id=1, category_id=3, debit_or_credit="debit")],
+            ]
+        )[0],
+        lambda: update_transactions([dict(transaction_id=2, amount=80.0)]),
+    ],
+    ids=["Categorize", "Update"],
+)
+def test_concurrent_edits_conflict(update, concurrent_edit) -> None:
+    """Test that a transaction changed between its read and its update
+    is reported as a conflict instead of overwriting the change."""
+    assert update()["conflicts"] == [dict(index=0, transaction_id=2, version=2)]
+
+    with DbSetup.Session() as session:
+        transaction: Transaction | None = session.get(Transaction, 2)
+        assert transaction is not None
+
+        assert (transaction.name, transaction.amount) == ("Edited elsewhere", 78.9)
+        assert transaction.debit_account_id is None
+
+    assert categorize_transaction_batches([[]]) == [dict(message="SUCCESS")]
+
+
+def test_account_versions(use_test_db) -> None:
+    """Test that an account edit sent with an old version conflicts."""
+    edit: dict = dict(id=2, name="Savings", account_type_id=1, debit_inc=True)
+
+    assert update_account_info(dict(edit, version=1)) == dict(message="SUCCESS")
+    assert update_account_info(dict(edit, name="Old Savings", version=1)) == dict(
+        message="ERROR",
+        error="Account with ID 2 was changed by another request.",
+        version=2,
+    )
+
+    with DbSetup.Session() as session:
+        account: Account | None = session.get(Account, 2)
+        assert account is not None
+
+        assert (account.name, account.version) == ("Savings", 2)
+
+
+def test_reads_include_versions(use_test_db) -> None:
+    """Test that the listings return the versions to send back."""
+    categorize_transactions(
+        [dict(transaction_id=1, category_id=3, debit_or_credit="debit")]
+    )
+
+    transactions: list[dict] = get_transactions_by_account([1])
+    accounts: list[dict] = get_accounts_by_type(("all",), *DATE_RANGE)
+
+    assert {
+        transaction["id"]: transaction["version"] for transaction in transactions
+    } == {1: 2, 3: 1, 5: 1}
+    assert {account["version"] for account in accounts} == {1}
+
+
+def test_existing_rows_are_versioned(use_test_db) -> None:
+    """Test that the version column is added to the rows of a database
+    created before it."""
+    with DbSetup.engine.begin() as connection:
+        connection.exec_driver_sql("ALTER TABLE accounts DROP COLUMN version")
+
+    DbSetup.add_tables()
+
+    assert "version" in {
+        column["name"] for column in inspect(DbSetup.engine).get_columns("accounts")
+    }
+    assert version_of(Account, 1) == 1
@@ -0,0 +1,83 @@
+from typing import cast
+
+import pytest
+from flask import Flask
+from sqlalchemy import Engine, QueuePool, text
+
+pytest.importorskip("gunicorn")
+
+from budget_book_backend import create_app  # noqa: E402
+from budget_book_backend.models.db_setup import DbSetup  # noqa: E402
+from budget_book_backend.server import (  # noqa: E402
+    ProductionServer,
+    server_options,
+    worker_exit,
+)
+
+
+def test_server_options_from_config(app: Flask) -> None:
+    """Test that the gunicorn settings come from the app's config."""
+    app.config.update(SERVER_BIND="0.0.0.0:9000", SERVER_WORKERS=3)
+
+    server: ProductionServer = ProductionServer(app)
+
+    assert server.cfg.bind == ["0.0.0.0:9000"]
+    assert server.cfg.workers == 3
+    assert server.cfg.threads == app.config["SERVER_THREADS"]
+    assert server.cfg.keepalive == app.config["SERVER_KEEPALIVE"]
+    assert server.cfg.preload_app
+
+
+@pytest.mark.parametrize(
+    ["features", "workers"],
+    [(dict(), 2), (dict(LEDGER_INDEX=True), 1), (dict(REPORT_CACHE=True), 1)],
+    ids=["default", "ledger index", "report cache"],
+)
+def test_default_workers(features: dict, workers: int, app: Flask) -> None:
+    """Test that a single worker is started by default when a feature
+    keeps the ledger's state in the process."""
+    app.config.update(SERVER_WORKERS=None, **features)
+
+    assert server_options(app)["workers"] == workers
+
+
+@pytest.mark.parametrize(
+    "feature", ["LEDGER_INDEX", "REPORT_CACHE"], ids=["ledger index", "report cache"]
+)
+def test_single_process_features_refuse_workers(feature: str, app: Flask) -> None:
+    """Test that the server refuses to start several workers that would
+    each keep their own ledger index or report cache."""
+    app.config.update(SERVER_WORKERS=3, **{feature: True})
+
+    with pytest.raises(RuntimeError, match=f"{feature} need a single worker process"):
+        ProductionServer(app)
+
+
+def test_server_options_from_environment(monkeypatch) -> None:
+    """Test that environment variables override the default settings."""
+    monkeypatch.setenv("BUDGET_BOOKS_SERVER_WORKERS", "6")
+    monkeypatch.setenv("BUDGET_BOOKS_SERVER_BIND", "0.0.0.0:8080")
+
+    options: dict = server_options(
+        create_app(test_config=dict(DATABASE="sqlite:///tests/test.db"))
+    )
+
+    assert options["workers"] == 6
+    assert options["bind"] == "0.0.0.0:8080"
+
+
+def test_worker_exit_disposes_pools(app: Flask) -> None:
+    """Test that a worker shutting down closes its pooled connections."""
+    with app.app_context():
+        engine: Engine = DbSetup.engine
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    pool: QueuePool = cast(QueuePool, engine.pool)
+
+    assert pool.checkedin() == 1
+
+    worker_exit(None, None)
+
+    assert pool.checkedin() == 0
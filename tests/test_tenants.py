@@ -0,0 +1,90 @@
+import json
+from os import path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from budget_book_backend import create_app
+from budget_book_backend.account_types.account_type_services import (
+    create_account_type,
+    get_account_types,
+)
+from budget_book_backend.models.db_setup import DbExtension, DbSetup
+
+
+@pytest.fixture
+def tenant_app(tmp_path) -> Flask:
+    """Initialize an app that keeps each user's ledger in its own
+    database file."""
+    return create_app(
+        test_config=dict(
+            DATABASE=f"sqlite:///{tmp_path / 'main.db'}",
+            TENANT_DATABASE=f"sqlite:///{tmp_path / 'ledgers'}/user_{{user_id}}.db",
+            TENANT_MAX_ENGINES=2,
+        )
+    )
+
+
+def test_users_have_separate_ledgers(tenant_app: Flask, tmp_path) -> None:
+    """Test that each user's requests only see that user's data."""
+    client: FlaskClient = tenant_app.test_client()
+
+    response = client.post(
+        "/api/accounttypes",
+        json=dict(user_id=1, name="User One Checking", group_name="Assets"),
+    )
+    assert json.loads(response.data)["message"] == "SUCCESS"
+
+    user_one: dict = json.loads(client.get("/api/accounttypes?user_id=1").data)
+    user_two: dict = json.loads(
+        client.get("/api/accounttypes", headers={"X-User-Id": "2"}).data
+    )
+
+    assert [account_type["name"] for account_type in user_one["account_types"]] == [
+        "User One Checking"
+    ]
+    assert user_two["account_types"] == []
+
+    assert path.exists(tmp_path / "ledgers" / "user_1.db")
+    assert path.exists(tmp_path / "ledgers" / "user_2.db")
+
+
+def test_request_without_user_is_rejected(tenant_app: Flask) -> None:
+    """Test that a request without a valid user_id gets a 400."""
+    client: FlaskClient = tenant_app.test_client()
+
+    for url in ["/api/accounttypes", "/api/accounttypes?user_id=../../etc"]:
+        response = client.get(url)
+
+        assert response.status_code == 400
+        assert json.loads(response.data)["message"] == "ERROR"
+
+
+def test_shards_are_created_lazily_and_evicted(tenant_app: Flask, tmp_path) -> None:
+    """Test that shards are only created when first used and that the
+    least recently used one is closed past TENANT_MAX_ENGINES."""
+    extension: DbExtension = tenant_app.extensions[DbExtension.name]
+
+    assert not path.exists(tmp_path / "ledgers" / "user_3.db")
+
+    for user_id in [3, 4]:
+        with DbSetup.use_tenant(user_id):
+            create_account_type(f"Account Type {user_id}")
+
+    # Use the first shard again so that the second is least recent.
+    with DbSetup.use_tenant(3):
+        get_account_types()
+
+    with DbSetup.use_tenant(5):
+        create_account_type("Account Type 5")
+
+    assert list(extension.tenant_shards.keys()) == ["3", "5"]
+
+    # Reopening an evicted shard keeps its data.
+    with DbSetup.use_tenant(4):
+        assert [account_type["name"] for account_type in get_account_types()] == [
+            "Account Type 4"
+        ]
+
+    assert list(extension.tenant_shards.keys()) == ["5", "4"]
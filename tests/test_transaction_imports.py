@@ -0,0 +1,169 @@
+import json
+
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine.interfaces import ReflectedIndex
+from werkzeug.test import TestResponse
+
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+)
+from tests.testing_utils import recorded_statements
+
+
+def statement_line(**changes) -> dict:
+    """Return a line of a credit card statement, with the given changes."""
+    return dict(
+        dict(
+            name="Corner Coffee",
+            description="Coffee",
+            amount=4.5,
+            credit_account_id=1,
+            transaction_date="2023-03-02",
+        ),
+        **changes,
+    )
+
+
+def transaction_count() -> int:
+    """Return the number of transactions in the database."""
+    with DbSetup.Session() as session:
+        return session.scalar(select(func.count()).select_from(Transaction)) or 0
+
+
+def test_reimport_skips_duplicates(use_test_db) -> None:
+    """Test that importing a statement again adds nothing, and that an
+    overlapping statement only adds its new lines."""
+    first_statement: list[dict] = [
+        statement_line(),
+        statement_line(name="Bookstore", amount=25.0),
+    ]
+    overlapping_statement: list[dict] = [
+        statement_line(name="Bookstore", amount=25.0),
+        statement_line(name="Grocer", amount=60.25, transaction_date="2023-03-05"),
+    ]
+
+    assert add_new_transactions(first_statement) == dict(
+        message="SUCCESS", new=2, duplicates=0, duplicate_indexes=[]
+    )
+    assert add_new_transactions(first_statement) == dict(
+        message="SUCCESS", new=0, duplicates=2, duplicate_indexes=[0, 1]
+    )
+    assert add_new_transactions(overlapping_statement) == dict(
+        message="SUCCESS", new=1, duplicates=1, duplicate_indexes=[0]
+    )
+    assert transaction_count() == 8
+
+
+def test_identical_lines_within_a_statement(use_test_db) -> None:
+    """Test that identical lines of one statement are all added, and are
+    only duplicates of as many identical lines already imported."""
+    assert add_new_transactions([statement_line()] * 2)["new"] == 2
+
+    result: dict = add_new_transactions([statement_line()] * 3)
+
+    assert (result["new"], result["duplicate_indexes"]) == (1, [0, 1])
+    assert transaction_count() == 8
+
+
+@pytest.mark.parametrize(
+    ["changes", "is_duplicate"],
+    [
+        (dict(name="  CORNER   coffee "), True),
+        (dict(amount="4.50"), True),
+        (dict(transaction_date="2023-03-02T18:30:00"), True),
+        (dict(description="Latte"), True),
+        (dict(name="Corner Cafe"), False),
+        (dict(amount=4.51), False),
+        (dict(transaction_date="2023-03-03"), False),
+        (dict(credit_account_id=2), False),
+        (dict(credit_account_id=None, debit_account_id=1), False),
+    ],
+    ids=[
+        "Name case and spacing",
+        "Amount as a string",
+        "Time of day",
+        "Description",
+        "Other name",
+        "Other amount",
+        "Other date",
+        "Other account",
+        "Other side",
+    ],
+)
+def test_duplicate_content(changes: dict, is_duplicate: bool, use_test_db) -> None:
+    """Test which differences make a line a new transaction."""
+    add_new_transactions([statement_line()])
+
+    assert add_new_transactions([statement_line(**changes)])["duplicates"] == int(
+        is_duplicate
+    )
+
+
+def test_dry_run(use_test_db) -> None:
+    """Test that a dry run counts the new and duplicate lines without
+    adding any of them."""
+    add_new_transactions([statement_line()])
+
+    with recorded_statements() as statements:
+        result: dict = add_new_transactions(
+            [statement_line(), statement_line(name="Bookstore")], dry_run=True
+        )
+
+    assert result == dict(message="SUCCESS", new=1, duplicates=1, duplicate_indexes=[0])
+    assert not any(statement.startswith("INSERT") for statement in statements)
+    assert transaction_count() == 6
+
+
+def test_existing_transactions_are_hashed(use_test_db) -> None:
+    """Test that the transactions of a database created before the
+    content hash column are given hashes, so that their duplicates are
+    found."""
+    with DbSetup.engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_transactions_content_hash")
+        connection.exec_driver_sql("ALTER TABLE transactions DROP COLUMN content_hash")
+
+    DbSetup.add_tables()
+
+    indexes: list[ReflectedIndex] = inspect(DbSetup.engine).get_indexes("transactions")
+
+    assert {
+        "name": "ix_transactions_content_hash",
+        "column_names": ["content_hash"],
+        "unique": 1,
+    }.items() <= next(
+        index for index in indexes if index["name"] == "ix_transactions_content_hash"
+    ).items()
+
+    result: dict = add_new_transactions(
+        [
+            dict(
+                name="Uncategorized Test Transaction",
+                description="An uncategorized test transaction for the credit card.",
+                amount=123.45,
+                credit_account_id=1,
+                transaction_date="2023-02-21",
+            )
+        ]
+    )
+
+    assert result["duplicates"] == 1
+
+
+def test_dry_run_route(client: FlaskClient, use_test_db) -> None:
+    """Expect a dry run request to return the counts without adding the
+    transactions."""
+    with client as cli:
+        response: TestResponse = cli.post(
+            BASE_TRANSACTION_URL,
+            json=dict(transactions=[statement_line()], dry_run=True),
+        )
+
+    assert json.loads(response.data) == dict(
+        message="SUCCESS", new=1, duplicates=0, duplicate_indexes=[]
+    )
+    assert transaction_count() == 5
@@ -33,3 +33,76 @@ def test_base_url_get_failure(client: FlaskClient, use_test_db) -> None:
     assert response_data.get("message") == "ERROR"
 
     assert response_data.get("error")
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["order=newest", "start_date=yesterday", "min_amount=lots"],
+    ids=["Unknown order", "Invalid date", "Invalid amount"],
+)
+def test_base_url_get_invalid_filters(
+    query: str, client: FlaskClient, use_test_db
+) -> None:
+    """Expect a request with an invalid filter to return a 400 status
+    with the error information in the response dict."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_TRANSACTION_URL}?account_ids=1&{query}",
+        )
+
+    assert response.status_code == 400
+
+    response_data: dict = json.loads(response.data)
+
+    assert response_data.get("message") == "ERROR"
+    assert response_data.get("error")
+
+
+def test_base_url_get_filters(client: FlaskClient, use_test_db) -> None:
+    """Expect the filters to be applied to the transactions returned."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_TRANSACTION_URL}?account_ids=1,2"
+            "&start_date=2023-02-24&end_date=2023-03-01&min_amount=70&order=desc",
+        )
+
+    assert response.status_code == 200
+
+    assert [
+        transaction["id"] for transaction in json.loads(response.data)["transactions"]
+    ] == [4, 2, 5]
+
+
+def test_export(client: FlaskClient, use_test_db) -> None:
+    """Expect the export to be streamed as CSV with the account names
+    and the same filters as the transactions."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_TRANSACTION_URL}/export?account_ids=2&categorize_type=uncategorized",
+        )
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == "text/csv"
+        assert response.get_data(as_text=True).splitlines() == [
+            "id,transaction_date,name,description,amount,debit_account_id,"
+            "debit_account,credit_account_id,credit_account",
+            "2,2023-02-25,Uncategorized CC Payment,"
+            "An uncategorized payment to the credit card.,78.9,,,2,Chase Savings",
+        ]
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["", "?account_ids=1&start_date=March", "?account_ids=1&order=sideways"],
+    ids=["Missing account_ids", "Invalid date", "Invalid order"],
+)
+def test_export_invalid_arguments(
+    query: str, client: FlaskClient, use_test_db
+) -> None:
+    """Expect an export with invalid arguments to return a 400 status."""
+    with client as cli:
+        response: TestResponse = cli.get(f"{BASE_TRANSACTION_URL}/export{query}")
+
+    assert response.status_code == 400
+    assert json.loads(response.data)["message"] == "ERROR"
@@ -0,0 +1,146 @@
+import json
+from datetime import datetime
+
+import pytest
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+from budget_book_backend.models.db_setup import DbSetup
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+    remove_transactions,
+    search_transactions,
+    update_transactions,
+)
+
+
+def found_ids(query: str, **kwargs) -> list[int]:
+    """Return the IDs of the transactions found by the search."""
+    result: dict = search_transactions(query, **kwargs)
+
+    assert result["message"] == "SUCCESS"
+
+    return [transaction["id"] for transaction in result["transactions"]]
+
+
+@pytest.mark.parametrize(
+    ["query", "kwargs", "expected_ids"],
+    [
+        ("payment", dict(), {2, 5}),
+        ("credit card", dict(), {1, 2, 5}),
+        ("cost", dict(), {3}),
+        ("CREDIT", dict(), {1, 2, 5}),
+        ("payment", dict(account_ids=[1]), {5}),
+        ("card", dict(end_date=datetime(2023, 2, 22)), {1}),
+        ("card", dict(start_date=datetime(2023, 2, 24)), {2, 5}),
+        ("groceries", dict(), set()),
+        ('credit AND "card', dict(), set()),
+    ],
+    ids=[
+        "Single word",
+        "Every word must match",
+        "Prefix",
+        "Case insensitive",
+        "Account filter",
+        "End date",
+        "Start date",
+        "No matches",
+        "Operators are searched for",
+    ],
+)
+def test_search_transactions(
+    query: str, kwargs: dict, expected_ids: set[int], use_test_db
+) -> None:
+    """Test that the search matches the names and descriptions."""
+    assert set(found_ids(query, **kwargs)) == expected_ids
+
+
+def test_search_transactions_ranking(use_test_db) -> None:
+    """Test that the transaction matching in both its name and
+    description is ranked first."""
+    assert found_ids("rent")[0] == 4
+    assert found_ids("uncategorized payment")[0] == 2
+
+
+def test_search_transactions_pages(use_test_db) -> None:
+    """Test that the pages cover every match once."""
+    first_page: dict = search_transactions("card", limit=2)
+    second_page: dict = search_transactions("card", limit=2, offset=2)
+
+    assert first_page["has_more"] is True
+    assert second_page["has_more"] is False
+    assert len(first_page["transactions"]) == 2
+    assert [
+        transaction["id"]
+        for transaction in first_page["transactions"] + second_page["transactions"]
+    ] == found_ids("card")
+
+
+@pytest.mark.parametrize(
+    ["query", "kwargs"],
+    [(" ", dict()), ("card", dict(limit=0)), ("card", dict(offset=-1))],
+    ids=["Empty query", "No page size", "Negative offset"],
+)
+def test_search_transactions_errors(query: str, kwargs: dict, use_test_db) -> None:
+    """Test that invalid searches return an error message."""
+    result: dict = search_transactions(query, **kwargs)
+
+    assert result["message"] == "ERROR"
+    assert result["error"]
+
+
+def test_search_follows_writes(use_test_db) -> None:
+    """Test that the triggers keep the search table in sync."""
+    add_new_transactions(
+        [
+            dict(
+                name="Groceries",
+                description="Weekly groceries",
+                amount=82.15,
+                credit_account_id=1,
+                transaction_date="2023-03-04",
+            )
+        ]
+    )
+    update_transactions([dict(transaction_id=3, name="Shell Fuel")])
+    remove_transactions([4])
+
+    assert found_ids("groceries") == [6]
+    assert found_ids("shell") == [3]
+    assert found_ids("costco") == [3]  # The description is unchanged.
+    assert found_ids("rent") == []
+
+
+def test_search_table_is_built_for_existing_databases(use_test_db) -> None:
+    """Test that the search table is filled from the existing
+    transactions when it is added to a database without one."""
+    with DbSetup.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE transactions_fts")
+
+    DbSetup.add_tables()
+
+    assert set(found_ids("card")) == {1, 2, 5}
+
+
+def test_search_route(client: FlaskClient, use_test_db) -> None:
+    """Expect a search request to return a page of transactions, and an
+    invalid one to return a 400 status."""
+    with client as cli:
+        response: TestResponse = cli.get(
+            f"{BASE_TRANSACTION_URL}/search?q=card&account_ids=1&limit=1"
+        )
+        invalid_response: TestResponse = cli.get(
+            f"{BASE_TRANSACTION_URL}/search?q=card&start_date=March"
+        )
+
+    assert response.status_code == 200
+
+    response_data: dict = json.loads(response.data)
+
+    assert response_data["message"] == "SUCCESS"
+    assert len(response_data["transactions"]) == 1
+    assert response_data["has_more"] is True
+
+    assert invalid_response.status_code == 400
+    assert json.loads(invalid_response.data)["message"] == "ERROR"
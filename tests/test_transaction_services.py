@@ -1,10 +1,20 @@
+import csv
+import io
+import sqlite3
+
 import pytest
 from datetime import datetime
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError
 
+from budget_book_backend.accounts.account_services import close_period
 from budget_book_backend.models.db_setup import DbSetup
 from budget_book_backend.models.transaction import Transaction
+from budget_book_backend.transactions import transaction_services
 from budget_book_backend.transactions.transaction_services import (
+    TRANSACTION_EXPORT_COLUMNS,
     add_new_transactions,
+    export_transactions,
     categorize_transactions,
     get_transactions_by_account,
     update_transactions,
@@ -12,7 +22,7 @@ from budget_book_backend.transactions.transaction_services import (
     find_matches,
 )
 from tests.test_data.transaction_test_data import account_name_to_id
-from tests.testing_utils import partial_dict_list_match
+from tests.testing_utils import partial_dict_list_match, recorded_statements
 
 
 @pytest.mark.parametrize(
@@ -87,6 +97,56 @@ def test_get_transactions_by_account(
     )
 
 
+@pytest.mark.parametrize(
+    ["filters", "expected_ids"],
+    [
+        (dict(), [1, 3, 5]),
+        (dict(categorize_type="uncategorized"), [1]),
+        (dict(categorize_type="categorized"), [3, 5]),
+        (dict(start_date=datetime(2023, 2, 24)), [3, 5]),
+        (dict(end_date=datetime(2023, 2, 24)), [1, 5]),
+        (dict(min_amount=70.0, max_amount=100.0), [5]),
+        (dict(order="desc"), [3, 5, 1]),
+        (dict(order="asc", categorize_type="categorized"), [5, 3]),
+    ],
+    ids=[
+        "No filters",
+        "Uncategorized",
+        "Categorized",
+        "Start date",
+        "End date",
+        "Amount range",
+        "Newest first",
+        "Oldest categorized first",
+    ],
+)
+def test_get_transactions_by_account_filters(
+    filters: dict, expected_ids: list[int], use_test_db
+) -> None:
+    """Test filtering and ordering the transactions of the AMEX account
+    in the query, with the values sent as bound parameters."""
+    with recorded_statements() as statements:
+        transactions: list[dict] = get_transactions_by_account([1], **filters)
+
+    transaction_ids: list[int] = [transaction["id"] for transaction in transactions]
+
+    # Without an order, the rows come back in whichever order the query
+    # plan reads them.
+    if "order" not in filters:
+        transaction_ids.sort()
+
+    assert transaction_ids == expected_ids
+
+    for value in ("2023-02-24", "70.0", "100.0"):
+        assert all(value not in statement for statement in statements)
+
+
+def test_get_transactions_by_account_invalid_order(use_test_db) -> None:
+    """Test that an unknown order is rejected."""
+    with pytest.raises(ValueError, match="Order must be asc or desc, not up."):
+        get_transactions_by_account([1], order="up")
+
+
 @pytest.mark.parametrize(
     ["transactions", "expected"],
     [
@@ -101,7 +161,7 @@ def test_get_transactions_by_account(
                     transaction_date="2023-01-02",
                 )
             ],
-            dict(message="SUCCESS"),
+            dict(message="SUCCESS", new=1, duplicates=0, duplicate_indexes=[]),
         ),
         (
             # Add multiple transactions
@@ -121,7 +181,7 @@ def test_get_transactions_by_account(
                     transaction_date="2023-01-02",
                 ),
             ],
-            dict(message="SUCCESS"),
+            dict(message="SUCCESS", new=2, duplicates=0, duplicate_indexes=[]),
         ),
         (
             # No Name In Transaction
@@ -134,7 +194,10 @@ def test_get_transactions_by_account(
                 )
             ],
             dict(
-                message="There were some errors processing the following transactions:\n0: Missing key 'name'."
+                message="There were some errors processing the following transactions:\n0: Missing key 'name'.",
+                new=0,
+                duplicates=0,
+                duplicate_indexes=[],
             ),
         ),
         (
@@ -155,7 +218,10 @@ def test_get_transactions_by_account(
                 ),
             ],
             dict(
-                message="There were some errors processing the following transactions:\n1: Missing key 'amount'."
+                message="There were some errors processing the following transactions:\n1: Missing key 'amount'.",
+                new=1,
+                duplicates=0,
+                duplicate_indexes=[],
             ),
         ),
         # This test case is giving unexpected behavior... it's succeeding.
@@ -390,3 +456,197 @@ def test_find_matches(account_id: int, expected_matches: list[int], use_test_db)
         assert matches["message"] == "No matching transactions found"
 
     assert matches["transaction_ids"] == expected_matches
+
+
+@pytest.mark.parametrize(
+    ["write", "expected_message"],
+    [
+        (
+            lambda: add_new_transactions(
+                [
+                    dict(
+                        name="Late Entry",
+                        description="Dated in the closed period",
+                        amount=10.00,
+                        credit_account_id=1,
+                        debit_account_id=3,
+                        transaction_date="2023-02-27",
+                    )
+                ]
+            ),
+            "0: Transaction date 2023-02-27 is in a period closed through 2023-02-28.",
+        ),
+        (
+            lambda: categorize_transactions(
+                [dict(transaction_id=3, debit_or_credit="debit", category_id=4)]
+            ),
+            "0: Transaction date 2023-02-27 is in a period closed through 2023-02-28.",
+        ),
+        (
+            lambda: update_transactions(
+                [dict(transaction_id=4, transaction_date="2023-02-01")]
+            ),
+            "0: Transaction date 2023-02-01 is in a period closed through 2023-02-28.",
+        ),
+        (
+            lambda: remove_transactions([5]),
+            "5: Transaction date 2023-02-24 is in a period closed through 2023-02-28.",
+        ),
+        (lambda: remove_transactions([4]), None),
+    ],
+    ids=[
+        "Add In Closed Period",
+        "Categorize In Closed Period",
+        "Move Into Closed Period",
+        "Remove In Closed Period",
+        "Remove After Closed Period",
+    ],
+)
+def test_closed_period_locks_transactions(
+    write, expected_message: str | None, use_test_db
+) -> None:
+    """Verify that transactions on or before a closed period cannot be
+    added, changed, or removed, while later ones still can."""
+    categorize_transactions(
+        [
+            dict(transaction_id=1, debit_or_credit="debit", category_id=3),
+            dict(transaction_id=2, debit_or_credit="debit", category_id=1),
+        ]
+    )
+    assert close_period(datetime(2023, 2, 28))["message"] == "SUCCESS"
+
+    result: dict = write()
+
+    if expected_message is None:
+        assert result == dict(message="SUCCESS")
+    else:
+        assert result["message"].endswith(expected_message)
+
+
+def test_rejected_edits_are_not_saved(use_test_db) -> None:
+    """Verify that an edit rejected for moving a transaction into a
+    closed period is not saved along with the next edit."""
+    categorize_transactions(
+        [
+            dict(transaction_id=1, debit_or_credit="debit", category_id=3),
+            dict(transaction_id=2, debit_or_credit="debit", category_id=1),
+        ]
+    )
+    assert close_period(datetime(2023, 2, 28))["message"] == "SUCCESS"
+
+    result: dict = update_transactions(
+        [
+            dict(transaction_id=4, amount=999.0, transaction_date="2023-02-01"),
+            dict(transaction_id=4, name="Renamed"),
+        ]
+    )
+
+    assert result["message"].endswith(
+        "0: Transaction date 2023-02-01 is in a period closed through 2023-02-28."
+    )
+
+    with DbSetup.Session() as session:
+        transaction: Transaction | None = session.get(Transaction, 4)
+        assert transaction is not None
+
+        assert transaction.name == "Renamed"
+        assert transaction.amount == 1250.0
+        assert transaction.transaction_date == datetime(2023, 3, 1)
+
+
+def test_failed_edits_only_skip_their_row(use_test_db) -> None:
+    """Verify that an edit whose write fails, e.g. on a locked database,
+    is reported while the other edits are still saved."""
+
+    def lock_transaction_2(session, flush_context, instances) -> None:
+        if any(getattr(obj, "id", None) == 2 for obj in session.dirty):
+            raise OperationalError(
+                "UPDATE transactions",
+                {},
+                sqlite3.OperationalError("database is locked"),
+            )
+
+    event.listen(DbSetup.Session, "before_flush", lock_transaction_2)
+
+    try:
+        result: dict = update_transactions(
+            [
+                dict(transaction_id=1, name="Before"),
+                dict(transaction_id=2, name="Locked"),
+                dict(transaction_id=3, name="After"),
+            ]
+        )
+    finally:
+        event.remove(DbSetup.Session, "before_flush", lock_transaction_2)
+
+    assert "1: (sqlite3.OperationalError) database is locked" in (
+        result["message"]
+    )
+
+    with DbSetup.Session() as session:
+        names: list[str] = [
+            transaction.name
+            for transaction in session.scalars(
+                select(Transaction)
+                .where(Transaction.id.in_([1, 2, 3]))
+                .order_by(Transaction.id)
+            )
+        ]
+
+    assert names[0] == "Before"
+    assert names[1] != "Locked"
+    assert names[2] == "After"
+
+
+@pytest.mark.parametrize(
+    ["chunk_size", "chunk_count"],
+    [(1, 2), (1000, 1)],
+    ids=["One row per chunk", "One chunk"],
+)
+def test_export_transactions(
+    chunk_size: int, chunk_count: int, monkeypatch, use_test_db
+) -> None:
+    """Test that the export writes the filtered transactions with their
+    account names, one chunk of rows at a time."""
+    monkeypatch.setattr(transaction_services, "EXPORT_CHUNK_SIZE", chunk_size)
+
+    chunks: list[str] = list(
+        export_transactions(
+            [account_name_to_id("AMEX")],
+            start_date=datetime(2023, 2, 24),
+            order="asc",
+        )
+    )
+
+    assert len(chunks) == chunk_count
+    assert list(csv.reader(io.StringIO("".join(chunks)))) == [
+        TRANSACTION_EXPORT_COLUMNS,
+        [
+            "5",
+            "2023-02-24",
+            "Credit Card Payment",
+            "Pay off credit card",
+            "78.9",
+            "1",
+            "AMEX",
+            "2",
+            "Chase Savings",
+        ],
+        [
+            "3",
+            "2023-02-27",
+            "Costco Gas",
+            "Costco Gas Wholesale",
+            "67.5",
+            "3",
+            "Gas for Car",
+            "1",
+            "AMEX",
+        ],
+    ]
+
+
+def test_export_transactions_invalid_order(use_test_db) -> None:
+    """Test that an invalid order is raised before the export starts."""
+    with pytest.raises(ValueError, match="Order must be asc or desc"):
+        export_transactions([1], order="sideways")
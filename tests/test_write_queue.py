@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from werkzeug.test import TestResponse
+
+from budget_book_backend.metrics.metrics_routes import BASE_METRICS_URL
+from budget_book_backend.models.db_setup import last_write_time
+from budget_book_backend.models.write_queue import WriteQueue
+from budget_book_backend.transactions.transaction_routes import BASE_TRANSACTION_URL
+from budget_book_backend.transactions.transaction_services import (
+    add_new_transactions,
+)
+from tests.testing_utils import app_with_config
+
+
+@pytest.fixture
+def queue_app(request, tmp_path) -> Iterator[Flask]:
+    """Initialize an app with the write queue enabled and a short
+    backoff, holding at most the parametrized number of writes."""
+    queue_app: Flask = app_with_config(
+        tmp_path,
+        WRITE_QUEUE=True,
+        WRITE_QUEUE_MAX_SIZE=getattr(request, "param", 100),
+        WRITE_RETRY_BACKOFF_MS=1,
+    )
+
+    yield queue_app
+
+    write_queue(queue_app).shutdown()
+
+
+def write_queue(app: Flask) -> WriteQueue:
+    """Return the write queue of the app."""
+    return app.extensions[WriteQueue.name]
+
+
+def new_transaction(name: str) -> dict:
+    """Return a new transaction for the credit card."""
+    return dict(
+        name=name,
+        description=name,
+        amount=10.0,
+        credit_account_id=1,
+        transaction_date="2023-03-02",
+    )
+
+
+def busy_error() -> OperationalError:
+    """Return the error SQLAlchemy raises when the database is locked."""
+    return OperationalError(
+        "UPDATE transactions", {}, sqlite3.OperationalError("database is locked")
+    )
+
+
+def test_writes_run_on_the_writer_thread(queue_app: Flask) -> None:
+    """Test that concurrent writes are all run, one at a time, on the
+    writer thread."""
+    writer_threads: set[str] = set()
+
+    def add(name: str) -> dict:
+        with queue_app.app_context():
+            write_queue(queue_app).submit(
+                lambda: writer_threads.add(threading.current_thread().name)
+            )
+            return add_new_transactions([new_transaction(name)])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results: list[dict] = list(
+            executor.map(add, [f"Purchase {i}" for i in range(4)])
+        )
+
+    assert [result["new"] for result in results] == [1] * 4
+    assert writer_threads == {"budget-books-writer"}
+    assert write_queue(queue_app).stats()["writes"] == 8
+
+
+def test_busy_writes_are_retried(queue_app: Flask) -> None:
+    """Test that a write that finds the database locked is retried with
+    backoff, and that other errors are raised at once."""
+    attempts: list[int] = []
+
+    def locked_twice() -> str:
+        attempts.append(1)
+
+        if len(attempts) <= 2:
+            raise busy_error()
+
+        return "written"
+
+    def broken() -> None:
+        attempts.append(1)
+        raise OperationalError("UPDATE", {}, sqlite3.OperationalError("no such table"))
+
+    assert write_queue(queue_app).submit(locked_twice) == "written"
+    assert len(attempts) == 3
+
+    with pytest.raises(OperationalError):
+        write_queue(queue_app).submit(broken)
+
+    assert len(attempts) == 4
+    stats: dict = write_queue(queue_app).stats()
+
+    assert (stats["writes"], stats["retries"], stats["failures"]) == (1, 2, 1)
+
+
+def test_busy_writes_give_up(queue_app: Flask) -> None:
+    """Test that a write is given up on after WRITE_RETRIES retries."""
+    write_queue(queue_app).max_retries = 2
+
+    def always_locked() -> None:
+        raise busy_error()
+
+    with pytest.raises(OperationalError):
+        write_queue(queue_app).submit(always_locked)
+
+    assert write_queue(queue_app).stats()["retries"] == 2
+
+
+@pytest.mark.parametrize("queue_app", [1], indirect=True)
+def test_full_queue_refuses_writes(queue_app: Flask) -> None:
+    """Expect a write to be refused with a 503 status while the queue is
+    full, and the queue depth to be reported by the metrics route."""
+    release: threading.Event = threading.Event()
+    running: threading.Event = threading.Event()
+
+    def blocking_write() -> None:
+        running.set()
+        release.wait(5)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(write_queue(queue_app).submit, blocking_write)
+        running.wait(5)
+        executor.submit(write_queue(queue_app).submit, lambda: None)
+
+        while write_queue(queue_app).queue.qsize() < 1:
+            pass
+
+        with queue_app.test_client() as cli:
+            response: TestResponse = cli.post(
+                BASE_TRANSACTION_URL,
+                json=dict(transactions=[new_transaction("Refused")]),
+            )
+            metrics: dict = json.loads(cli.get(BASE_METRICS_URL).data)
+
+        release.set()
+
+    assert response.status_code == 503
+    assert json.loads(response.data) == dict(
+        message="ERROR", error="Too many writes are pending. Please try again later."
+    )
+    assert metrics["metrics"][WriteQueue.name] | dict(writes=0) == dict(
+        depth=1, max_depth=1, max_size=1, writes=0, retries=0, failures=0, rejected=1
+    )
+
+
+def test_writes_are_recorded_for_the_caller(tmp_path) -> None:
+    """Test that a queued write still records when the caller last
+    wrote, so that its reads stay on the primary."""
+    queue_app: Flask = app_with_config(
+        tmp_path,
+        DATABASE_REPLICA=f"sqlite:///{tmp_path / 'replica.db'}",
+        WRITE_QUEUE=True,
+    )
+    with queue_app.app_context():
+        before: float = last_write_time()
+
+        add_new_transactions([new_transaction("Recorded")])
+
+        assert last_write_time() > before
+
+    write_queue(queue_app).shutdown()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork.")
+def test_forked_children_get_a_writer(queue_app: Flask) -> None:
+    """Test that a child forked from an app with a started writer, like a
+    preloaded server worker, runs its writes on a writer of its own."""
+    parent_thread: threading.Thread = write_queue(queue_app).thread
+
+    child_pid: int = os.fork()
+
+    if child_pid == 0:
+        # Exit the child without running pytest's teardown.
+        timer: threading.Timer = threading.Timer(10, os._exit, [2])
+        timer.daemon = True
+        timer.start()
+
+        with queue_app.app_context():
+            result: dict = add_new_transactions([new_transaction("Forked")])
+
+        os._exit(
+            0
+            if result["message"] == "SUCCESS"
+            and write_queue(queue_app).thread is not parent_thread
+            else 1
+        )
+
+    _, status = os.waitpid(child_pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert write_queue(queue_app).thread is parent_thread
@@ -1,3 +1,14 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from flask import Flask
+from sqlalchemy import Engine, event
+
+from budget_book_backend import create_app
+from tests.setup_db import setup_db
+
+
 def partial_dict_match(compare_dict: dict, target_dict: dict) -> bool:
     """Determine whether the given dictionary partially matches the
     target dictionary by verifying that all the keys in compare_dict
@@ -74,3 +85,47 @@ def partial_dict_list_match(
             return False
 
     return True
+
+
+@contextmanager
+def recorded_statements() -> Iterator[list[str]]:
+    """Record the SQL statements executed by any engine within the
+    block, e.g. to count the queries a service makes.
+
+    Yields
+    ------
+        (list[str]) : The statements, in the order they were executed.
+    """
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def app_with_config(tmp_path: Path, **config: Any) -> Flask:
+    """Create an app on its own database file, filled with the test
+    data, with the given config on top of it.
+
+    Parameters
+    ----------
+        tmp_path (Path) : The directory of the test's database file.
+        config : The config values the test needs, e.g. LEDGER_INDEX.
+
+    Returns
+    -------
+        (Flask) : The app, whose database is the current one.
+    """
+    app: Flask = create_app(
+        test_config=dict(DATABASE=f"sqlite:///{tmp_path / 'ledger.db'}", **config)
+    )
+
+    setup_db()
+
+    return app